@@ -3,23 +3,59 @@ import ctypes
 import os
 import json
 import re
-import shutil
+import functools
+import hashlib
+import marshal
+import sqlite3
 import subprocess
+import struct
+import tempfile
 import importlib.util
 import threading
+import time
+import bisect
+import itertools
+import math
+import operator
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QTabWidget, QWidget, QVBoxLayout, QPushButton, QListWidget,
     QListWidgetItem, QLineEdit, QLabel, QCheckBox, QSlider, QPlainTextEdit, QHBoxLayout,
     QCompleter, QFileDialog, QComboBox, QColorDialog, QMessageBox, QGroupBox, QFormLayout,
-    QSplitter, QShortcut, QTextEdit
+    QSplitter, QShortcut, QTextEdit, QListView
+)
+from PyQt5.QtCore import (
+    Qt, QTimer, QPoint, pyqtSignal, QRegExp, QProcess, QUrl, QRect, QSize, QObject, QAbstractListModel,
+    QModelIndex, QFileSystemWatcher, QSortFilterProxyModel
 )
-from PyQt5.QtCore import Qt, QTimer, QPoint, pyqtSignal, QRegExp, QProcess, QUrl, QRect, QSize
 from PyQt5.QtGui import (
     QSyntaxHighlighter, QTextCharFormat, QColor, QFont, QTextCursor, QDesktopServices, QPainter,
     QTextFormat, QFontMetricsF, QTextDocument, QKeySequence, QFontDatabase
 )
-import pyautogui
 from pynput import mouse, keyboard
+
+# AST output formats of the Corel compiler library (JSON is kept for debugging)
+COREL_FORMAT_JSON = 0
+COREL_FORMAT_BINARY = 1
+# Scripts run from the optimized AST: fused moves/waits and collapsed trivial loops (see corel_optimizer.rs)
+COREL_OPT_LEVEL = 1
+# Deepest loop nesting the compiler accepts; deeper scripts are rejected (the compiler's default is 64)
+COREL_MAX_LOOP_DEPTH = 64
+# In-process runtime executor (the runtime's COREL_EXECUTORS): 'threads' runs each script on a pool thread,
+# 'asyncio' runs every script as a coroutine on one loop thread and scales to many concurrent scripts
+COREL_EXECUTOR = 'threads'
+# What a binding does when triggered while its script runs (the runtime's RUN_POLICIES), as shown in the UI
+RUN_POLICY_LABELS = {
+    'reject': 'Ignore',
+    'queue': 'Queue',
+    'restart': 'Restart',
+    'toggle': 'Toggle stop',
+    'hold': 'Run while held',
+}
+DEFAULT_RUN_POLICY = 'reject'
+# Reserved global hotkey that stops every running script; scripts cannot be bound to it
+STOP_SCRIPTS_HOTKEY = '<ctrl>+<alt>+<esc>'
 
 class ScriptLineNumberArea(QWidget):
     def __init__(self, editor):
@@ -202,7 +238,7 @@ class ScriptSyntaxHighlighter(QSyntaxHighlighter):
         self.patterns = {
             "trigger": [r'--<[^>\n]+>'],
             "function": [r'\bwait\b', r'\bpress\b', r'\bmove\b', r'\bclick\b'],
-            "keyword": [r'\bloop\b'],
+            "keyword": [r'\bloop\b', r'\*'],
             "number": [r'\b\d+(?:ms|s|ds|cs|x|y)?\b'],
             "string": [r'".*"', r"'.*'"],
             "comment": [r'//.*'],
@@ -273,18 +309,1572 @@ class ScriptSyntaxHighlighter(QSyntaxHighlighter):
 
         self.setCurrentBlockState(0)
         
+# Directories never searched for scripts
+SCRIPT_LIBRARY_SKIP_DIRS = {'.git', '__pycache__', 'target', 'ext'}
+
+def scan_script_directories(directories, known):
+    # Lists the scripts (path -> mtime_ns) and subdirectories of every directory given. Subdirectories
+    # not in `known` are new, so they are scanned too. Missing directories map to None.
+    found = {}
+    pending = list(directories)
+    while pending:
+        directory = pending.pop()
+        if directory in found:
+            continue
+        scripts = {}
+        subdirectories = set()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in SCRIPT_LIBRARY_SKIP_DIRS:
+                                subdirectories.add(os.path.abspath(entry.path))
+                        elif entry.name.lower().endswith('.corel'):
+                            scripts[os.path.abspath(entry.path)] = entry.stat().st_mtime_ns
+                    except OSError:
+                        continue
+        except OSError:
+            found[directory] = None
+            continue
+        found[directory] = (scripts, subdirectories)
+        pending.extend(path for path in subdirectories if path not in known)
+    return found
+
+
+class ScriptLibraryIndex(QObject):
+    # Every .corel script under root, kept current by a QFileSystemWatcher on each directory.
+    # Only directories that changed are rescanned, on a worker thread, and the results are applied
+    # on the GUI thread. Watched files (bound scripts) also report content changes.
+    scripts_changed = pyqtSignal()
+    script_modified = pyqtSignal(str)
+    scan_finished = pyqtSignal(object)
+    RESCAN_DELAY_MS = 200
+
+    def __init__(self, root, parent=None):
+        super().__init__(parent)
+        self.root = os.path.abspath(root)
+        self.excluded = os.path.join(self.root, 'corel', 'corel.corel')
+        self.directories = {}
+        self.watched_files = set()
+        self.dirty_directories = set()
+        self.modified_files = set()
+        self.scanning = False
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+        self.watcher.fileChanged.connect(self.on_file_changed)
+        self.scan_finished.connect(self.apply_scan)
+        # Editors fire several events per save; both timers coalesce them into one pass
+        self.rescan_timer = QTimer(self)
+        self.rescan_timer.setSingleShot(True)
+        self.rescan_timer.setInterval(self.RESCAN_DELAY_MS)
+        self.rescan_timer.timeout.connect(self.start_scan)
+        self.modified_timer = QTimer(self)
+        self.modified_timer.setSingleShot(True)
+        self.modified_timer.setInterval(self.RESCAN_DELAY_MS)
+        self.modified_timer.timeout.connect(self.flush_modified_files)
+
+    def start(self):
+        self.dirty_directories.add(self.root)
+        self.start_scan()
+
+    def rescan(self):
+        # Full rescan, for the Refresh button: every known directory is listed again.
+        self.dirty_directories.update(self.directories)
+        self.dirty_directories.add(self.root)
+        self.start_scan()
+
+    def scripts(self):
+        return [
+            path
+            for scripts, _subdirectories in self.directories.values()
+            for path in scripts
+            if path != self.excluded
+        ]
+
+    def watch_files(self, paths):
+        wanted = {os.path.abspath(path) for path in paths if os.path.exists(path)}
+        stale = self.watched_files - wanted
+        added = wanted - self.watched_files
+        if stale:
+            self.watcher.removePaths(list(stale))
+        if added:
+            self.watcher.addPaths(list(added))
+        self.watched_files = wanted
+
+    def on_directory_changed(self, directory):
+        self.dirty_directories.add(directory)
+        self.rescan_timer.start()
+
+    def on_file_changed(self, path):
+        # Saving by rename drops the watch, so it is re-added while the file exists.
+        if path in self.watched_files and os.path.exists(path) and path not in self.watcher.files():
+            self.watcher.addPath(path)
+        self.modified_files.add(path)
+        self.modified_timer.start()
+
+    def flush_modified_files(self):
+        modified = self.modified_files
+        self.modified_files = set()
+        for path in modified:
+            if os.path.exists(path):
+                self.script_modified.emit(path)
+
+    def start_scan(self):
+        # One scan at a time; directories dirtied meanwhile are picked up when it lands.
+        if self.scanning or not self.dirty_directories:
+            return
+        directories = self.dirty_directories
+        self.dirty_directories = set()
+        known = set(self.directories)
+        self.scanning = True
+
+        def worker():
+            self.scan_finished.emit(scan_script_directories(directories, known))
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def apply_scan(self, found):
+        changed = False
+        for directory, listing in found.items():
+            if listing is None:
+                changed = self.remove_directory(directory) or changed
+                continue
+            scripts, subdirectories = listing
+            previous = self.directories.get(directory)
+            if previous is None:
+                self.watcher.addPath(directory)
+                changed = changed or bool(scripts)
+            else:
+                previous_scripts, previous_subdirectories = previous
+                for subdirectory in previous_subdirectories - subdirectories:
+                    changed = self.remove_directory(subdirectory) or changed
+                if scripts.keys() != previous_scripts.keys():
+                    changed = True
+                for path, mtime in scripts.items():
+                    if path in previous_scripts and previous_scripts[path] != mtime:
+                        self.modified_files.add(path)
+                        self.modified_timer.start()
+            self.directories[directory] = (scripts, subdirectories)
+
+        self.scanning = False
+        if changed:
+            self.scripts_changed.emit()
+        self.start_scan()
+
+    def remove_directory(self, directory):
+        # Drops a deleted or renamed directory and everything below it; returns whether scripts went with it.
+        prefix = directory + os.sep
+        removed = [path for path in self.directories if path == directory or path.startswith(prefix)]
+        had_scripts = False
+        for path in removed:
+            scripts, _subdirectories = self.directories.pop(path)
+            had_scripts = had_scripts or bool(scripts)
+        watched = [path for path in removed if path in self.watcher.directories()]
+        if watched:
+            self.watcher.removePaths(watched)
+        return had_scripts
+
+
+class ScriptLibraryModel(QAbstractListModel):
+    # Filtered list of the script index for a QListView, which only paints the rows in view.
+    # Display text and lowercase search keys are computed once per script, not per keystroke.
+    # With a `search` callable, queries are ranked by it instead of matched against the path:
+    # search(query, limit) returns the best `limit` (path, score) hits and how many scripts matched.
+    # `details` adds a per-row suffix and is only evaluated for painted rows.
+    MAX_SEARCH_ROWS = 500
+
+    def __init__(self, root, parent=None, search=None, details=None):
+        super().__init__(parent)
+        self.root = root
+        self.search = search
+        self.details = details
+        self.entries = {}
+        self.sorted_entries = []
+        self.rows = []
+        # Scripts matching the query, which can be more than the rows shown
+        self.match_count = 0
+        self.query = ""
+
+    def set_scripts(self, paths):
+        entries = {}
+        for path in paths:
+            entry = self.entries.get(path)
+            if entry is None:
+                relative = os.path.relpath(path, self.root)
+                entry = (relative.replace('\\', '/'), f"{os.path.basename(path)} {relative}".lower(), path)
+            entries[path] = entry
+        self.entries = entries
+        self.sorted_entries = sorted(entries.values(), key=lambda entry: entry[2].lower())
+        self.apply_filter()
+
+    def set_query(self, query):
+        query = query.strip().lower()
+        if query != self.query:
+            self.query = query
+            self.apply_filter()
+
+    def apply_filter(self):
+        query = self.query
+        if not query:
+            rows = self.sorted_entries
+            match_count = len(rows)
+        elif self.search is not None:
+            # Only the best MAX_SEARCH_ROWS hits become rows; a broad word can match the whole library
+            entries = self.entries
+            ranked, match_count = self.search(query, self.MAX_SEARCH_ROWS)
+            rows = [entries[path] for path, _score in ranked if path in entries]
+        else:
+            rows = [entry for entry in self.sorted_entries if query in entry[1]]
+            match_count = len(rows)
+        self.match_count = match_count
+        if rows == self.rows:
+            return
+        self.beginResetModel()
+        self.rows = rows
+        self.endResetModel()
+
+    def refresh_details(self):
+        if self.rows:
+            self.dataChanged.emit(self.index(0), self.index(len(self.rows) - 1), [Qt.DisplayRole])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.rows):
+            return None
+        display, _search_key, path = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            if self.details is not None:
+                details = self.details(path)
+                if details:
+                    return f"{display}    {details}"
+            return display
+        if role in (Qt.UserRole, Qt.ToolTipRole):
+            return path
+        return None
+
+
+# TokenKind of corel_lexer.rs in declaration order, the kind byte of a corel_tokenize record
+COREL_TOKEN_KINDS = (
+    'STARTKEY', 'WAIT', 'MOVE', 'PRESS', 'CLICK', 'LOOP', 'STRING', 'TIME', 'COORDINATE', 'NUMBER', 'COMMENT',
+    'LPAREN', 'RPAREN', 'LBRACE', 'RBRACE', 'STAR'
+)
+# kind u8, start u32, len u32 (byte offsets into the source), see encode_tokens in corel/src/lib.rs
+COREL_TOKEN_RECORD = struct.Struct('<BII')
+# Regex mirror of corel_lexer.rs, used when the compiler library is unavailable; the tests check that both
+# produce the same tokens. KEYWORD stands for the WAIT..LOOP kinds.
+COREL_TOKEN_PATTERN = re.compile(r"""
+    (?P<STARTKEY>--<[^>\r\n]+>)
+    | (?P<COORDINATE>-?[0-9]+[xy]\b)
+    | (?P<KEYWORD>(?:wait|move|press|click|loop)\b)
+    | (?P<STRING>'[^']*'|"[^"]*")
+    | (?P<TIME>[0-9]+(?:s|ms|cs|ds)\b)
+    | (?P<NUMBER>[0-9]+\b)
+    | (?P<COMMENT>//[^\n]*)
+    | (?P<LPAREN>\(\s*)
+    | (?P<RPAREN>\)\s*)
+    | (?P<LBRACE>\{\s*)
+    | (?P<RBRACE>\}\s*)
+    | (?P<STAR>\*\s*)
+""", re.VERBOSE)
+SEARCH_WORD_PATTERN = re.compile(r'[a-z0-9]+')
+SEARCH_KEYWORD_KINDS = frozenset(('WAIT', 'MOVE', 'PRESS', 'CLICK', 'LOOP'))
+SEARCH_PUNCTUATION_KINDS = frozenset(('LPAREN', 'RPAREN', 'LBRACE', 'RBRACE'))
+SEARCH_LOOP_FILTER_PATTERN = re.compile(r'loop(>=|<=|>|<|=)([0-9]+)')
+# Slice of the loop-count-sorted script list matching each comparison
+SEARCH_LOOP_RANGES = {
+    '>': lambda counts, limit: (bisect.bisect_right(counts, limit), len(counts)),
+    '>=': lambda counts, limit: (bisect.bisect_left(counts, limit), len(counts)),
+    '<': lambda counts, limit: (0, bisect.bisect_left(counts, limit)),
+    '<=': lambda counts, limit: (0, bisect.bisect_right(counts, limit)),
+    '=': lambda counts, limit: (bisect.bisect_left(counts, limit), bisect.bisect_right(counts, limit))
+}
+
+
+def corel_regex_tokens(source):
+    # [(kind, text)] like ModMenu.tokenize_corel_source_inprocess returns from the Rust lexer
+    tokens = []
+    for match in COREL_TOKEN_PATTERN.finditer(source):
+        kind = match.lastgroup
+        text = match.group()
+        tokens.append((text.upper() if kind == 'KEYWORD' else kind, text))
+    return tokens
+
+
+class ScriptSearchDocument:
+    __slots__ = ('terms', 'trigger', 'line_count', 'max_loop')
+
+    def __init__(self, terms, trigger, line_count, max_loop):
+        self.terms = terms
+        self.trigger = trigger
+        self.line_count = line_count
+        self.max_loop = max_loop
+
+
+class ScriptSearchIndex:
+    # Inverted index over script contents for the library search. Terms come from the Corel lexer's
+    # tokens: keywords, press/click arguments ("press:f"), the trigger ("trigger:ctrl+k"), times,
+    # coordinates, numbers, comment words and file name words.
+    # Every query word has to match. Plain words match terms exactly, by prefix or as a subsequence,
+    # ranked in that order; "field:value" words skip the fuzzy pass and loop>N (or >=, <, <=, =)
+    # filters on the largest loop count in the script.
+    MAX_EXPANSIONS = 256
+
+    def __init__(self):
+        self.documents = {}
+        self.postings = {}
+        # Rebuilt on the first search after the index changed
+        self.vocabulary = []
+        self.vocabulary_by_initial = {}
+        self.sorted_paths = []
+        self.loop_counts = []
+        self.loop_paths = []
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def __contains__(self, path):
+        with self.lock:
+            return path in self.documents
+
+    def paths(self):
+        with self.lock:
+            return set(self.documents)
+
+    def document(self, path):
+        with self.lock:
+            return self.documents.get(path)
+
+    @staticmethod
+    def analyze(path, source, tokens=None):
+        # `tokens` is the [(kind, text)] token stream of `source`; without it the regex mirror lexes the source
+        if tokens is None:
+            tokens = corel_regex_tokens(source)
+        terms = set(SEARCH_WORD_PATTERN.findall(os.path.splitext(os.path.basename(path))[0].lower()))
+        trigger = None
+        max_loop = 0
+        previous = None
+        for kind, text in tokens:
+            if kind in SEARCH_KEYWORD_KINDS:
+                terms.add(text)
+                previous = text
+                continue
+            if kind in SEARCH_PUNCTUATION_KINDS:
+                continue
+            if kind == 'STARTKEY':
+                value = text[3:-1].strip()
+                if trigger is None:
+                    trigger = value
+                terms.add(f"trigger:{value.lower()}")
+            elif kind == 'STRING':
+                value = text[1:-1].lower()
+                if previous in ('press', 'click'):
+                    terms.add(f"{previous}:{value}")
+                terms.add(value)
+            elif kind == 'COMMENT':
+                terms.update(SEARCH_WORD_PATTERN.findall(text[2:].lower()))
+            elif kind == 'NUMBER':
+                if previous == 'loop':
+                    max_loop = max(max_loop, int(text))
+                terms.add(text)
+            elif kind == 'STAR':
+                # loop(*) runs until stopped, so it passes every loop>N filter
+                if previous == 'loop':
+                    max_loop = math.inf
+                    terms.add('loop:*')
+            else:
+                terms.add(text.lower())
+            previous = None
+        line_count = source.count('\n') + (1 if source and not source.endswith('\n') else 0)
+        return ScriptSearchDocument(frozenset(terms), trigger, line_count, max_loop)
+
+    def update(self, path, source, tokens=None):
+        document = self.analyze(path, source, tokens)
+        with self.lock:
+            self.remove_locked(path)
+            self.documents[path] = document
+            self.dirty = True
+            for term in document.terms:
+                postings = self.postings.get(term)
+                if postings is None:
+                    self.postings[term] = {path}
+                else:
+                    postings.add(path)
+
+    def remove(self, paths):
+        with self.lock:
+            for path in paths:
+                self.remove_locked(path)
+
+    def remove_locked(self, path):
+        document = self.documents.pop(path, None)
+        if document is None:
+            return
+        self.dirty = True
+        for term in document.terms:
+            postings = self.postings[term]
+            postings.discard(path)
+            if not postings:
+                del self.postings[term]
+
+    def search(self, query, limit=None):
+        # Returns ([(path, score)], match count): the best `limit` matches (all of them by default), best first.
+        with self.lock:
+            if self.dirty:
+                self.rebuild_locked()
+
+            tiers = None
+            for word in query.lower().split():
+                matched = self.match_word(word)
+                tiers = matched if tiers is None else self.combine_tiers(tiers, matched)
+                if not tiers:
+                    return [], 0
+
+            # Tiers are disjoint, so the best `limit` rows are the best tiers in turn, each in path order.
+            # A large tier is read off the presorted path list, which stops as soon as enough rows are found.
+            count = sum(map(len, tiers.values()))
+            if limit is None:
+                limit = count
+            ranked = []
+            for score in sorted(tiers, reverse=True):
+                needed = limit - len(ranked)
+                if needed <= 0:
+                    break
+                paths = tiers[score]
+                if len(paths) * 4 < len(self.sorted_paths):
+                    paths = sorted(paths)[:needed]
+                else:
+                    paths = itertools.islice(filter(paths.__contains__, self.sorted_paths), needed)
+                ranked.extend(zip(paths, itertools.repeat(score)))
+        return ranked, count
+
+    @staticmethod
+    def combine_tiers(tiers, matched):
+        # Paths matching both, grouped by the sum of their scores
+        combined = {}
+        for score, paths in tiers.items():
+            for word_score, word_paths in matched.items():
+                both = paths & word_paths
+                if not both:
+                    continue
+                total = score + word_score
+                if total in combined:
+                    combined[total] |= both
+                else:
+                    combined[total] = both
+        return combined
+
+    def rebuild_locked(self):
+        self.vocabulary = sorted(self.postings)
+        self.vocabulary_by_initial = {}
+        for term in self.vocabulary:
+            self.vocabulary_by_initial.setdefault(term[0], []).append(term)
+        self.sorted_paths = sorted(self.documents)
+        by_loop = sorted((document.max_loop, path) for path, document in self.documents.items())
+        self.loop_counts = [count for count, _path in by_loop]
+        self.loop_paths = [path for _count, path in by_loop]
+        self.dirty = False
+
+    def match_word(self, word):
+        # Returns {score: paths}, every matching path in exactly one tier
+        comparison = SEARCH_LOOP_FILTER_PATTERN.fullmatch(word)
+        if comparison is not None:
+            start, end = SEARCH_LOOP_RANGES[comparison.group(1)](self.loop_counts, int(comparison.group(2)))
+            paths = set(self.loop_paths[start:end])
+            return {1.0: paths} if paths else {}
+
+        # Best-scoring terms first, so a path keeps the first (highest) score it is given
+        tiers = {}
+        seen = set()
+        for term, score in sorted(self.matching_terms(word), key=operator.itemgetter(1), reverse=True):
+            postings = self.postings[term] - seen
+            if not postings:
+                continue
+            seen |= postings
+            if score in tiers:
+                tiers[score] |= postings
+            else:
+                tiers[score] = postings
+        return tiers
+
+    def matching_terms(self, word):
+        matches = []
+        if word in self.postings:
+            matches.append((word, 3.0))
+
+        # Prefix matches sit next to each other in the sorted vocabulary; shorter completions rank higher
+        vocabulary = self.vocabulary
+        position = bisect.bisect_left(vocabulary, word)
+        while position < len(vocabulary) and len(matches) < self.MAX_EXPANSIONS:
+            term = vocabulary[position]
+            if not term.startswith(word):
+                break
+            if term != word:
+                matches.append((term, 2.0 - min(len(term) - len(word), 10) * 0.05))
+            position += 1
+
+        # Fuzzy: the word's characters in order, starting at the term's first character
+        if len(word) < 2 or ':' in word:
+            return matches
+        pattern = re.compile('.*?'.join(map(re.escape, word)))
+        for term in self.vocabulary_by_initial.get(word[0], ()):
+            if len(matches) >= self.MAX_EXPANSIONS:
+                break
+            if term.startswith(word):
+                continue
+            match = pattern.match(term)
+            if match is not None:
+                matches.append((term, len(word) / match.end()))
+        return matches
+
+
+# One preset per line in presets.txt, the import/export format
+PRESET_LINE_PATTERN = re.compile(r'^\s*(.*?)\s*-\s*Y:\s*(-?\d+)\s*-\s*X:\s*(-?\d+)\s*-\s*Delay:\s*(\d+)\s*ms\s*$')
+
+
+class Preset:
+    __slots__ = ('id', 'name', 'y', 'x', 'delay')
+
+    def __init__(self, name, y, x, delay, id=None):
+        self.id = id
+        self.name = name
+        self.y = y
+        self.x = x
+        self.delay = delay
+
+    @property
+    def key(self):
+        return self.name.lower()
+
+    @classmethod
+    def parse(cls, text):
+        match = PRESET_LINE_PATTERN.match(text)
+        if not match:
+            return None
+        return cls(match.group(1), int(match.group(2)), int(match.group(3)), int(match.group(4)))
+
+    def serialize(self):
+        return f'{self.name} - Y: {self.y} - X: {self.x} - Delay: {self.delay} ms'
+
+    def display_text(self):
+        return f"{self.name}   ·   Y {self.y:+d}   X {self.x:+d}   {self.delay} ms"
+
+
+def read_preset_import(lines, existing):
+    # Parses presets.txt lines against `existing` (name key -> Preset) in one pass. Lines repeating
+    # a preset that is already there are dropped; other name collisions get the next free "-N" suffix.
+    presets = []
+    taken = set(existing)
+    seen = {(preset.key, preset.y, preset.x, preset.delay) for preset in existing.values()}
+    next_suffix = {}
+    counts = {'imported': 0, 'renamed': 0, 'duplicates': 0, 'skipped': 0}
+    for line in lines:
+        preset = Preset.parse(line)
+        if preset is None:
+            if line.strip():
+                counts['skipped'] += 1
+            continue
+        base_key = preset.key
+        signature = (base_key, preset.y, preset.x, preset.delay)
+        if signature in seen:
+            counts['duplicates'] += 1
+            continue
+        seen.add(signature)
+        if base_key in taken:
+            base_name = preset.name
+            suffix = next_suffix.get(base_key, 2)
+            while f"{base_name}-{suffix}".lower() in taken:
+                suffix += 1
+            next_suffix[base_key] = suffix + 1
+            preset.name = f"{base_name}-{suffix}"
+            counts['renamed'] += 1
+        taken.add(preset.key)
+        presets.append(preset)
+    counts['imported'] = len(presets)
+    return presets, counts
+
+
+class PresetStore:
+    # SQLite-backed preset storage: every change is one small transaction instead of a file rewrite.
+    # Rows keep insertion order through their id; names are unique case-insensitively.
+    SCHEMA_VERSION = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        # Why the legacy presets.txt could not be imported, for the caller to show
+        self.import_error = None
+
+    def open(self, legacy_path=None):
+        # Creates the schema on first use and imports the legacy presets.txt once.
+        # An unreadable presets.txt is skipped rather than aborting startup.
+        version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+        if version >= self.SCHEMA_VERSION:
+            return
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS presets ('
+                'id INTEGER PRIMARY KEY, name TEXT NOT NULL, name_key TEXT NOT NULL UNIQUE, '
+                'y INTEGER NOT NULL, x INTEGER NOT NULL, delay INTEGER NOT NULL)'
+            )
+            if legacy_path is not None and os.path.exists(legacy_path):
+                try:
+                    with open(legacy_path, 'r') as file:
+                        presets, _counts = read_preset_import(file, {})
+                except (OSError, UnicodeDecodeError) as exc:
+                    self.import_error = exc
+                else:
+                    self.insert_many_locked(presets)
+            self.connection.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+
+    def load_all(self):
+        rows = self.connection.execute('SELECT id, name, y, x, delay FROM presets ORDER BY id')
+        return [Preset(name, y, x, delay, id=row_id) for row_id, name, y, x, delay in rows]
+
+    def insert(self, preset):
+        with self.connection:
+            self.insert_many_locked([preset])
+
+    def insert_many(self, presets):
+        with self.connection:
+            self.insert_many_locked(presets)
+
+    def insert_many_locked(self, presets):
+        # ids are assigned up front so one executemany covers the whole batch
+        next_id = self.connection.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM presets').fetchone()[0]
+        for offset, preset in enumerate(presets):
+            preset.id = next_id + offset
+        self.connection.executemany(
+            'INSERT INTO presets (id, name, name_key, y, x, delay) VALUES (?, ?, ?, ?, ?, ?)',
+            ((preset.id, preset.name, preset.key, preset.y, preset.x, preset.delay) for preset in presets)
+        )
+
+    def update(self, preset):
+        with self.connection:
+            self.connection.execute(
+                'UPDATE presets SET name = ?, name_key = ?, y = ?, x = ?, delay = ? WHERE id = ?',
+                (preset.name, preset.key, preset.y, preset.x, preset.delay, preset.id)
+            )
+
+    def delete(self, preset):
+        with self.connection:
+            self.connection.execute('DELETE FROM presets WHERE id = ?', (preset.id,))
+
+    def close(self):
+        # Compacts the file once a quarter of it is free pages; VACUUM rewrites it atomically.
+        try:
+            page_count = self.connection.execute('PRAGMA page_count').fetchone()[0]
+            free_pages = self.connection.execute('PRAGMA freelist_count').fetchone()[0]
+            if page_count and free_pages * 4 > page_count:
+                self.connection.execute('VACUUM')
+        finally:
+            self.connection.close()
+
+
+class PresetListModel(QAbstractListModel):
+    # Presets in store order plus a lowercase name index, so name lookups never scan the rows.
+    # Every change is written to the store first; the view is only notified once it succeeded.
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.presets = []
+        self.by_name = {}
+        self.search_keys = {}
+
+    def load(self):
+        self.beginResetModel()
+        self.presets = self.store.load_all()
+        self.by_name = {preset.key: preset for preset in self.presets}
+        self.search_keys = {}
+        self.endResetModel()
+
+    def search_key(self, row):
+        # " name name-parts y5 x-2 delay10 10ms", built once per preset for PresetFilterProxyModel
+        preset = self.presets[row]
+        key = self.search_keys.get(preset)
+        if key is None:
+            name = preset.name.lower()
+            parts = [name, *filter(None, re.split(r'[^a-z0-9]+', name))]
+            parts += [f"y{preset.y}", f"x{preset.x}", f"delay{preset.delay}", f"{preset.delay}ms"]
+            key = ' ' + ' '.join(parts)
+            self.search_keys[preset] = key
+        return key
+
+    def find(self, name):
+        return self.by_name.get(name.lower())
+
+    def preset_at(self, row):
+        if 0 <= row < len(self.presets):
+            return self.presets[row]
+        return None
+
+    def row_of(self, preset):
+        return self.presets.index(preset)
+
+    def unique_name(self, base_name):
+        candidate = base_name
+        suffix = 2
+        while candidate.lower() in self.by_name:
+            candidate = f"{base_name}-{suffix}"
+            suffix += 1
+        return candidate
+
+    def add(self, preset):
+        return self.add_many([preset])
+
+    def add_many(self, presets):
+        # Returns the row of the first added preset; names must already be unique
+        if not presets:
+            return -1
+        self.store.insert_many(presets)
+        first = len(self.presets)
+        self.beginInsertRows(QModelIndex(), first, first + len(presets) - 1)
+        self.presets.extend(presets)
+        for preset in presets:
+            self.by_name[preset.key] = preset
+        self.endInsertRows()
+        return first
+
+    def replace(self, preset, name, y_value, x_value, delay):
+        # Raises sqlite3.IntegrityError if `name` belongs to another preset
+        updated = Preset(name, y_value, x_value, delay, id=preset.id)
+        self.store.update(updated)
+        row = self.row_of(preset)
+        self.presets[row] = updated
+        self.by_name.pop(preset.key, None)
+        self.search_keys.pop(preset, None)
+        self.by_name[updated.key] = updated
+        model_index = self.index(row)
+        self.dataChanged.emit(model_index, model_index)
+        return row
+
+    def remove(self, preset):
+        self.store.delete(preset)
+        row = self.row_of(preset)
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.presets[row]
+        self.by_name.pop(preset.key, None)
+        self.search_keys.pop(preset, None)
+        self.endRemoveRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.presets)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self.presets):
+            return None
+        preset = self.presets[index.row()]
+        if role == Qt.DisplayRole:
+            return preset.display_text()
+        if role in (Qt.UserRole, Qt.ToolTipRole):
+            return preset.serialize()
+        return None
+
+
+class PresetFilterProxyModel(QSortFilterProxyModel):
+    # Every query token has to start one of the preset's search tokens ("ak y5" matches ak74 at Y 5).
+    # A new query re-filters all rows in one pass, so the view lays out once instead of per row.
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.tokens = ()
+
+    def set_query(self, query):
+        tokens = tuple(' ' + token for token in query.lower().replace(':', '').split())
+        if tokens != self.tokens:
+            self.tokens = tokens
+            self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        tokens = self.tokens
+        if not tokens:
+            return True
+        key = self.sourceModel().search_key(source_row)
+        for token in tokens:
+            if token not in key:
+                return False
+        return True
+
+
+# Built-in themes; every theme defines the same five colors
+PRESET_THEMES = {
+    "default": {
+        "background": "#e6e6e6", "primary": "#007BFF", "secondary": "#0056b3", "accent": "#0056b3", "text": "#ffffff"
+    },
+    "gruvbox dark": {
+        "background": "#282828", "primary": "#fabd2f", "secondary": "#83a598", "accent": "#b16286", "text": "#ffffff"
+    },
+    "serika dark": {
+        "background": "#3a3a3a", "primary": "#e2b714", "secondary": "#4d4d4d", "accent": "#8c7851", "text": "#ffffff"
+    },
+    "serika": {
+        "background": "#e2d3ba", "primary": "#323437", "secondary": "#e2b714", "accent": "#3e424d", "text": "#282828"
+    },
+    "catpuccin mocha": {
+        "background": "#1E1E2E", "primary": "#CDD6F4", "secondary": "#F5A97F", "accent": "#89b4fa", "text": "#a6accd"
+    },
+    "milkshake": {
+        "background": "#f2e7c9", "primary": "#6e4a4a", "secondary": "#c6aa8e", "accent": "#a67358", "text": "#38220f"
+    },
+    "cafe": {
+        "background": "#2e1f1c", "primary": "#c0a36e", "secondary": "#a67358", "accent": "#805b36", "text": "#f3e9dc"
+    },
+    "blueberry light": {
+        "background": "#d8e2ef", "primary": "#3c4c5e", "secondary": "#528bff", "accent": "#6b8dd6", "text": "#1c283b"
+    },
+    "cheesecake": {
+        "background": "#f4e0d3", "primary": "#5a4a42", "secondary": "#c6aa8e", "accent": "#805b36", "text": "#38220f"
+    },
+    "honey": {
+        "background": "#FFF8E1", "primary": "#FFC107", "secondary": "#FFB300", "accent": "#FFD54F", "text": "#795548"
+    },
+    "starclass": {
+        "background": "#D4E9E2", "primary": "#00704A", "secondary": "#005241", "accent": "#A5D6A7", "text": "#3E2723"
+    },
+    "TMO": {
+        "background": "#A7DBC8", "primary": "#59CE8F", "secondary": "#507C7E", "accent": "#A1E8AF", "text": "#3A4042"
+    },
+    "hot chocolate": {
+        "background": "#FFF4E6", "primary": "#8C5E58", "secondary": "#AA8073", "accent": "#D3A99A", "text": "#5A3B35"
+    },
+    "nene": {
+        "background": "#E0F7FA", "primary": "#4DD0E1", "secondary": "#26C6DA", "accent": "#B2EBF2", "text": "#00838F"
+    },
+    "nocto": {
+        "background": "#f5f5f5", "primary": "#424242", "secondary": "#bdbdbd", "accent": "#e0e0e0", "text": "#212121"
+    },
+}
+
+
+@functools.lru_cache(maxsize=64)
+def build_theme_stylesheet(theme_colors, compact, ui_font):
+    # `theme_colors` is a sorted tuple of color items, so the QSS is memoized per theme, layout and font
+    colors = dict(theme_colors)
+    background = QColor(colors['background'])
+    text_color = QColor(colors['text'])
+    primary = QColor(colors['primary'])
+    secondary = QColor(colors['secondary'])
+    accent = QColor(colors['accent'])
+
+    is_dark = background.lightness() < 128
+    panel_color = background.lighter(112) if is_dark else background.darker(104)
+    input_color = background.lighter(107) if is_dark else background.darker(108)
+    tab_idle = background.lighter(120) if is_dark else background.darker(103)
+    border_color = secondary.lighter(120) if is_dark else secondary.darker(110)
+    subtle_text = text_color.lighter(135) if is_dark else text_color.darker(145)
+    hover_color = accent.lighter(110) if is_dark else accent.darker(110)
+    pressed_color = accent.darker(110) if is_dark else accent.darker(125)
+
+    def rgba(color, alpha):
+        return f"rgba({color.red()}, {color.green()}, {color.blue()}, {alpha})"
+
+    compact_css = ""
+    if compact:
+        compact_css = """
+        QWidget {
+            font-size: 8.5pt;
+        }
+        QLabel {
+            margin: 0px;
+        }
+        QGroupBox {
+            margin-top: 4px;
+            padding: 12px 7px 6px 7px;
+            border-radius: 9px;
+        }
+        QGroupBox::title {
+            left: 6px;
+            top: 1px;
+            padding: 0 3px;
+        }
+        QPushButton {
+            padding: 4px 7px;
+            border-radius: 7px;
+            font-weight: 500;
+        }
+        QLineEdit, QPlainTextEdit, QListView, QComboBox {
+            padding: 3px 5px;
+            border-radius: 7px;
+        }
+        QTabBar::tab {
+            padding: 4px 8px;
+            margin-right: 3px;
+            min-width: 0px;
+            border-radius: 7px;
+        }
+        QPlainTextEdit#scriptEditor, QPlainTextEdit#logOutput, QPlainTextEdit#infoOutput {
+            border-radius: 8px;
+            padding: 5px;
+        }
+        """
+    return f"""
+        QMainWindow {{
+            background-color: {colors['background']};
+            color: {colors['text']};
+            font-family: '{ui_font}';
+        }}
+        QWidget {{
+            color: {colors['text']};
+        }}
+        QToolTip {{
+            color: {colors['text']};
+            background: {rgba(panel_color, 240)};
+            border: 1px solid {border_color.name()};
+            border-radius: 8px;
+            padding: 6px 8px;
+        }}
+        QTabWidget::pane {{
+            border: none;
+            background: transparent;
+            margin-top: 8px;
+        }}
+        QTabBar {{
+            qproperty-drawBase: 0;
+        }}
+        QTabBar::tab {{
+            background: {tab_idle.name()};
+            color: {subtle_text.name()};
+            border: 1px solid transparent;
+            border-radius: 10px;
+            padding: 8px 14px;
+            margin-right: 6px;
+            margin-bottom: 2px;
+            min-width: 72px;
+        }}
+        QTabBar::tab:hover {{
+            color: {colors['text']};
+            border: 1px solid {rgba(border_color, 170)};
+        }}
+        QTabBar::tab:selected {{
+            background: {panel_color.name()};
+            color: {colors['text']};
+            border: 1px solid {border_color.name()};
+        }}
+        QGroupBox {{
+            background: {panel_color.name()};
+            border: 1px solid {rgba(border_color, 175)};
+            border-radius: 12px;
+            margin-top: 6px;
+            padding: 16px 12px 10px 12px;
+        }}
+        QGroupBox::title {{
+            subcontrol-origin: padding;
+            subcontrol-position: top left;
+            left: 10px;
+            top: 1px;
+            padding: 0 4px;
+            color: {subtle_text.name()};
+            background: transparent;
+        }}
+        QPushButton {{
+            background-color: {rgba(primary, 70)};
+            color: {colors['text']};
+            border: 1px solid {rgba(border_color, 170)};
+            border-radius: 10px;
+            padding: 7px 13px;
+            margin: 1px;
+            font-weight: 600;
+        }}
+        QPushButton:hover {{
+            background-color: {rgba(hover_color, 100)};
+            border: 1px solid {hover_color.name()};
+        }}
+        QPushButton:pressed {{
+            background-color: {rgba(pressed_color, 120)};
+        }}
+        QLineEdit, QPlainTextEdit, QListView, QComboBox {{
+            background: {input_color.name()};
+            border: 1px solid {rgba(border_color, 180)};
+            border-radius: 10px;
+            padding: 6px 8px;
+            color: {colors['text']};
+            selection-background-color: {rgba(accent, 140)};
+        }}
+        QLineEdit:focus, QPlainTextEdit:focus, QListView:focus, QComboBox:focus {{
+            border: 1px solid {accent.name()};
+        }}
+        QComboBox::drop-down {{
+            border: none;
+            width: 20px;
+        }}
+        QListView::item {{
+            border-radius: 6px;
+            padding: 4px 6px;
+        }}
+        QListView::item:selected {{
+            background: {rgba(accent, 120)};
+            color: {colors['text']};
+        }}
+        QListView#presetList {{
+            padding: 6px;
+        }}
+        QListView#presetList::item {{
+            margin: 3px 2px;
+            padding: 8px 10px;
+            border: 1px solid {rgba(border_color, 120)};
+            border-radius: 8px;
+        }}
+        QListView#presetList::item:hover {{
+            background: {rgba(accent, 70)};
+            border: 1px solid {rgba(accent, 140)};
+        }}
+        QListView#presetList::item:selected {{
+            background: {rgba(accent, 120)};
+            border: 1px solid {accent.name()};
+        }}
+        QSlider::groove:horizontal {{
+            border: 1px solid {rgba(border_color, 170)};
+            height: 8px;
+            background: {rgba(secondary, 85)};
+            margin: 2px 0;
+            border-radius: 4px;
+        }}
+        QSlider::handle:horizontal {{
+            background: {accent.name()};
+            border: 1px solid {rgba(border_color, 220)};
+            width: 16px;
+            margin: -2px 0;
+            border-radius: 8px;
+        }}
+        QCheckBox {{
+            spacing: 6px;
+            color: {colors['text']};
+        }}
+        QCheckBox::indicator {{
+            width: 16px;
+            height: 16px;
+            border-radius: 4px;
+            border: 1px solid {rgba(border_color, 180)};
+            background: {input_color.name()};
+        }}
+        QCheckBox::indicator:checked {{
+            background: {accent.name()};
+            border: 1px solid {accent.name()};
+        }}
+        QLabel {{
+            color: {colors['text']};
+        }}
+        QPlainTextEdit#scriptEditor, QPlainTextEdit#logOutput, QPlainTextEdit#infoOutput {{
+            border-radius: 12px;
+            padding: 8px;
+        }}
+        QScrollBar:vertical {{
+            background: transparent;
+            width: 10px;
+            margin: 4px;
+        }}
+        QScrollBar::handle:vertical {{
+            background: {rgba(border_color, 180)};
+            min-height: 28px;
+            border-radius: 5px;
+        }}
+        QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {{
+            height: 0px;
+        }}
+        QScrollBar:horizontal {{
+            background: transparent;
+            height: 10px;
+            margin: 4px;
+        }}
+        QScrollBar::handle:horizontal {{
+            background: {rgba(border_color, 180)};
+            min-width: 28px;
+            border-radius: 5px;
+        }}
+        QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {{
+            width: 0px;
+        }}
+        {compact_css}
+    """
+
+
+class CorelDaemonTimeout(RuntimeError):
+    pass
+
+
+class CorelDaemonUnavailable(RuntimeError):
+    pass
+
+
+class CorelCompilerDaemon:
+    # Client for `corel serve`: one resident compiler process answering framed requests over
+    # stdin/stdout, restarted transparently if it exits.
+    # Pipe reads cannot time out on Windows, so a watchdog thread kills a daemon that leaves a request
+    # unanswered for REQUEST_TIMEOUT seconds; the blocked read then fails and the next request starts a new one.
+    REQUEST_HEADER = struct.Struct('<BBHI')
+    RESPONSE_HEADER = struct.Struct('<BxxxII')
+    REQUEST_TIMEOUT = 5.0
+
+    def __init__(self, executable_path):
+        self.executable_path = executable_path
+        self.process = None
+        self.lock = threading.Lock()
+        # Guards the request deadline shared with the watchdog
+        self.watchdog = threading.Condition()
+        self.deadline = None
+        self.timed_out = False
+        self.closed = False
+
+    def start(self):
+        if self.closed:
+            raise CorelDaemonUnavailable("Corel compiler daemon was shut down")
+        if self.process is not None and self.process.poll() is None:
+            return
+        self.stop()
+        self.timed_out = False
+        self.process = subprocess.Popen(
+            [self.executable_path, "serve"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+        )
+        threading.Thread(target=self.watch, args=(self.process,), daemon=True).start()
+
+    def watch(self, process):
+        with self.watchdog:
+            while self.process is process:
+                if self.deadline is None:
+                    self.watchdog.wait()
+                    continue
+                remaining = self.deadline - time.monotonic()
+                if remaining > 0:
+                    self.watchdog.wait(remaining)
+                    continue
+                self.timed_out = True
+                process.kill()
+                return
+
+    def terminate(self):
+        # Shutdown path; never waits for the lock, so a compile stuck on a hung daemon cannot block it.
+        # That compile fails once the process is killed, and no new daemon is started.
+        self.closed = True
+        if self.lock.acquire(blocking=False):
+            try:
+                self.stop()
+            finally:
+                self.lock.release()
+            return
+        process = self.process
+        if process is not None:
+            process.kill()
+
+    def stop(self):
+        process = self.process
+        with self.watchdog:
+            self.process = None
+            self.watchdog.notify()
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+            process.wait(timeout=1)
+        except Exception:
+            process.kill()
+        finally:
+            process.stdout.close()
+
+    def read_exact(self, length):
+        data = self.process.stdout.read(length)
+        if len(data) != length:
+            raise EOFError("Corel compiler daemon closed its output")
+        return data
+
+    def compile(self, source, output_format=COREL_FORMAT_BINARY, opt_level=COREL_OPT_LEVEL, max_loop_depth=COREL_MAX_LOOP_DEPTH):
+        with self.lock:
+            # A dead daemon gets one restart per request before the caller falls back.
+            for attempt in range(2):
+                try:
+                    self.start()
+                    with self.watchdog:
+                        self.deadline = time.monotonic() + self.REQUEST_TIMEOUT
+                        self.watchdog.notify()
+                    try:
+                        self.process.stdin.write(
+                            self.REQUEST_HEADER.pack(output_format, opt_level, max_loop_depth, len(source)) + source
+                        )
+                        self.process.stdin.flush()
+                        status, ast_length, diagnostics_length = self.RESPONSE_HEADER.unpack(
+                            self.read_exact(self.RESPONSE_HEADER.size)
+                        )
+                        ast_bytes = self.read_exact(ast_length)
+                        diagnostics = self.read_exact(diagnostics_length).decode('utf-8', errors='replace')
+                    finally:
+                        with self.watchdog:
+                            self.deadline = None
+                    break
+                except (OSError, EOFError, ValueError) as exc:
+                    timed_out = self.timed_out
+                    self.stop()
+                    if timed_out:
+                        # Retrying would most likely hang again on the same script
+                        raise CorelDaemonTimeout(
+                            f"Corel compiler daemon did not answer within {self.REQUEST_TIMEOUT:g} s"
+                        )
+                    if self.closed:
+                        raise CorelDaemonUnavailable("Corel compiler daemon was shut down")
+                    if attempt:
+                        raise CorelDaemonUnavailable(f"Corel compiler daemon failed: {exc}")
+
+        if status != 0:
+            raise RuntimeError(f"Corel compiler daemon rejected the script: {diagnostics}")
+        return ast_bytes
+
+
+class ScriptRuntimeCache:
+    # Compiled script entries keyed by absolute path. Safe to use from any thread: compiles of the
+    # same file version are single-flight, and the total size (bytecode instructions, about one per
+    # AST node) is bounded by evicting the least recently used entries.
+    DEFAULT_MAX_SIZE = 500000
+
+    def __init__(self, executor, compile_entry, on_compiled=None, max_size=DEFAULT_MAX_SIZE):
+        # compile_entry(path, mtime) returns an entry dict with 'mtime' and 'size'; on_compiled(path, error)
+        # is called on the compiling thread, so callers marshal it onto the GUI thread themselves.
+        self.executor = executor
+        self.compile_entry = compile_entry
+        self.on_compiled = on_compiled
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.jobs = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+    def submit(self, script_path):
+        # Returns a future for the entry; fresh entries resolve immediately and in-flight compiles are shared.
+        abs_script_path = os.path.abspath(script_path)
+        try:
+            mtime = os.path.getmtime(abs_script_path)
+        except OSError as exc:
+            future = Future()
+            future.set_exception(exc)
+            return future
+
+        with self.lock:
+            entry = self.entries.get(abs_script_path)
+            if entry is not None and entry['mtime'] == mtime:
+                self.entries.move_to_end(abs_script_path)
+                self.hits += 1
+                future = Future()
+                future.set_result(entry)
+                return future
+
+            job = self.jobs.get(abs_script_path)
+            if job is not None and job[0] == mtime:
+                self.hits += 1
+                return job[1]
+
+            self.misses += 1
+            future = self.executor.submit(self.compile_and_store, abs_script_path, mtime)
+            self.jobs[abs_script_path] = (mtime, future)
+        future.add_done_callback(lambda done: self.finish(abs_script_path, done))
+        return future
+
+    def compile_and_store(self, abs_script_path, mtime):
+        entry = self.compile_entry(abs_script_path, mtime)
+        self.put(abs_script_path, entry)
+        return entry
+
+    def finish(self, abs_script_path, future):
+        with self.lock:
+            job = self.jobs.get(abs_script_path)
+            if job is not None and job[1] is future:
+                del self.jobs[abs_script_path]
+        if future.cancelled() or self.on_compiled is None:
+            return
+        error = future.exception()
+        self.on_compiled(abs_script_path, str(error) if error is not None else "")
+
+    def put(self, script_path, entry):
+        abs_script_path = os.path.abspath(script_path)
+        with self.lock:
+            current = self.entries.get(abs_script_path)
+            if current is not None:
+                # A slower compile of an older file version must not replace a newer entry.
+                if current['mtime'] > entry['mtime']:
+                    return
+                self.size -= current['size']
+            self.entries[abs_script_path] = entry
+            self.entries.move_to_end(abs_script_path)
+            self.size += entry['size']
+            while self.size > self.max_size and len(self.entries) > 1:
+                _path, evicted = self.entries.popitem(last=False)
+                self.size -= evicted['size']
+                self.evictions += 1
+
+    def discard(self, script_path):
+        with self.lock:
+            entry = self.entries.pop(os.path.abspath(script_path), None)
+            if entry is not None:
+                self.size -= entry['size']
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def __contains__(self, script_path):
+        with self.lock:
+            return os.path.abspath(script_path) in self.entries
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'size': self.size,
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+class ScriptDiskCache:
+    # Compiled scripts (binary AST plus lowered bytecode) kept on disk under a hash of the source keyed
+    # by the compiler fingerprint, so restarts, copied files and touched files reuse earlier compiles.
+    # Files are replaced atomically and the least recently used are deleted past max_bytes.
+    FORMAT_VERSION = 1
+    SUFFIX = '.corelc'
+    DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+    def __init__(self, directory, fingerprint, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.fingerprint = fingerprint
+        self.max_bytes = max_bytes
+        # path -> ((mtime_ns, size), key), so unchanged files are not read and hashed again
+        self.index = {}
+        self.lock = threading.Lock()
+
+    def source_key(self, source):
+        return hashlib.blake2b(source, digest_size=16, key=self.fingerprint).hexdigest()
+
+    def key_for(self, path):
+        # Returns (key, source); source is None when the stat matched the index and the file was not read.
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self.lock:
+            record = self.index.get(path)
+        if record is not None and record[0] == signature:
+            return record[1], None
+
+        with open(path, 'rb') as file:
+            source = file.read()
+        key = self.source_key(source)
+        with self.lock:
+            self.index[path] = (signature, key)
+        return key, source
+
+    def artifact_path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def load(self, key):
+        path = self.artifact_path(key)
+        try:
+            with open(path, 'rb') as file:
+                version, ast_bytes, code, recovery = marshal.load(file)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if version != self.FORMAT_VERSION:
+            return None
+        try:
+            # The modification time doubles as the last-used time for cleanup
+            os.utime(path)
+        except OSError:
+            pass
+        return ast_bytes, code, recovery
+
+    def store(self, key, ast_bytes, code, recovery):
+        os.makedirs(self.directory, exist_ok=True)
+        data = marshal.dumps((self.FORMAT_VERSION, ast_bytes, code, recovery))
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(temp_path, self.artifact_path(key))
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        self.cleanup()
+
+    def cleanup(self):
+        artifacts = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(self.SUFFIX):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    artifacts.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        except OSError:
+            return
+
+        for _mtime, size, path in sorted(artifacts):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+HOTKEY_MODIFIER_BITS = {keyboard.Key.ctrl: 1, keyboard.Key.alt: 2, keyboard.Key.shift: 4, keyboard.Key.cmd: 8}
+
+
+class InputHub:
+    # Owns the global keyboard and mouse hooks for the life of the window. Hotkeys are matched against
+    # a precompiled table {key: {modifier mask: (hotkey, script_path)}}: one dict lookup on the key and
+    # one on the held modifiers, however many bindings there are. set_bindings swaps the whole table in
+    # one assignment, so rebinding never reinstalls a hook and a keypress sees either the old or new table.
+    def __init__(self, on_hotkey, on_click, on_hotkey_release=None):
+        # Callbacks run on the hook threads and must only hand work off. on_hotkey(hotkey, script_path) fires
+        # on press; on_hotkey_release gets the same arguments when that hotkey's key comes back up.
+        self.on_hotkey = on_hotkey
+        self.on_hotkey_release = on_hotkey_release
+        self.on_click = on_click
+        self.table = {}
+        # Raw modifier key -> its bit. Left and right keys are tracked separately, so releasing one Ctrl
+        # while the other is still down keeps ctrl in the mask.
+        self.modifier_keys = {}
+        self.modifiers = 0
+        # Non-modifier keys currently down, so key auto-repeat does not fire a hotkey again
+        self.held = set()
+        # Key -> the bindings it fired, until the key is released
+        self.fired = {}
+        self.keyboard_listener = None
+        self.mouse_listener = None
+
+    def start(self):
+        self.keyboard_listener = keyboard.Listener(on_press=self.on_press, on_release=self.on_release)
+        self.mouse_listener = mouse.Listener(on_click=self.on_click)
+        self.keyboard_listener.start()
+        self.mouse_listener.start()
+
+    def stop(self):
+        for listener in (self.keyboard_listener, self.mouse_listener):
+            if listener is not None:
+                listener.stop()
+        self.keyboard_listener = None
+        self.mouse_listener = None
+
+    @staticmethod
+    def compile_bindings(bindings):
+        # Returns the lookup table and the (hotkey, error) pairs that could not be parsed.
+        table = {}
+        invalid = []
+        for hotkey, script_path in bindings.items():
+            try:
+                keys = keyboard.HotKey.parse(hotkey)
+            except ValueError as exc:
+                invalid.append((hotkey, f"invalid hotkey syntax: {exc}"))
+                continue
+            mask = 0
+            triggers = []
+            for key in keys:
+                bit = HOTKEY_MODIFIER_BITS.get(key)
+                if bit is None:
+                    triggers.append(key)
+                else:
+                    mask |= bit
+            if len(triggers) != 1:
+                invalid.append((hotkey, "a hotkey needs exactly one non-modifier key"))
+                continue
+            table.setdefault(triggers[0], {})[mask] = (hotkey, script_path)
+        return table, invalid
+
+    def set_bindings(self, bindings):
+        table, invalid = self.compile_bindings(bindings)
+        self.table = table
+        return invalid
+
+    def canonical(self, key):
+        listener = self.keyboard_listener
+        return listener.canonical(key) if listener is not None else key
+
+    def update_modifiers(self):
+        mask = 0
+        for bit in self.modifier_keys.values():
+            mask |= bit
+        self.modifiers = mask
+
+    def fire(self, key):
+        # Fires the binding for key under the current modifiers, once per press of key, so a hotkey
+        # matches whether its modifiers went down before or after the key itself.
+        masks = self.table.get(key)
+        if masks is None:
+            return
+        match = masks.get(self.modifiers)
+        if match is None:
+            return
+        fired = self.fired.setdefault(key, [])
+        if match in fired:
+            return
+        fired.append(match)
+        self.on_hotkey(*match)
+
+    def on_press(self, raw_key):
+        key = self.canonical(raw_key)
+        bit = HOTKEY_MODIFIER_BITS.get(key)
+        if bit is not None:
+            if raw_key in self.modifier_keys:
+                return
+            self.modifier_keys[raw_key] = bit
+            self.update_modifiers()
+            for held_key in tuple(self.held):
+                self.fire(held_key)
+            return
+        if key in self.held:
+            return
+        self.held.add(key)
+        self.fire(key)
+
+    def on_release(self, raw_key):
+        key = self.canonical(raw_key)
+        if HOTKEY_MODIFIER_BITS.get(key) is not None:
+            if self.modifier_keys.pop(raw_key, None) is not None:
+                self.update_modifiers()
+            return
+        self.held.discard(key)
+        if self.on_hotkey_release is not None:
+            for match in self.fired.pop(key, ()):
+                self.on_hotkey_release(*match)
+        else:
+            self.fired.pop(key, None)
+
+
 class ModMenu(QMainWindow):
     # Define signals
     start_recoil_signal = pyqtSignal()
     stop_recoil_signal = pyqtSignal()
-    run_script_signal = pyqtSignal(str, str)
+    run_script_signal = pyqtSignal(str, str, str)
     inprocess_finished_signal = pyqtSignal(bool, str)
+    script_run_outcome_signal = pyqtSignal(str, str)
+    script_compiled_signal = pyqtSignal(str, str)
+    script_compile_ready_signal = pyqtSignal(str, object)
+    script_search_indexed_signal = pyqtSignal()
 
     def __init__(self, app):
         super().__init__()
         self.app = app
         self.project_root = os.path.dirname(os.path.abspath(__file__))
         self.presets_file = os.path.join(self.project_root, 'presets.txt')
+        self.presets_db_file = os.path.join(self.project_root, 'presets.db')
         self.theme_preferences_file = os.path.join(self.project_root, 'theme_preferences.json')
         self.custom_theme_file = os.path.join(self.project_root, 'custom_theme.json')
         self.script_bindings_file = os.path.join(self.project_root, 'script_bindings.json')
@@ -294,21 +1884,72 @@ class ModMenu(QMainWindow):
         self.recoil_activation_mode = "both"
         self.current_script_path = None
         self.corel_process = None
-        self.hotkey_listener = None
         self.script_bindings = {}
-        self.script_runtime_cache = {}
+        # Hotkey -> run policy of that binding; bindings with the default policy have no entry
+        self.binding_run_policies = {}
+        # Hotkey -> Event set while that 'hold' binding's key is down; only touched on the hook thread
+        self.hotkey_held_events = {}
+        self.input_hub = InputHub(self.on_hotkey_pressed, self.on_global_click, self.on_hotkey_released)
         self.corel_runtime_module = None
+        self.script_run_scheduler = None
+        self.script_run_scheduler_lock = threading.Lock()
+        self.recoil_input_backend = None
+        self.recoil_input_backend_error = None
+        self.corel_compiler_library = None
+        self.corel_compiler_library_error = None
+        # Compile-pool and prewarm threads may ask for the library at once; only one of them builds and loads it
+        self.corel_compiler_library_lock = threading.Lock()
+        self.corel_compiler_daemon = None
+        self.corel_compiler_daemon_error = None
+        self.corel_compiler_daemon_lock = threading.Lock()
+        self.script_disk_cache = None
+        self.script_disk_cache_lock = threading.Lock()
+        # Compiles run here so the editor and hotkeys never wait on the compiler
+        self.script_compile_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='corel-compile')
+        self.script_runtime_cache = ScriptRuntimeCache(
+            self.script_compile_executor,
+            self.compile_script_entry,
+            on_compiled=self.script_compiled_signal.emit
+        )
         self.active_theme_colors = None
+        self.applied_stylesheet = None
+        self.saved_theme_name = None
         self.full_tab_names = ['Recoil', 'Configs', 'Scripts', 'Themes', 'Options']
         self.compact_tab_names = ['Rc', 'Cfg', 'Scr', 'Th', 'Opt']
-        self.script_running_inprocess = False
-        self.script_state_lock = threading.Lock()
+
+        # Handlers only mark sections dirty; refresh_dirty_ui redraws them at most once per frame,
+        # in this order (the info panel repeats the recoil state)
+        self.ui_sections = (
+            ('recoil_labels', self.refresh_recoil_slider_labels),
+            ('recoil_state', self.refresh_recoil_runtime_label),
+            ('recoil_info', self.refresh_recoil_info_panel),
+            ('preset_summary', self.refresh_preset_summary_label),
+            ('runtime_summary', self.refresh_runtime_summary),
+        )
+        self.ui_dirty_sections = set()
+        self.ui_widget_texts = {}
+        self.ui_refresh_timer = QTimer(self)
+        self.ui_refresh_timer.setSingleShot(True)
+        self.ui_refresh_timer.setInterval(16)
+        self.ui_refresh_timer.timeout.connect(self.refresh_dirty_ui)
 
         # Connect signals
         self.start_recoil_signal.connect(self.start_recoil)
         self.stop_recoil_signal.connect(self.stop_recoil)
         self.run_script_signal.connect(self.run_script_from_hotkey)
         self.inprocess_finished_signal.connect(self.on_inprocess_script_finished)
+        self.script_run_outcome_signal.connect(self.on_script_run_outcome)
+        self.script_compiled_signal.connect(self.on_script_compiled)
+        self.script_compile_ready_signal.connect(self.start_compiled_script)
+
+        self.script_library_index = ScriptLibraryIndex(self.project_root, self)
+        self.script_search_index = ScriptSearchIndex()
+        self.script_compile_status = {}
+        self.script_search_indexed_signal.connect(self.on_script_search_indexed)
+        self.script_library_index.scripts_changed.connect(self.on_script_library_changed)
+        self.script_library_index.script_modified.connect(self.on_script_file_modified)
+
+        self.preset_model = PresetListModel(self.open_preset_store(), self)
 
         self.initUI()
         self.load_presets()
@@ -330,9 +1971,11 @@ class ModMenu(QMainWindow):
         self.ui_stats_timer.start(1500)
         self.update_runtime_summary()
 
-        # Start the mouse listener
-        self.listener = mouse.Listener(on_click=self.on_global_click)
-        self.listener.start()
+        # Install the global hooks once; binding changes only swap the hub's hotkey table
+        try:
+            self.input_hub.start()
+        except Exception as exc:
+            self.append_script_output(f"Failed to start input hooks: {exc}")
 
     def initUI(self):
         if self.app is None:
@@ -374,7 +2017,6 @@ class ModMenu(QMainWindow):
         self.createScriptsTab(script_tab)
         self.createThemesTab(themes_tab)
         self.createOptionsTab(options_tab)
-        self.apply_global_styles()
         self.apply_tooltips()
         self.apply_editor_fonts()
         self.apply_compact_layout_state()
@@ -386,7 +2028,7 @@ class ModMenu(QMainWindow):
         self.update_editor_status_labels()
         self.update_recoil_runtime_label()
         self.update_recoil_info_panel()
-        self.refresh_script_library_list()
+        self.script_library_index.start()
         self.show()
 
     def createRecoilTab(self, parent_widget):
@@ -483,7 +2125,11 @@ class ModMenu(QMainWindow):
         filter_label = QLabel("Filter:")
         self.preset_filter_input = QLineEdit()
         self.preset_filter_input.setPlaceholderText("type to filter presets")
-        self.preset_filter_input.textChanged.connect(self.filter_preset_list)
+        self.preset_filter_input.textChanged.connect(self.schedule_preset_filter)
+        self.preset_filter_timer = QTimer(self)
+        self.preset_filter_timer.setSingleShot(True)
+        self.preset_filter_timer.setInterval(120)
+        self.preset_filter_timer.timeout.connect(self.apply_preset_filter)
         filter_row.addWidget(filter_label)
         filter_row.addWidget(self.preset_filter_input)
         layout.addLayout(filter_row)
@@ -506,10 +2152,14 @@ class ModMenu(QMainWindow):
         actions_row.addWidget(self.duplicate_preset_button)
         layout.addLayout(actions_row)
 
-        self.preset_list = QListWidget()
+        self.preset_list = QListView()
         self.preset_list.setObjectName("presetList")
-        self.preset_list.itemSelectionChanged.connect(self.update_preset_summary_label)
-        self.preset_list.itemDoubleClicked.connect(lambda _item: self.load_preset())
+        self.preset_list.setUniformItemSizes(True)
+        self.preset_filter_model = PresetFilterProxyModel(self)
+        self.preset_filter_model.setSourceModel(self.preset_model)
+        self.preset_list.setModel(self.preset_filter_model)
+        self.preset_list.selectionModel().currentChanged.connect(lambda *_args: self.update_preset_summary_label())
+        self.preset_list.doubleClicked.connect(lambda _index: self.load_preset())
         layout.addWidget(self.preset_list)
 
         transfer_row = QHBoxLayout()
@@ -551,11 +2201,22 @@ class ModMenu(QMainWindow):
         library_layout.setContentsMargins(0, 0, 0, 0)
         library_layout.setSpacing(6)
         self.script_search_input = QLineEdit()
-        self.script_search_input.setPlaceholderText("Search .corel scripts")
-        self.script_search_input.textChanged.connect(self.refresh_script_library_list)
+        self.script_search_input.setPlaceholderText("Search scripts (press:f, trigger:k, loop>10)")
+        self.script_search_input.textChanged.connect(self.schedule_script_library_filter)
         library_layout.addWidget(self.script_search_input)
-        self.script_library_list = QListWidget()
-        self.script_library_list.itemDoubleClicked.connect(self.open_script_from_library_item)
+        # Filtering waits for a pause in typing instead of running on every keystroke
+        self.script_filter_timer = QTimer(self)
+        self.script_filter_timer.setSingleShot(True)
+        self.script_filter_timer.setInterval(120)
+        self.script_filter_timer.timeout.connect(self.apply_script_library_filter)
+        self.script_library_model = ScriptLibraryModel(
+            self.project_root, self, search=self.script_search_index.search, details=self.describe_library_script
+        )
+        self.script_library_list = QListView()
+        self.script_library_list.setModel(self.script_library_model)
+        self.script_library_list.setUniformItemSizes(True)
+        self.script_library_list.setEditTriggers(QListView.NoEditTriggers)
+        self.script_library_list.doubleClicked.connect(self.open_script_from_library_index)
         library_layout.addWidget(self.script_library_list, 1)
 
         library_buttons = QHBoxLayout()
@@ -655,12 +2316,21 @@ class ModMenu(QMainWindow):
         self.bind_file_script_button.clicked.connect(self.bind_script_file_hotkey)
         self.remove_binding_button = QPushButton('Remove Selected')
         self.remove_binding_button.clicked.connect(self.remove_selected_script_binding)
+        self.binding_policy_label = QLabel("On retrigger:")
+        self.binding_policy_combo = QComboBox()
+        self.binding_policy_combo.addItems(RUN_POLICY_LABELS.values())
+        self.binding_policy_combo.setEnabled(False)
+        self.binding_policy_combo.activated.connect(self.set_selected_binding_policy)
         bindings_actions.addWidget(self.bind_file_script_button)
         bindings_actions.addWidget(self.remove_binding_button)
+        bindings_actions.addStretch()
+        bindings_actions.addWidget(self.binding_policy_label)
+        bindings_actions.addWidget(self.binding_policy_combo)
         bindings_layout.addLayout(bindings_actions)
 
         self.script_binding_list = QListWidget()
         self.script_binding_list.itemDoubleClicked.connect(self.open_script_from_binding_item)
+        self.script_binding_list.currentItemChanged.connect(self.on_binding_selection_changed)
         bindings_layout.addWidget(self.script_binding_list, 1)
 
         script_output_tab = QWidget()
@@ -709,13 +2379,13 @@ class ModMenu(QMainWindow):
 
         actions_group = QGroupBox("Quick Actions")
         actions_layout = QHBoxLayout(actions_group)
-        self.restart_hotkeys_button = QPushButton("Restart Hotkeys")
-        self.restart_hotkeys_button.clicked.connect(self.restart_hotkey_listener)
+        self.check_bindings_button = QPushButton("Check Bindings")
+        self.check_bindings_button.clicked.connect(self.check_script_bindings)
         self.open_project_button = QPushButton("Open BASO Folder")
         self.open_project_button.clicked.connect(self.open_project_folder)
         self.clear_cache_button = QPushButton("Clear AST Cache")
         self.clear_cache_button.clicked.connect(self.clear_script_runtime_cache)
-        actions_layout.addWidget(self.restart_hotkeys_button)
+        actions_layout.addWidget(self.check_bindings_button)
         actions_layout.addWidget(self.open_project_button)
         actions_layout.addWidget(self.clear_cache_button)
         layout.addWidget(actions_group)
@@ -725,47 +2395,6 @@ class ModMenu(QMainWindow):
         layout.addWidget(self.runtime_summary_label)
         layout.addStretch()
 
-    def apply_global_styles(self):
-        self.setStyleSheet("""
-            QWidget {
-                font-size: 10pt;
-            }
-            QGroupBox {
-                border: 1px solid rgba(120, 120, 120, 140);
-                border-radius: 12px;
-                margin-top: 6px;
-                padding: 16px 12px 10px 12px;
-            }
-            QGroupBox::title {
-                subcontrol-origin: padding;
-                subcontrol-position: top left;
-                left: 10px;
-                top: 1px;
-                padding: 0 4px;
-            }
-            QPushButton {
-                border-radius: 10px;
-                padding: 7px 13px;
-            }
-            QLineEdit, QPlainTextEdit, QListWidget, QComboBox {
-                border-radius: 10px;
-                padding: 6px 8px;
-            }
-            QSlider::groove:horizontal {
-                height: 8px;
-                border-radius: 4px;
-            }
-            QSlider::handle:horizontal {
-                width: 16px;
-                margin: -2px 0;
-                border-radius: 8px;
-            }
-            QCheckBox::indicator {
-                width: 16px;
-                height: 16px;
-            }
-        """)
-
     def setup_font_preferences(self):
         self.ui_font_family = self.pick_font_family(
             ["Inter", "IBM Plex Sans", "Segoe UI", "Noto Sans", "Arial"],
@@ -803,7 +2432,10 @@ class ModMenu(QMainWindow):
         compact = bool(self.compact_mode)
         ui_size = 9 if compact else 10
         if self.app is not None:
-            self.app.setFont(QFont(self.ui_font_family, ui_size))
+            # Setting the application font restyles every widget, even if the font is the same
+            ui_font = QFont(self.ui_font_family, ui_size)
+            if self.app.font() != ui_font:
+                self.app.setFont(ui_font)
         self.apply_editor_fonts(9 if compact else 10)
 
         if hasattr(self, 'central_layout') and self.central_layout is not None:
@@ -877,8 +2509,8 @@ class ModMenu(QMainWindow):
             self.open_project_button.setVisible(not compact)
         if hasattr(self, 'clear_cache_button') and self.clear_cache_button is not None:
             self.clear_cache_button.setText("Cache" if compact else "Clear AST Cache")
-        if hasattr(self, 'restart_hotkeys_button') and self.restart_hotkeys_button is not None:
-            self.restart_hotkeys_button.setText("Hotkeys" if compact else "Restart Hotkeys")
+        if hasattr(self, 'check_bindings_button') and self.check_bindings_button is not None:
+            self.check_bindings_button.setText("Hotkeys" if compact else "Check Bindings")
         if hasattr(self, 'remove_binding_button') and self.remove_binding_button is not None:
             self.remove_binding_button.setText("Remove" if compact else "Remove Selected")
         if hasattr(self, 'bind_file_script_button') and self.bind_file_script_button is not None:
@@ -915,7 +2547,7 @@ class ModMenu(QMainWindow):
             "preset_list": "Double-click a preset to load it.",
             "hotkey_input": "Optional override hotkey (e.g. ctrl+shift+k). Leave empty to use script trigger.",
             "auto_save_on_run_checkbox": "Automatically save current script before manual run.",
-            "script_search_input": "Filter discovered .corel files by name/path.",
+            "script_search_input": "Search scripts by name or content: words, press:f, click:left, trigger:ctrl+k, loop>10.",
             "script_library_list": "Double-click a script to open it.",
             "current_script_label": "Current file loaded in editor.",
             "script_editor": "Minimal editor: line numbers, syntax highlight, autocomplete, Ctrl+S/Ctrl+O/Ctrl+F, F5 to run.",
@@ -923,8 +2555,9 @@ class ModMenu(QMainWindow):
             "editor_case_checkbox": "Case-sensitive search.",
             "editor_position_label": "Current cursor position.",
             "editor_modified_label": "Shows whether current script has unsaved changes.",
-            "run_script_button": "Run current script immediately.",
+            "run_script_button": f"Run current script immediately; Stop while it runs. {STOP_SCRIPTS_HOTKEY} stops every script.",
             "script_binding_list": "Double-click a binding to open its script.",
+            "binding_policy_combo": "What the selected binding does when triggered while its script is still running.",
             "clear_output_before_run_checkbox": "Clear output panel before each run.",
             "theme_selector": "Choose a preset theme or custom theme.",
             "always_on_top_checkbox": "Keep BASO above other windows.",
@@ -948,7 +2581,7 @@ class ModMenu(QMainWindow):
         top_row = QHBoxLayout()
         theme_label = QLabel("Preset Theme:")
         self.theme_selector = QComboBox()
-        self.theme_selector.addItems(list(self.get_preset_themes().keys()) + ["custom"])
+        self.theme_selector.addItems(list(PRESET_THEMES.keys()) + ["custom"])
         self.theme_selector.currentIndexChanged.connect(self.applyPresetTheme)
         top_row.addWidget(theme_label)
         top_row.addWidget(self.theme_selector, 1)
@@ -1005,55 +2638,6 @@ class ModMenu(QMainWindow):
 
         self.set_custom_theme_buttons(self.load_custom_theme_colors())
 
-    def get_preset_themes(self):
-        return {
-            "default": {
-                "background": "#e6e6e6", "primary": "#007BFF", "secondary": "#0056b3", "accent": "#0056b3", "text": "#ffffff"
-            },
-            "gruvbox dark": {
-                "background": "#282828", "primary": "#fabd2f", "secondary": "#83a598", "accent": "#b16286", "text": "#ffffff"
-            },
-            "serika dark": {
-                "background": "#3a3a3a", "primary": "#e2b714", "secondary": "#4d4d4d", "accent": "#8c7851", "text": "#ffffff"
-            },
-            "serika": {
-                "background": "#e2d3ba", "primary": "#323437", "secondary": "#e2b714", "accent": "#3e424d", "text": "#282828"
-            },
-            "catpuccin mocha": {
-                "background": "#1E1E2E", "primary": "#CDD6F4", "secondary": "#F5A97F", "accent": "#89b4fa", "text": "#a6accd"
-            },
-            "milkshake": {
-                "background": "#f2e7c9", "primary": "#6e4a4a", "secondary": "#c6aa8e", "accent": "#a67358", "text": "#38220f"
-            },
-            "cafe": {
-                "background": "#2e1f1c", "primary": "#c0a36e", "secondary": "#a67358", "accent": "#805b36", "text": "#f3e9dc"
-            },
-            "blueberry light": {
-                "background": "#d8e2ef", "primary": "#3c4c5e", "secondary": "#528bff", "accent": "#6b8dd6", "text": "#1c283b"
-            },
-            "cheesecake": {
-                "background": "#f4e0d3", "primary": "#5a4a42", "secondary": "#c6aa8e", "accent": "#805b36", "text": "#38220f"
-            },
-            "honey": {
-                "background": "#FFF8E1", "primary": "#FFC107", "secondary": "#FFB300", "accent": "#FFD54F", "text": "#795548"
-            },
-            "starclass": {
-                "background": "#D4E9E2", "primary": "#00704A", "secondary": "#005241", "accent": "#A5D6A7", "text": "#3E2723"
-            },
-            "TMO": {
-                "background": "#A7DBC8", "primary": "#59CE8F", "secondary": "#507C7E", "accent": "#A1E8AF", "text": "#3A4042"
-            },
-            "hot chocolate": {
-                "background": "#FFF4E6", "primary": "#8C5E58", "secondary": "#AA8073", "accent": "#D3A99A", "text": "#5A3B35"
-            },
-            "nene": {
-                "background": "#E0F7FA", "primary": "#4DD0E1", "secondary": "#26C6DA", "accent": "#B2EBF2", "text": "#00838F"
-            },
-            "nocto": {
-                "background": "#f5f5f5", "primary": "#424242", "secondary": "#bdbdbd", "accent": "#e0e0e0", "text": "#212121"
-            },
-        }
-
     def applyPresetTheme(self):
         if not hasattr(self, 'theme_selector'):
             return
@@ -1062,13 +2646,16 @@ class ModMenu(QMainWindow):
             colors = self.load_custom_theme_colors()
             self.set_custom_theme_buttons(colors)
         else:
-            colors = self.get_preset_themes().get(theme_name, self.get_preset_themes()["default"])
+            colors = PRESET_THEMES.get(theme_name, PRESET_THEMES["default"])
             self.set_custom_theme_buttons(colors)
 
         self.applyTheme(colors)
         self.save_theme_preferences(theme_name)
 
     def save_theme_preferences(self, theme_name):
+        if theme_name == self.saved_theme_name:
+            return
+        self.saved_theme_name = theme_name
         try:
             with open(self.theme_preferences_file, 'w') as file:
                 json.dump({'theme': theme_name}, file, indent=2)
@@ -1086,10 +2673,14 @@ class ModMenu(QMainWindow):
             except Exception as exc:
                 self.append_script_output(f"Error loading theme preferences: {exc}")
 
+        self.saved_theme_name = theme_name
         index = self.theme_selector.findText(theme_name)
         if index < 0:
             index = self.theme_selector.findText("default")
+        # Applied once below instead of also through currentIndexChanged
+        self.theme_selector.blockSignals(True)
         self.theme_selector.setCurrentIndex(index)
+        self.theme_selector.blockSignals(False)
         self.applyPresetTheme()
 
     def set_custom_theme_buttons(self, colors):
@@ -1113,7 +2704,7 @@ class ModMenu(QMainWindow):
 
     def get_custom_theme_colors(self):
         colors = {}
-        defaults = self.get_preset_themes()["default"]
+        defaults = PRESET_THEMES["default"]
         for key, button in self.custom_color_buttons.items():
             raw = button.property("color_value")
             colors[key] = raw if isinstance(raw, str) and QColor(raw).isValid() else defaults[key]
@@ -1122,8 +2713,11 @@ class ModMenu(QMainWindow):
     def save_current_custom_theme(self):
         colors = self.get_custom_theme_colors()
         self.save_custom_theme_colors(colors)
-        self.theme_selector.setCurrentText("custom")
-        self.applyCustomTheme()
+        # Selecting "custom" applies the colors just saved through currentIndexChanged
+        if self.theme_selector.currentText() == "custom":
+            self.applyCustomTheme()
+        else:
+            self.theme_selector.setCurrentText("custom")
 
     def save_custom_theme_colors(self, colors):
         try:
@@ -1133,7 +2727,7 @@ class ModMenu(QMainWindow):
             self.append_script_output(f"Error saving custom theme: {exc}")
 
     def load_custom_theme_colors(self):
-        defaults = self.get_preset_themes()["default"].copy()
+        defaults = PRESET_THEMES["default"].copy()
         if not os.path.exists(self.custom_theme_file):
             return defaults
         try:
@@ -1149,11 +2743,13 @@ class ModMenu(QMainWindow):
         return defaults
 
     def reset_custom_theme_colors(self):
-        defaults = self.get_preset_themes()["default"]
+        defaults = PRESET_THEMES["default"]
         self.set_custom_theme_buttons(defaults)
         self.save_custom_theme_colors(defaults)
-        self.theme_selector.setCurrentText("default")
-        self.applyPresetTheme()
+        if self.theme_selector.currentText() == "default":
+            self.applyPresetTheme()
+        else:
+            self.theme_selector.setCurrentText("default")
 
     def applyCustomTheme(self):
         colors = self.get_custom_theme_colors()
@@ -1166,341 +2762,107 @@ class ModMenu(QMainWindow):
         if not isinstance(colors, dict) or not required_keys.issubset(colors.keys()):
             raise Exception('Invalid theme colors, expected keys: background, primary, secondary, accent, text')
 
-        background = QColor(colors['background'])
-        text_color = QColor(colors['text'])
-        primary = QColor(colors['primary'])
-        secondary = QColor(colors['secondary'])
-        accent = QColor(colors['accent'])
-
-        is_dark = background.lightness() < 128
-        panel_color = background.lighter(112) if is_dark else background.darker(104)
-        input_color = background.lighter(107) if is_dark else background.darker(108)
-        tab_idle = background.lighter(120) if is_dark else background.darker(103)
-        border_color = secondary.lighter(120) if is_dark else secondary.darker(110)
-        subtle_text = text_color.lighter(135) if is_dark else text_color.darker(145)
-        hover_color = accent.lighter(110) if is_dark else accent.darker(110)
-        pressed_color = accent.darker(110) if is_dark else accent.darker(125)
-
-        def rgba(color, alpha):
-            return f"rgba({color.red()}, {color.green()}, {color.blue()}, {alpha})"
-
-        ui_font = getattr(self, "ui_font_family", "Segoe UI")
-        compact_css = ""
-        if self.compact_mode:
-            compact_css = """
-            QWidget {
-                font-size: 8.5pt;
-            }
-            QLabel {
-                margin: 0px;
-            }
-            QGroupBox {
-                margin-top: 4px;
-                padding: 12px 7px 6px 7px;
-                border-radius: 9px;
-            }
-            QGroupBox::title {
-                left: 6px;
-                top: 1px;
-                padding: 0 3px;
-            }
-            QPushButton {
-                padding: 4px 7px;
-                border-radius: 7px;
-                font-weight: 500;
-            }
-            QLineEdit, QPlainTextEdit, QListWidget, QComboBox {
-                padding: 3px 5px;
-                border-radius: 7px;
-            }
-            QTabBar::tab {
-                padding: 4px 8px;
-                margin-right: 3px;
-                min-width: 0px;
-                border-radius: 7px;
-            }
-            QPlainTextEdit#scriptEditor, QPlainTextEdit#logOutput, QPlainTextEdit#infoOutput {
-                border-radius: 8px;
-                padding: 5px;
-            }
-            """
-        self.setStyleSheet(f"""
-            QMainWindow {{
-                background-color: {colors['background']};
-                color: {colors['text']};
-                font-family: '{ui_font}';
-            }}
-            QWidget {{
-                color: {colors['text']};
-            }}
-            QToolTip {{
-                color: {colors['text']};
-                background: {rgba(panel_color, 240)};
-                border: 1px solid {border_color.name()};
-                border-radius: 8px;
-                padding: 6px 8px;
-            }}
-            QTabWidget::pane {{
-                border: none;
-                background: transparent;
-                margin-top: 8px;
-            }}
-            QTabBar {{
-                qproperty-drawBase: 0;
-            }}
-            QTabBar::tab {{
-                background: {tab_idle.name()};
-                color: {subtle_text.name()};
-                border: 1px solid transparent;
-                border-radius: 10px;
-                padding: 8px 14px;
-                margin-right: 6px;
-                margin-bottom: 2px;
-                min-width: 72px;
-            }}
-            QTabBar::tab:hover {{
-                color: {colors['text']};
-                border: 1px solid {rgba(border_color, 170)};
-            }}
-            QTabBar::tab:selected {{
-                background: {panel_color.name()};
-                color: {colors['text']};
-                border: 1px solid {border_color.name()};
-            }}
-            QGroupBox {{
-                background: {panel_color.name()};
-                border: 1px solid {rgba(border_color, 175)};
-                border-radius: 12px;
-                margin-top: 6px;
-                padding: 16px 12px 10px 12px;
-            }}
-            QGroupBox::title {{
-                subcontrol-origin: padding;
-                subcontrol-position: top left;
-                left: 10px;
-                top: 1px;
-                padding: 0 4px;
-                color: {subtle_text.name()};
-                background: transparent;
-            }}
-            QPushButton {{
-                background-color: {rgba(primary, 70)};
-                color: {colors['text']};
-                border: 1px solid {rgba(border_color, 170)};
-                border-radius: 10px;
-                padding: 7px 13px;
-                margin: 1px;
-                font-weight: 600;
-            }}
-            QPushButton:hover {{
-                background-color: {rgba(hover_color, 100)};
-                border: 1px solid {hover_color.name()};
-            }}
-            QPushButton:pressed {{
-                background-color: {rgba(pressed_color, 120)};
-            }}
-            QLineEdit, QPlainTextEdit, QListWidget, QComboBox {{
-                background: {input_color.name()};
-                border: 1px solid {rgba(border_color, 180)};
-                border-radius: 10px;
-                padding: 6px 8px;
-                color: {colors['text']};
-                selection-background-color: {rgba(accent, 140)};
-            }}
-            QLineEdit:focus, QPlainTextEdit:focus, QListWidget:focus, QComboBox:focus {{
-                border: 1px solid {accent.name()};
-            }}
-            QComboBox::drop-down {{
-                border: none;
-                width: 20px;
-            }}
-            QListWidget::item {{
-                border-radius: 6px;
-                padding: 4px 6px;
-            }}
-            QListWidget::item:selected {{
-                background: {rgba(accent, 120)};
-                color: {colors['text']};
-            }}
-            QListWidget#presetList {{
-                padding: 6px;
-            }}
-            QListWidget#presetList::item {{
-                margin: 3px 2px;
-                padding: 8px 10px;
-                border: 1px solid {rgba(border_color, 120)};
-                border-radius: 8px;
-            }}
-            QListWidget#presetList::item:hover {{
-                background: {rgba(accent, 70)};
-                border: 1px solid {rgba(accent, 140)};
-            }}
-            QListWidget#presetList::item:selected {{
-                background: {rgba(accent, 120)};
-                border: 1px solid {accent.name()};
-            }}
-            QSlider::groove:horizontal {{
-                border: 1px solid {rgba(border_color, 170)};
-                height: 8px;
-                background: {rgba(secondary, 85)};
-                margin: 2px 0;
-                border-radius: 4px;
-            }}
-            QSlider::handle:horizontal {{
-                background: {accent.name()};
-                border: 1px solid {rgba(border_color, 220)};
-                width: 16px;
-                margin: -2px 0;
-                border-radius: 8px;
-            }}
-            QCheckBox {{
-                spacing: 6px;
-                color: {colors['text']};
-            }}
-            QCheckBox::indicator {{
-                width: 16px;
-                height: 16px;
-                border-radius: 4px;
-                border: 1px solid {rgba(border_color, 180)};
-                background: {input_color.name()};
-            }}
-            QCheckBox::indicator:checked {{
-                background: {accent.name()};
-                border: 1px solid {accent.name()};
-            }}
-            QLabel {{
-                color: {colors['text']};
-            }}
-            QPlainTextEdit#scriptEditor, QPlainTextEdit#logOutput, QPlainTextEdit#infoOutput {{
-                border-radius: 12px;
-                padding: 8px;
-            }}
-            QScrollBar:vertical {{
-                background: transparent;
-                width: 10px;
-                margin: 4px;
-            }}
-            QScrollBar::handle:vertical {{
-                background: {rgba(border_color, 180)};
-                min-height: 28px;
-                border-radius: 5px;
-            }}
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {{
-                height: 0px;
-            }}
-            QScrollBar:horizontal {{
-                background: transparent;
-                height: 10px;
-                margin: 4px;
-            }}
-            QScrollBar::handle:horizontal {{
-                background: {rgba(border_color, 180)};
-                min-width: 28px;
-                border-radius: 5px;
-            }}
-            QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {{
-                width: 0px;
-            }}
-            {compact_css}
-        """)
+        stylesheet = build_theme_stylesheet(
+            tuple(sorted((key, colors[key]) for key in required_keys)),
+            bool(self.compact_mode),
+            getattr(self, "ui_font_family", "Segoe UI")
+        )
+        # Restyling the window walks every widget, so an unchanged stylesheet is not applied again
+        if stylesheet != self.applied_stylesheet:
+            self.applied_stylesheet = stylesheet
+            self.setStyleSheet(stylesheet)
         if hasattr(self, 'highlighter') and self.highlighter is not None:
             self.highlighter.apply_theme_colors(colors)
         self.active_theme_colors = dict(colors)
         self.apply_compact_layout_state()
 
-    def update_slider_value(self, value):
-        self.recoil_slider_label.setText(f'Recoil Control Y: {value}')
-        self.update_preset_summary_label()
-        self.update_recoil_info_panel()
+    def mark_ui_dirty(self, *sections):
+        self.ui_dirty_sections.update(sections)
+        if not self.ui_refresh_timer.isActive():
+            self.ui_refresh_timer.start()
+
+    def refresh_dirty_ui(self):
+        dirty = self.ui_dirty_sections
+        self.ui_dirty_sections = set()
+        for section, refresh in self.ui_sections:
+            if section in dirty:
+                refresh()
+
+    def set_widget_text(self, widget, text):
+        # Most refreshes reproduce the text already shown; skipping those saves a relayout
+        if self.ui_widget_texts.get(widget) == text:
+            return
+        self.ui_widget_texts[widget] = text
+        if isinstance(widget, QPlainTextEdit):
+            widget.setPlainText(text)
+        else:
+            widget.setText(text)
 
-    def update_x_slider_value(self, value):
-        self.recoil_x_slider_label.setText(f'Recoil Control X: {value}')
-        self.update_preset_summary_label()
-        self.update_recoil_info_panel()
+    def update_slider_value(self, _value=None):
+        self.mark_ui_dirty('recoil_labels', 'preset_summary', 'recoil_info')
 
-    def update_delay_value(self, value):
-        self.delay_slider_label.setText(f'Delay (ms): {value}')
-        self.update_preset_summary_label()
-        self.update_recoil_info_panel()
+    def update_x_slider_value(self, _value=None):
+        self.mark_ui_dirty('recoil_labels', 'preset_summary', 'recoil_info')
 
-    def format_preset_text(self, name, y_value, x_value, delay):
-        return f'{name} - Y: {y_value} - X: {x_value} - Delay: {delay} ms'
-
-    def format_preset_display_text(self, name, y_value, x_value, delay):
-        return f"{name}   ·   Y {y_value:+d}   X {x_value:+d}   {delay} ms"
-
-    def create_preset_item(self, name, y_value, x_value, delay):
-        serialized = self.format_preset_text(name, y_value, x_value, delay)
-        display = self.format_preset_display_text(name, y_value, x_value, delay)
-        item = QListWidgetItem(display)
-        item.setData(Qt.UserRole, serialized)
-        item.setToolTip(serialized)
-        return item
-
-    def update_preset_item(self, item, name, y_value, x_value, delay):
-        serialized = self.format_preset_text(name, y_value, x_value, delay)
-        display = self.format_preset_display_text(name, y_value, x_value, delay)
-        item.setText(display)
-        item.setData(Qt.UserRole, serialized)
-        item.setToolTip(serialized)
-
-    def get_preset_item_serialized(self, item):
-        if item is None:
-            return ""
-        serialized = item.data(Qt.UserRole)
-        if isinstance(serialized, str) and serialized.strip():
-            return serialized.strip()
-        text = item.text().strip()
-        return text
+    def update_delay_value(self, _value=None):
+        self.mark_ui_dirty('recoil_labels', 'preset_summary', 'recoil_info')
 
-    def parse_preset_item(self, item):
-        return self.parse_preset_text(self.get_preset_item_serialized(item))
+    def refresh_recoil_slider_labels(self):
+        self.set_widget_text(self.recoil_slider_label, f'Recoil Control Y: {self.recoil_slider.value()}')
+        self.set_widget_text(self.recoil_x_slider_label, f'Recoil Control X: {self.recoil_x_slider.value()}')
+        self.set_widget_text(self.delay_slider_label, f'Delay (ms): {self.delay_slider.value()}')
 
-    def parse_preset_text(self, text):
-        match = re.match(r'^\s*(.*?)\s*-\s*Y:\s*(-?\d+)\s*-\s*X:\s*(-?\d+)\s*-\s*Delay:\s*(\d+)\s*ms\s*$', text)
-        if not match:
+    def open_preset_store(self):
+        # Presets live in presets.db; presets.txt is imported into it once and stays the export format
+        try:
+            store = PresetStore(self.presets_db_file)
+            store.open(legacy_path=self.presets_file)
+        except sqlite3.Error as exc:
+            QMessageBox.warning(
+                self,
+                "Presets",
+                f"Could not open {self.presets_db_file}:\n{exc}\n\nPresets changed in this session will not be saved."
+            )
+            store = PresetStore(':memory:')
+            store.open(legacy_path=self.presets_file)
+        if store.import_error is not None:
+            QMessageBox.warning(
+                self, "Presets", f"Could not import presets from {self.presets_file}:\n{store.import_error}"
+            )
+        return store
+
+    def get_selected_preset(self):
+        index = self.preset_filter_model.mapToSource(self.preset_list.currentIndex())
+        if not index.isValid():
             return None
-        return match.group(1), int(match.group(2)), int(match.group(3)), int(match.group(4))
-
-    def get_existing_preset_names(self):
-        names = set()
-        for index in range(self.preset_list.count()):
-            parsed = self.parse_preset_item(self.preset_list.item(index))
-            if parsed:
-                names.add(parsed[0].lower())
-        return names
-
-    def make_unique_preset_name(self, base_name):
-        existing = self.get_existing_preset_names()
-        candidate = base_name
-        suffix = 2
-        while candidate.lower() in existing:
-            candidate = f"{base_name}-{suffix}"
-            suffix += 1
-        return candidate
+        return self.preset_model.preset_at(index.row())
+
+    def select_preset_row(self, row):
+        self.preset_list.setCurrentIndex(self.preset_filter_model.mapFromSource(self.preset_model.index(row)))
 
     def update_preset_summary_label(self):
+        self.mark_ui_dirty('preset_summary')
+
+    def refresh_preset_summary_label(self):
         if not hasattr(self, 'preset_summary_label'):
             return
-        selected_item = self.preset_list.currentItem()
-        if selected_item:
-            parsed = self.parse_preset_item(selected_item)
-            if parsed:
-                name, y_value, x_value, delay = parsed
-                self.preset_summary_label.setText(
-                    f"Selected: {name} | Y={y_value}, X={x_value}, Delay={delay}ms"
-                )
-                return
-        self.preset_summary_label.setText(
+        preset = self.get_selected_preset()
+        if preset is not None:
+            self.set_widget_text(
+                self.preset_summary_label,
+                f"Selected: {preset.name} | Y={preset.y}, X={preset.x}, Delay={preset.delay}ms"
+            )
+            return
+        self.set_widget_text(
+            self.preset_summary_label,
             f"Current values: Y={self.recoil_slider.value()}, X={self.recoil_x_slider.value()}, Delay={self.delay_slider.value()}ms"
         )
 
-    def filter_preset_list(self, text):
-        token = text.strip().lower()
-        for index in range(self.preset_list.count()):
-            item = self.preset_list.item(index)
-            searchable = f"{item.text()} {self.get_preset_item_serialized(item)}".lower()
-            item.setHidden(token not in searchable)
+    def schedule_preset_filter(self, _text=None):
+        self.preset_filter_timer.start()
+
+    def apply_preset_filter(self):
+        self.preset_filter_model.set_query(self.preset_filter_input.text())
 
     def save_preset(self):
         name = self.preset_name_edit.text().strip()
@@ -1512,85 +2874,76 @@ class ModMenu(QMainWindow):
         x_value = self.recoil_x_slider.value()
         delay = self.delay_slider.value()
 
-        replaced = False
-        for index in range(self.preset_list.count()):
-            item = self.preset_list.item(index)
-            parsed = self.parse_preset_item(item)
-            if parsed and parsed[0].lower() == name.lower():
-                self.update_preset_item(item, name, y_value, x_value, delay)
-                self.preset_list.setCurrentItem(item)
-                replaced = True
-                break
-        if not replaced:
-            item = self.create_preset_item(name, y_value, x_value, delay)
-            self.preset_list.addItem(item)
-            self.preset_list.setCurrentItem(item)
+        try:
+            existing = self.preset_model.find(name)
+            if existing is not None:
+                row = self.preset_model.replace(existing, name, y_value, x_value, delay)
+            else:
+                row = self.preset_model.add(Preset(name, y_value, x_value, delay))
+        except sqlite3.Error as exc:
+            QMessageBox.critical(self, "Save Preset", f"Failed to save preset:\n{exc}")
+            return
 
-        self.save_presets()
+        self.select_preset_row(row)
         self.update_preset_summary_label()
         self.update_runtime_summary()
 
     def load_preset(self):
-        selected_item = self.preset_list.currentItem()
-        if not selected_item:
-            return
-        parsed = self.parse_preset_item(selected_item)
-        if not parsed:
-            QMessageBox.warning(self, "Load Preset", "Selected preset has an invalid format.")
+        preset = self.get_selected_preset()
+        if preset is None:
             return
 
-        name, y_value, x_value, delay = parsed
-        self.preset_name_edit.setText(name)
-        self.recoil_slider.setValue(y_value)
-        self.recoil_x_slider.setValue(x_value)
-        self.delay_slider.setValue(max(1, delay))
-        self.update_slider_value(y_value)
-        self.update_x_slider_value(x_value)
-        self.update_delay_value(delay)
+        self.preset_name_edit.setText(preset.name)
+        # The sliders' valueChanged handlers mark the labels and panels dirty
+        self.recoil_slider.setValue(preset.y)
+        self.recoil_x_slider.setValue(preset.x)
+        self.delay_slider.setValue(max(1, preset.delay))
         self.update_preset_summary_label()
 
     def delete_preset(self):
-        selected_item = self.preset_list.currentItem()
-        if selected_item:
-            self.preset_list.takeItem(self.preset_list.row(selected_item))
-            self.save_presets()
-            self.update_preset_summary_label()
-            self.update_runtime_summary()
+        preset = self.get_selected_preset()
+        if preset is None:
+            return
+        try:
+            self.preset_model.remove(preset)
+        except sqlite3.Error as exc:
+            QMessageBox.critical(self, "Delete Preset", f"Failed to delete preset:\n{exc}")
+            return
+        self.update_preset_summary_label()
+        self.update_runtime_summary()
 
     def rename_preset(self):
-        selected_item = self.preset_list.currentItem()
+        preset = self.get_selected_preset()
         new_name = self.preset_name_edit.text().strip()
-        if not selected_item or not new_name:
+        if preset is None or not new_name:
             QMessageBox.warning(self, "Rename Preset", "Select a preset and set a new name first.")
             return
-        parsed = self.parse_preset_item(selected_item)
-        if not parsed:
-            QMessageBox.warning(self, "Rename Preset", "Selected preset has an invalid format.")
+        existing = self.preset_model.find(new_name)
+        if existing is not None and existing is not preset:
+            QMessageBox.warning(self, "Rename Preset", f"A preset named '{existing.name}' already exists.")
             return
 
-        _old_name, y_value, x_value, delay = parsed
-        self.update_preset_item(selected_item, new_name, y_value, x_value, delay)
-        self.save_presets()
+        try:
+            self.preset_model.replace(preset, new_name, preset.y, preset.x, preset.delay)
+        except sqlite3.Error as exc:
+            QMessageBox.critical(self, "Rename Preset", f"Failed to rename preset:\n{exc}")
+            return
         self.update_preset_summary_label()
 
     def duplicate_preset(self):
-        selected_item = self.preset_list.currentItem()
-        if not selected_item:
+        preset = self.get_selected_preset()
+        if preset is None:
             QMessageBox.warning(self, "Duplicate Preset", "Select a preset to duplicate.")
             return
 
-        parsed = self.parse_preset_item(selected_item)
-        if not parsed:
-            QMessageBox.warning(self, "Duplicate Preset", "Selected preset has an invalid format.")
+        duplicated_name = self.preset_model.unique_name(f"{preset.name}-copy")
+        try:
+            row = self.preset_model.add(Preset(duplicated_name, preset.y, preset.x, preset.delay))
+        except sqlite3.Error as exc:
+            QMessageBox.critical(self, "Duplicate Preset", f"Failed to duplicate preset:\n{exc}")
             return
-
-        name, y_value, x_value, delay = parsed
-        duplicated_name = self.make_unique_preset_name(f"{name}-copy")
-        duplicated_item = self.create_preset_item(duplicated_name, y_value, x_value, delay)
-        self.preset_list.addItem(duplicated_item)
-        self.preset_list.setCurrentItem(duplicated_item)
+        self.select_preset_row(row)
         self.preset_name_edit.setText(duplicated_name)
-        self.save_presets()
         self.update_preset_summary_label()
         self.update_runtime_summary()
 
@@ -1598,10 +2951,9 @@ class ModMenu(QMainWindow):
         path, _ = QFileDialog.getSaveFileName(self, "Export Presets", self.presets_file, "Text Files (*.txt)")
         if not path:
             return
-        presets = [self.get_preset_item_serialized(self.preset_list.item(index)) for index in range(self.preset_list.count())]
         try:
             with open(path, 'w') as file:
-                file.write('\n'.join(presets))
+                file.write('\n'.join(preset.serialize() for preset in self.preset_model.presets))
         except OSError as exc:
             QMessageBox.critical(self, "Export Presets", f"Failed to export presets:\n{exc}")
 
@@ -1610,50 +2962,37 @@ class ModMenu(QMainWindow):
         if not path:
             return
 
-        imported = 0
+        # The file is streamed and parsed first, then added to the model and the store as one batch
+        started = time.perf_counter()
         try:
             with open(path, 'r') as file:
-                lines = file.read().splitlines()
-        except OSError as exc:
+                presets, counts = read_preset_import(file, self.preset_model.by_name)
+        except (OSError, UnicodeDecodeError) as exc:
             QMessageBox.critical(self, "Import Presets", f"Failed to import presets:\n{exc}")
             return
 
-        existing_names = self.get_existing_preset_names()
-        for line in lines:
-            parsed = self.parse_preset_text(line)
-            if not parsed:
-                continue
-            name, y_value, x_value, delay = parsed
-            if name.lower() in existing_names:
-                name = self.make_unique_preset_name(name)
-            item = self.create_preset_item(name, y_value, x_value, delay)
-            self.preset_list.addItem(item)
-            existing_names.add(name.lower())
-            imported += 1
-
-        if imported:
-            self.save_presets()
-            self.update_runtime_summary()
-        QMessageBox.information(self, "Import Presets", f"Imported {imported} preset(s).")
+        try:
+            self.preset_model.add_many(presets)
+        except sqlite3.Error as exc:
+            QMessageBox.critical(self, "Import Presets", f"Failed to import presets:\n{exc}")
+            return
 
-    def save_presets(self):
-        presets = [self.get_preset_item_serialized(self.preset_list.item(index)) for index in range(self.preset_list.count())]
-        with open(self.presets_file, 'w') as file:
-            file.write('\n'.join(presets))
+        if presets:
+            self.update_runtime_summary()
+        elapsed = time.perf_counter() - started
+        QMessageBox.information(
+            self,
+            "Import Presets",
+            f"Imported {counts['imported']} preset(s) in {elapsed:.2f}s.\n"
+            f"Renamed: {counts['renamed']} | Duplicates skipped: {counts['duplicates']} | "
+            f"Invalid lines skipped: {counts['skipped']}"
+        )
 
     def load_presets(self):
-        self.preset_list.clear()
         try:
-            with open(self.presets_file, 'r') as file:
-                presets = file.read().splitlines()
-            for line in presets:
-                parsed = self.parse_preset_text(line)
-                if parsed:
-                    name, y_value, x_value, delay = parsed
-                    self.preset_list.addItem(self.create_preset_item(name, y_value, x_value, delay))
-        except FileNotFoundError:
-            pass
-        self.filter_preset_list(self.preset_filter_input.text())
+            self.preset_model.load()
+        except sqlite3.Error as exc:
+            QMessageBox.critical(self, "Load Presets", f"Failed to load presets:\n{exc}")
         self.update_preset_summary_label()
         self.update_runtime_summary()
 
@@ -1671,6 +3010,9 @@ class ModMenu(QMainWindow):
         self.update_recoil_info_panel()
 
     def update_recoil_runtime_label(self):
+        self.mark_ui_dirty('recoil_state', 'recoil_info')
+
+    def refresh_recoil_runtime_label(self):
         if not hasattr(self, 'recoil_state_label'):
             return
         if not self.recoil_checkbox.isChecked():
@@ -1681,10 +3023,12 @@ class ModMenu(QMainWindow):
             status = "Active trigger detected"
         else:
             status = "Waiting for trigger"
-        self.recoil_state_label.setText(status)
-        self.update_recoil_info_panel()
+        self.set_widget_text(self.recoil_state_label, status)
 
     def update_recoil_info_panel(self):
+        self.mark_ui_dirty('recoil_info')
+
+    def refresh_recoil_info_panel(self):
         if not hasattr(self, 'recoil_info_box'):
             return
         mode_map = {
@@ -1708,16 +3052,14 @@ class ModMenu(QMainWindow):
             "3) Lower delay is stronger/faster compensation.",
             "4) Recoil runs only while BASO window is unfocused.",
         ]
-        self.recoil_info_box.setPlainText("\n".join(lines))
+        self.set_widget_text(self.recoil_info_box, "\n".join(lines))
 
     def apply_recoil_once(self):
-        if os.name != 'nt':
-            return
         y_value = self.recoil_slider.value()
         x_value = self.recoil_x_slider.value()
         if y_value == 0 and x_value == 0:
             return
-        ctypes.windll.user32.mouse_event(0x0001, x_value, y_value, 0, 0)
+        self.send_recoil_move(x_value, y_value)
 
     def reset_recoil_values(self):
         self.recoil_slider.setValue(0)
@@ -1751,9 +3093,11 @@ class ModMenu(QMainWindow):
             self.setMinimumSize(760, 520)
             self.setMaximumSize(16777215, 16777215)
             self.resize(*self.expanded_size)
-        self.apply_compact_layout_state()
+        # applyTheme re-applies the compact layout state itself
         if self.active_theme_colors:
             self.applyTheme(self.active_theme_colors)
+        else:
+            self.apply_compact_layout_state()
 
     def open_project_folder(self):
         QDesktopServices.openUrl(QUrl.fromLocalFile(self.project_root))
@@ -1771,43 +3115,76 @@ class ModMenu(QMainWindow):
     def clear_script_output(self):
         self.script_output.clear()
 
-    def discover_script_files(self):
-        script_files = []
-        skip_dirs = {'.git', '__pycache__', 'target', 'ext'}
-        for root, dirs, files in os.walk(self.project_root):
-            dirs[:] = [name for name in dirs if name not in skip_dirs]
-            for name in files:
-                if not name.lower().endswith('.corel'):
-                    continue
-                abs_path = os.path.abspath(os.path.join(root, name))
-                if abs_path.endswith(os.path.join('corel', 'corel.corel')):
+    def refresh_script_library_list(self, _checked=False):
+        self.script_library_index.rescan()
+
+    def on_script_library_changed(self):
+        scripts = self.script_library_index.scripts()
+        self.script_library_model.set_scripts(scripts)
+        self.update_script_library_stats()
+
+        # Keep the content index in step: drop removed scripts, read and index new ones off the GUI thread
+        indexed = self.script_search_index.paths()
+        self.script_search_index.remove(indexed.difference(scripts))
+        added = [path for path in scripts if path not in indexed]
+        if added:
+            self.index_script_contents_async(added)
+
+    def index_script_contents_async(self, paths):
+        def worker():
+            for path in paths:
+                try:
+                    with open(path, 'r', encoding='utf-8', errors='replace') as file:
+                        source = file.read()
+                except OSError:
                     continue
-                script_files.append(abs_path)
-        return sorted(script_files, key=lambda value: value.lower())
+                self.script_search_index.update(path, source, self.tokenize_corel_source(source))
+            self.script_search_indexed_signal.emit()
 
-    def refresh_script_library_list(self, _text=None):
-        if not hasattr(self, 'script_library_list'):
-            return
+        threading.Thread(target=worker, daemon=True).start()
 
-        self.script_library_list.clear()
-        query = self.script_search_input.text().strip().lower()
-        all_scripts = self.discover_script_files()
-        visible = 0
-        for path in all_scripts:
-            relative = os.path.relpath(path, self.project_root)
-            searchable = f"{os.path.basename(path)} {relative}".lower()
-            if query and query not in searchable:
-                continue
-            item = QListWidgetItem(relative.replace('\\', '/'))
-            item.setData(Qt.UserRole, path)
-            self.script_library_list.addItem(item)
-            visible += 1
+    def on_script_search_indexed(self):
+        self.script_library_model.apply_filter()
+        self.script_library_model.refresh_details()
+        self.update_script_library_stats()
 
-        self.script_library_stats_label.setText(f"{visible} script(s)")
+    def describe_library_script(self, path):
+        document = self.script_search_index.document(path)
+        if document is None:
+            return ""
+        status = self.script_compile_status.get(path)
+        if status is None:
+            status = "not compiled"
+        elif status:
+            status = "compile failed"
+        else:
+            status = "compiled"
+        trigger = document.trigger or "no trigger"
+        return f"[{trigger} | {document.line_count} lines | {status}]"
+
+    def schedule_script_library_filter(self, _text=None):
+        self.script_filter_timer.start()
+
+    def apply_script_library_filter(self):
+        self.script_library_model.set_query(self.script_search_input.text())
+        self.update_script_library_stats()
+
+    def update_script_library_stats(self):
+        model = self.script_library_model
+        if model.match_count > model.rowCount():
+            self.script_library_stats_label.setText(f"{model.rowCount()} of {model.match_count} script(s)")
+        else:
+            self.script_library_stats_label.setText(f"{model.rowCount()} script(s)")
         self.update_runtime_summary()
 
-    def open_script_from_library_item(self, item):
-        path = item.data(Qt.UserRole)
+    def on_script_file_modified(self, path):
+        # Bound or already cached scripts are recompiled in the background as soon as they change on disk.
+        self.index_script_contents_async([path])
+        if path in self.script_runtime_cache or path in {os.path.abspath(p) for p in self.script_bindings.values()}:
+            self.prime_script_runtime_cache(path)
+
+    def open_script_from_library_index(self, index):
+        path = index.data(Qt.UserRole)
         if not path:
             return
         try:
@@ -1829,20 +3206,33 @@ class ModMenu(QMainWindow):
             with open(path, 'w') as file:
                 file.write(template)
         self.open_script_file(path, announce_sync=True)
-        self.refresh_script_library_list()
         self.script_subtabs.setCurrentIndex(0)
 
     def update_runtime_summary(self):
+        self.mark_ui_dirty('runtime_summary')
+
+    def refresh_runtime_summary(self):
         if not hasattr(self, 'runtime_summary_label'):
             return
-        presets_count = self.preset_list.count() if hasattr(self, 'preset_list') else 0
+        presets_count = self.preset_model.rowCount() if hasattr(self, 'preset_model') else 0
         bindings_count = len(self.script_bindings)
-        cache_count = len(self.script_runtime_cache)
-        scripts_count = self.script_library_list.count() if hasattr(self, 'script_library_list') else 0
+        cache_stats = self.script_runtime_cache.stats()
+        scripts_count = self.script_library_model.rowCount() if hasattr(self, 'script_library_model') else 0
         mode_label = "Compact" if self.compact_mode else "Expanded"
-        self.runtime_summary_label.setText(
+        running_label = ""
+        if self.script_run_scheduler is not None:
+            run_stats = self.script_run_scheduler.stats()
+            running_label = (
+                f" | Running: {run_stats['active']}/{run_stats['max_concurrent']} "
+                f"({run_stats['queued']} queued, {run_stats['rejected']} rejected)"
+            )
+        self.set_widget_text(
+            self.runtime_summary_label,
             f"Window: {mode_label} | Presets: {presets_count} | "
-            f"Bindings: {bindings_count} | Cached AST: {cache_count} | Scripts found: {scripts_count}"
+            f"Bindings: {bindings_count} | Cached AST: {cache_stats['entries']} "
+            f"({cache_stats['size']}/{cache_stats['max_size']} ops, {cache_stats['hits']} hits, "
+            f"{cache_stats['misses']} misses, {cache_stats['evictions']} evicted) | Scripts found: {scripts_count}"
+            f"{running_label}"
         )
 
     def setup_editor_shortcuts(self):
@@ -1940,8 +3330,25 @@ class ModMenu(QMainWindow):
             y_value = self.recoil_slider.value()
             x_value = self.recoil_x_slider.value()
             if y_value > 0 or x_value != 0:
-                MOUSEEVENTF_MOVE = 0x0001
-                ctypes.windll.user32.mouse_event(MOUSEEVENTF_MOVE, x_value, y_value, 0, 0)
+                self.send_recoil_move(x_value, y_value)
+
+    def get_recoil_input_backend(self):
+        # Recoil runs on the GUI thread, so it gets its own backend instead of sharing a script's queue.
+        if self.recoil_input_backend is not None or self.recoil_input_backend_error is not None:
+            return self.recoil_input_backend
+        try:
+            self.recoil_input_backend = self.get_corel_runtime_module().create_input_backend()
+        except Exception as exc:
+            self.recoil_input_backend_error = str(exc)
+            self.append_script_output(f"Recoil input unavailable: {exc}")
+        return self.recoil_input_backend
+
+    def send_recoil_move(self, x_value, y_value):
+        backend = self.get_recoil_input_backend()
+        if backend is None:
+            return
+        backend.move(x_value, y_value)
+        backend.flush()
     
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
@@ -2048,83 +3455,123 @@ class ModMenu(QMainWindow):
         self.script_binding_list.clear()
         for hotkey in sorted(self.script_bindings.keys()):
             script_path = self.script_bindings[hotkey]
-            item = QListWidgetItem(f"{hotkey} -> {script_path}")
+            policy = self.get_binding_run_policy(hotkey)
+            item = QListWidgetItem(f"{hotkey} -> {script_path} [{RUN_POLICY_LABELS[policy]}]")
             item.setData(Qt.UserRole, hotkey)
             self.script_binding_list.addItem(item)
         self.update_runtime_summary()
 
     def save_script_bindings(self):
+        # Bindings with the default policy stay plain paths, so the file reads the same as before policies
+        saved = {}
+        for hotkey, script_path in self.script_bindings.items():
+            policy = self.get_binding_run_policy(hotkey)
+            saved[hotkey] = script_path if policy == DEFAULT_RUN_POLICY else {'script': script_path, 'policy': policy}
         try:
             with open(self.script_bindings_file, 'w') as file:
-                json.dump(self.script_bindings, file, indent=2)
+                json.dump(saved, file, indent=2)
         except Exception as exc:
             self.append_script_output(f"Failed to save script bindings: {exc}")
 
     def load_script_bindings(self):
         self.script_bindings = {}
+        self.binding_run_policies = {}
         if os.path.exists(self.script_bindings_file):
             try:
                 with open(self.script_bindings_file, 'r') as file:
                     loaded = json.load(file)
                 if isinstance(loaded, dict):
-                    for hotkey, script_path in loaded.items():
-                        if isinstance(hotkey, str) and isinstance(script_path, str):
-                            self.script_bindings[hotkey] = script_path
+                    for hotkey, binding in loaded.items():
+                        policy = DEFAULT_RUN_POLICY
+                        if isinstance(binding, dict):
+                            policy = binding.get('policy', DEFAULT_RUN_POLICY)
+                            binding = binding.get('script')
+                        if isinstance(hotkey, str) and isinstance(binding, str):
+                            self.script_bindings[hotkey] = binding
+                            if policy in RUN_POLICY_LABELS and policy != DEFAULT_RUN_POLICY:
+                                self.binding_run_policies[hotkey] = policy
             except Exception as exc:
                 self.append_script_output(f"Failed to load script bindings: {exc}")
 
         self.refresh_script_bindings_list()
-        self.restart_hotkey_listener()
+        self.check_script_bindings()
         self.prewarm_script_runtime_cache_async()
         self.update_runtime_summary()
 
-    def create_hotkey_callback(self, script_path, hotkey):
-        def callback():
-            self.run_script_signal.emit(script_path, hotkey)
-        return callback
+    def get_binding_run_policy(self, hotkey):
+        return self.binding_run_policies.get(hotkey, DEFAULT_RUN_POLICY)
 
-    def restart_hotkey_listener(self):
-        if self.hotkey_listener is not None:
-            try:
-                self.hotkey_listener.stop()
-            except Exception:
-                pass
-            self.hotkey_listener = None
+    def on_binding_selection_changed(self, item, _previous=None):
+        hotkey = item.data(Qt.UserRole) if item is not None else None
+        self.binding_policy_combo.setEnabled(hotkey in self.script_bindings)
+        if hotkey in self.script_bindings:
+            policy = self.get_binding_run_policy(hotkey)
+            self.binding_policy_combo.setCurrentIndex(list(RUN_POLICY_LABELS).index(policy))
 
-        if not self.script_bindings:
-            self.update_runtime_summary()
+    def set_selected_binding_policy(self, index):
+        # The policy belongs to the selected hotkey; other hotkeys bound to the same script keep theirs.
+        item = self.script_binding_list.currentItem()
+        hotkey = item.data(Qt.UserRole) if item is not None else None
+        script_path = self.script_bindings.get(hotkey)
+        if script_path is None:
             return
+        policy = list(RUN_POLICY_LABELS)[index]
+        if policy == DEFAULT_RUN_POLICY:
+            self.binding_run_policies.pop(hotkey, None)
+        else:
+            self.binding_run_policies[hotkey] = policy
+        self.save_script_bindings()
+        item.setText(f"{hotkey} -> {script_path} [{RUN_POLICY_LABELS[policy]}]")
 
-        valid_bindings = {}
-        removed_bindings = []
-        for hotkey, script_path in self.script_bindings.items():
-            if os.path.exists(script_path):
-                valid_bindings[hotkey] = script_path
-            else:
-                removed_bindings.append((hotkey, script_path))
+    def on_hotkey_pressed(self, hotkey, script_path):
+        # Hook thread: marks 'hold' bindings as held before the run is requested on the GUI thread.
+        # The stop hotkey cancels runs right here, without waiting for the GUI thread.
+        if script_path is None:
+            scheduler = self.script_run_scheduler
+            if scheduler is not None:
+                scheduler.stop_all()
+            return
+        policy = self.get_binding_run_policy(hotkey)
+        if policy == 'hold':
+            held = self.hotkey_held_events.get(hotkey)
+            if held is None:
+                held = self.hotkey_held_events[hotkey] = threading.Event()
+            held.set()
+        self.run_script_signal.emit(script_path, hotkey, policy)
+
+    def on_hotkey_released(self, hotkey, script_path):
+        # Hook thread. The held flag is cleared first, so a run that has not started yet never starts.
+        held = self.hotkey_held_events.get(hotkey)
+        if held is None:
+            return
+        held.clear()
+        scheduler = self.script_run_scheduler
+        if scheduler is not None:
+            scheduler.release(os.path.abspath(script_path))
+
+    def apply_script_bindings(self):
+        # Called on every binding change: swaps the hub's hotkey table without touching the hooks or the disk.
+        self.script_library_index.watch_files(self.script_bindings.values())
+        hub_bindings = dict(self.script_bindings)
+        hub_bindings[STOP_SCRIPTS_HOTKEY] = None
+        for hotkey, error in self.input_hub.set_bindings(hub_bindings):
+            self.append_script_output(f"Ignoring binding {hotkey}: {error}")
+        self.update_runtime_summary()
 
+    def check_script_bindings(self):
+        # Drops bindings whose script is gone; only on load and on request, since it stats every bound file.
+        removed_bindings = [
+            (hotkey, script_path) for hotkey, script_path in self.script_bindings.items()
+            if not os.path.exists(script_path)
+        ]
         if removed_bindings:
-            self.script_bindings = valid_bindings
-            self.save_script_bindings()
-            self.refresh_script_bindings_list()
             for hotkey, script_path in removed_bindings:
+                del self.script_bindings[hotkey]
+                self.binding_run_policies.pop(hotkey, None)
                 self.append_script_output(f"Removed missing script binding {hotkey}: {script_path}")
-
-        if not valid_bindings:
-            self.update_runtime_summary()
-            return
-
-        callbacks = {}
-        for hotkey, script_path in valid_bindings.items():
-            callbacks[hotkey] = self.create_hotkey_callback(script_path, hotkey)
-
-        try:
-            self.hotkey_listener = keyboard.GlobalHotKeys(callbacks)
-            self.hotkey_listener.start()
-        except Exception as exc:
-            self.hotkey_listener = None
-            self.append_script_output(f"Failed to start hotkey listener: {exc}")
-        self.update_runtime_summary()
+            self.save_script_bindings()
+            self.refresh_script_bindings_list()
+        self.apply_script_bindings()
 
     def bind_loaded_script_hotkey(self):
         hotkey_text = self.hotkey_input.text().strip()
@@ -2164,13 +3611,19 @@ class ModMenu(QMainWindow):
         except ValueError as exc:
             QMessageBox.warning(self, "Bind Hotkey", str(exc))
             return
+        if normalized_hotkey == STOP_SCRIPTS_HOTKEY:
+            QMessageBox.warning(self, "Bind Hotkey", f"{STOP_SCRIPTS_HOTKEY} is reserved for stopping all scripts.")
+            return
 
         abs_script_path = os.path.abspath(script_path)
 
         # A script can have only one binding: remove previous hotkeys pointing to this script.
+        # The script keeps the run policy of the hotkey it moves from.
+        moved_policy = None
         for existing_hotkey, existing_script in list(self.script_bindings.items()):
             if existing_hotkey != normalized_hotkey and os.path.abspath(existing_script) == abs_script_path:
                 del self.script_bindings[existing_hotkey]
+                moved_policy = self.binding_run_policies.pop(existing_hotkey, moved_policy)
 
         previous_path = self.script_bindings.get(normalized_hotkey)
         if previous_path and os.path.abspath(previous_path) != abs_script_path:
@@ -2183,13 +3636,17 @@ class ModMenu(QMainWindow):
             )
             if answer != QMessageBox.Yes:
                 return
+            # A replaced binding's policy went with the script it was set for
+            self.binding_run_policies.pop(normalized_hotkey, None)
 
         self.script_bindings[normalized_hotkey] = abs_script_path
+        if moved_policy is not None:
+            self.binding_run_policies[normalized_hotkey] = moved_policy
         self.save_script_bindings()
         self.refresh_script_bindings_list()
-        self.restart_hotkey_listener()
+        self.apply_script_bindings()
         self.append_script_output(f"Bound {normalized_hotkey} to {abs_script_path} ({source_label})")
-        self.prime_script_runtime_cache(abs_script_path, announce=False)
+        self.prime_script_runtime_cache(abs_script_path)
         self.hotkey_input.clear()
         self.update_runtime_summary()
 
@@ -2210,19 +3667,30 @@ class ModMenu(QMainWindow):
         try:
             trigger_text = self.extract_hotkey_from_script(abs_script_path)
             normalized_hotkey = self.normalize_hotkey(trigger_text)
+            if normalized_hotkey == STOP_SCRIPTS_HOTKEY:
+                raise ValueError(f"{STOP_SCRIPTS_HOTKEY} is reserved for stopping all scripts.")
         except ValueError as exc:
+            normalized_hotkey = None
             parsing_error = str(exc)
 
+        # The binding is rebuilt from the trigger; it keeps the run policy set on the trigger's hotkey,
+        # or on the hotkey it moves from
+        kept_policy = None
+        if normalized_hotkey in existing_for_script:
+            kept_policy = self.binding_run_policies.get(normalized_hotkey)
         changed = False
         for hotkey in existing_for_script:
             del self.script_bindings[hotkey]
+            policy = self.binding_run_policies.pop(hotkey, None)
+            if kept_policy is None:
+                kept_policy = policy
             changed = True
 
         if normalized_hotkey is None:
             if changed:
                 self.save_script_bindings()
                 self.refresh_script_bindings_list()
-                self.restart_hotkey_listener()
+                self.apply_script_bindings()
                 if announce_changes:
                     self.append_script_output(f"Removed bindings for {abs_script_path} (no valid --<...> trigger).")
                 self.update_runtime_summary()
@@ -2235,7 +3703,7 @@ class ModMenu(QMainWindow):
             if changed:
                 self.save_script_bindings()
                 self.refresh_script_bindings_list()
-                self.restart_hotkey_listener()
+                self.apply_script_bindings()
                 self.update_runtime_summary()
             if announce_changes:
                 self.append_script_output(
@@ -2246,12 +3714,14 @@ class ModMenu(QMainWindow):
 
         if self.script_bindings.get(normalized_hotkey) != abs_script_path:
             self.script_bindings[normalized_hotkey] = abs_script_path
+            if kept_policy is not None:
+                self.binding_run_policies[normalized_hotkey] = kept_policy
             changed = True
 
         if changed:
             self.save_script_bindings()
             self.refresh_script_bindings_list()
-            self.restart_hotkey_listener()
+            self.apply_script_bindings()
             if announce_changes:
                 self.append_script_output(
                     f"Synced script trigger {normalized_hotkey} from {abs_script_path}."
@@ -2275,12 +3745,27 @@ class ModMenu(QMainWindow):
         self.corel_runtime_module = module
         return module
 
-    def ensure_corel_executable(self):
+    def get_corel_compiler_library_path(self):
+        target_dir = os.path.join(self.project_root, 'corel', 'target', 'debug')
+        if os.name == 'nt':
+            return os.path.join(target_dir, 'corel_compiler.dll')
+        if sys.platform == 'darwin':
+            return os.path.join(target_dir, 'libcorel_compiler.dylib')
+        return os.path.join(target_dir, 'libcorel_compiler.so')
+
+    def is_corel_build_stale(self, artifact_path):
+        if not os.path.exists(artifact_path):
+            return True
+        corel_dir = os.path.join(self.project_root, 'corel')
+        artifact_mtime = os.path.getmtime(artifact_path)
+        sources = [os.path.join(corel_dir, 'Cargo.toml')]
+        src_dir = os.path.join(corel_dir, 'src')
+        if os.path.isdir(src_dir):
+            sources.extend(os.path.join(src_dir, name) for name in os.listdir(src_dir) if name.endswith('.rs'))
+        return any(os.path.getmtime(path) > artifact_mtime for path in sources if os.path.exists(path))
+
+    def build_corel(self):
         corel_dir = os.path.join(self.project_root, 'corel')
-        corel_exe = os.path.join(corel_dir, 'target', 'debug', 'corel.exe')
-        if os.path.exists(corel_exe):
-            return corel_exe
-
         result = subprocess.run(
             ["cargo", "build"],
             cwd=corel_dir,
@@ -2291,94 +3776,388 @@ class ModMenu(QMainWindow):
             stderr = result.stderr.strip()
             stdout = result.stdout.strip()
             details = stderr or stdout or "unknown cargo build error"
-            raise RuntimeError(f"Failed to build corel.exe: {details}")
+            raise RuntimeError(f"Failed to build Corel: {details}")
+
+    def get_corel_compiler_library(self):
+        with self.corel_compiler_library_lock:
+            if self.corel_compiler_library is not None:
+                return self.corel_compiler_library
+            if self.corel_compiler_library_error is not None:
+                return None
+
+            library_path = self.get_corel_compiler_library_path()
+            try:
+                if self.is_corel_build_stale(library_path):
+                    self.build_corel()
+                if not os.path.exists(library_path):
+                    raise RuntimeError(f"Corel compiler library not found after build: {library_path}")
+
+                library = ctypes.CDLL(library_path)
+                library.corel_compile.argtypes = [
+                    ctypes.c_char_p, ctypes.c_size_t, ctypes.c_uint32, ctypes.c_uint32, ctypes.c_uint32,
+                    ctypes.POINTER(ctypes.c_size_t)
+                ]
+                library.corel_compile.restype = ctypes.c_void_p
+                library.corel_tokenize.argtypes = [
+                    ctypes.c_char_p, ctypes.c_size_t, ctypes.POINTER(ctypes.c_size_t)
+                ]
+                library.corel_tokenize.restype = ctypes.c_void_p
+                library.corel_free.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+                library.corel_free.restype = None
+            except Exception as exc:
+                # Remember the failure so every compile does not retry the build; the subprocess path takes over.
+                self.corel_compiler_library_error = str(exc)
+                return None
+
+            self.corel_compiler_library = library
+            return library
+
+    def compile_corel_source_inprocess(
+        self, library, source, output_format=COREL_FORMAT_BINARY, opt_level=COREL_OPT_LEVEL,
+        max_loop_depth=COREL_MAX_LOOP_DEPTH
+    ):
+        out_len = ctypes.c_size_t(0)
+        buffer = library.corel_compile(
+            source, len(source), output_format, opt_level, max_loop_depth, ctypes.byref(out_len)
+        )
+        if not buffer:
+            raise RuntimeError(
+                f"Corel compiler rejected the script (invalid UTF-8, or loops nested deeper than {COREL_MAX_LOOP_DEPTH})"
+            )
+        try:
+            return ctypes.string_at(buffer, out_len.value)
+        finally:
+            library.corel_free(buffer, out_len.value)
+
+    def tokenize_corel_source_inprocess(self, library, source):
+        # [(kind, text)] from corel_tokenize, or None if the library rejects the source
+        source_bytes = source.encode('utf-8')
+        out_len = ctypes.c_size_t(0)
+        buffer = library.corel_tokenize(source_bytes, len(source_bytes), ctypes.byref(out_len))
+        if not buffer:
+            return None
+        try:
+            records = ctypes.string_at(buffer, out_len.value)
+        finally:
+            library.corel_free(buffer, out_len.value)
+        return [
+            (COREL_TOKEN_KINDS[kind], source_bytes[start:start + length].decode('utf-8'))
+            for kind, start, length in COREL_TOKEN_RECORD.iter_unpack(records)
+        ]
+
+    def tokenize_corel_source(self, source):
+        # The Rust lexer's tokens when the compiler library loads, the regex mirror's otherwise
+        library = self.get_corel_compiler_library()
+        if library is not None:
+            tokens = self.tokenize_corel_source_inprocess(library, source)
+            if tokens is not None:
+                return tokens
+        return corel_regex_tokens(source)
+
+    def get_corel_compiler_daemon(self):
+        with self.corel_compiler_daemon_lock:
+            if self.corel_compiler_daemon is not None:
+                return self.corel_compiler_daemon
+            if self.corel_compiler_daemon_error is not None:
+                return None
+
+            try:
+                daemon = CorelCompilerDaemon(self.ensure_corel_executable())
+                with daemon.lock:
+                    daemon.start()
+            except Exception as exc:
+                self.corel_compiler_daemon_error = str(exc)
+                return None
+
+            self.corel_compiler_daemon = daemon
+            return daemon
+
+    def stop_corel_compiler_daemon(self):
+        with self.corel_compiler_daemon_lock:
+            daemon = self.corel_compiler_daemon
+            self.corel_compiler_daemon = None
+        if daemon is not None:
+            daemon.terminate()
+
+    def ensure_corel_executable(self):
+        corel_dir = os.path.join(self.project_root, 'corel')
+        corel_exe = os.path.join(corel_dir, 'target', 'debug', 'corel.exe')
+        if not self.is_corel_build_stale(corel_exe):
+            return corel_exe
+
+        try:
+            self.build_corel()
+        except RuntimeError:
+            if os.path.exists(corel_exe):
+                return corel_exe
+            raise
 
         if not os.path.exists(corel_exe):
             raise RuntimeError(f"corel.exe not found after build: {corel_exe}")
 
         return corel_exe
 
-    def compile_script_ast(self, script_path):
+    def compile_script_binary(self, source):
+        # Compiles source bytes to a binary AST through the fastest compiler available.
         runtime = self.get_corel_runtime_module()
-        corel_dir = os.path.join(self.project_root, 'corel')
-        corel_input = os.path.join(corel_dir, 'corel.corel')
-        ast_path = os.path.join(corel_dir, 'ast.json')
-        corel_exe = self.ensure_corel_executable()
 
-        shutil.copyfile(script_path, corel_input)
+        # Fast path: call the compiler library in-process (no process spawn or temp files).
+        library = self.get_corel_compiler_library()
+        if library is not None:
+            return self.compile_corel_source_inprocess(library, source)
+
+        # Next best: the resident `corel serve` process, which pays the spawn cost once per session.
+        daemon = self.get_corel_compiler_daemon()
+        if daemon is not None:
+            try:
+                ast_bytes = daemon.compile(source)
+            except CorelDaemonTimeout:
+                # The hung daemon was killed and the next compile starts a new one; this one takes the fallback.
+                pass
+            except CorelDaemonUnavailable as exc:
+                # The daemon could not be (re)started, e.g. an older corel.exe without `serve`.
+                self.corel_compiler_daemon_error = str(exc)
+                self.stop_corel_compiler_daemon()
+            else:
+                return ast_bytes
+
+        # Fallback: one-shot compiler process over stdin/stdout, so concurrent compiles never share files.
+        corel_exe = self.ensure_corel_executable()
         parse_result = subprocess.run(
-            [corel_exe],
-            cwd=corel_dir,
-            capture_output=True,
-            text=True
+            [
+                corel_exe, "compile", "-", "--format", "binary", "--opt-level", str(COREL_OPT_LEVEL),
+                "--max-loop-depth", str(COREL_MAX_LOOP_DEPTH)
+            ],
+            input=source,
+            capture_output=True
         )
         if parse_result.returncode != 0:
-            stderr = parse_result.stderr.strip()
-            stdout = parse_result.stdout.strip()
-            details = stderr or stdout or "unknown parser error"
+            stderr = parse_result.stderr.decode('utf-8', errors='replace').strip()
+            details = stderr or "unknown parser error"
             raise RuntimeError(f"Corel parser failed: {details}")
+        if not parse_result.stdout.startswith(runtime.AST_BINARY_MAGIC):
+            raise RuntimeError(f"{corel_exe} did not return an AST; rebuild it with cargo build")
 
-        if not os.path.exists(ast_path):
-            raise RuntimeError(f"AST file not generated: {ast_path}")
+        return parse_result.stdout
 
-        with open(ast_path, 'r') as file:
-            json_data = json.load(file)
+    def compile_scripts_batch(self, script_paths):
+        # One parallel `corel compile` run per batch; batches keep the command line under Windows' limit.
+        # Returns the binary AST of every script that compiled.
+        corel_exe = self.ensure_corel_executable()
+        compiled = {}
+        batches = [[]]
+        batch_length = 0
+        for path in script_paths:
+            if batches[-1] and batch_length + len(path) > 24000:
+                batches.append([])
+                batch_length = 0
+            batches[-1].append(path)
+            batch_length += len(path) + 1
+
+        with tempfile.TemporaryDirectory(prefix='corel-batch-') as out_dir:
+            for batch in batches:
+                result = subprocess.run(
+                    [
+                        corel_exe, "compile", *batch, "--out-dir", out_dir,
+                        "--format", "binary", "--opt-level", str(COREL_OPT_LEVEL),
+                        "--max-loop-depth", str(COREL_MAX_LOOP_DEPTH)
+                    ],
+                    capture_output=True,
+                    text=True
+                )
+                for line in result.stdout.splitlines():
+                    input_path, _separator, output_path = line.partition('\t')
+                    if not output_path:
+                        continue
+                    with open(output_path, 'rb') as file:
+                        compiled[input_path] = file.read()
+        return compiled
+
+    def make_script_cache_entry(self, mtime, ast, program=None):
+        # The bytecode program is lowered once here so every run starts executing immediately.
+        if program is None:
+            program = self.get_corel_runtime_module().compile_program(ast)
+        return {
+            'mtime': mtime,
+            'ast': ast,
+            'program': program,
+            'size': len(program.code)
+        }
 
-        return runtime.build_ast_from_json(json_data)
+    def get_corel_compiler_fingerprint(self):
+        # Compiled artifacts depend on the compiler sources, the runtime's lowering and the opt level.
+        corel_dir = os.path.join(self.project_root, 'corel')
+        src_dir = os.path.join(corel_dir, 'src')
+        paths = [os.path.join(corel_dir, 'Cargo.toml'), os.path.join(corel_dir, 'corel_interpreter.py')]
+        if os.path.isdir(src_dir):
+            paths.extend(sorted(os.path.join(src_dir, name) for name in os.listdir(src_dir) if name.endswith('.rs')))
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{ScriptDiskCache.FORMAT_VERSION}:{COREL_OPT_LEVEL}:{COREL_MAX_LOOP_DEPTH}".encode())
+        for path in paths:
+            digest.update(os.path.basename(path).encode())
+            try:
+                with open(path, 'rb') as file:
+                    digest.update(file.read())
+            except OSError:
+                digest.update(b'\0')
+        return digest.digest()
+
+    def get_script_disk_cache(self):
+        with self.script_disk_cache_lock:
+            if self.script_disk_cache is None:
+                self.script_disk_cache = ScriptDiskCache(
+                    os.path.join(self.project_root, 'corel', 'cache'),
+                    self.get_corel_compiler_fingerprint()
+                )
+            return self.script_disk_cache
 
-    def get_cached_script_ast(self, script_path):
-        abs_script_path = os.path.abspath(script_path)
-        mtime = os.path.getmtime(abs_script_path)
-        cache_entry = self.script_runtime_cache.get(abs_script_path)
-        if cache_entry and cache_entry.get('mtime') == mtime and cache_entry.get('ast') is not None:
-            return cache_entry['ast']
+    def load_script_entry(self, key, mtime):
+        artifact = self.get_script_disk_cache().load(key)
+        if artifact is None:
+            return None
+        runtime = self.get_corel_runtime_module()
+        ast_bytes, code, recovery = artifact
+        return self.make_script_cache_entry(
+            mtime, runtime.build_ast_from_binary(ast_bytes), runtime.CorelProgram(code, recovery)
+        )
 
-        ast = self.compile_script_ast(abs_script_path)
-        self.script_runtime_cache[abs_script_path] = {
-            'mtime': mtime,
-            'ast': ast
-        }
+    def store_script_entry(self, key, mtime, ast_bytes):
+        runtime = self.get_corel_runtime_module()
+        cache_entry = self.make_script_cache_entry(mtime, runtime.build_ast_from_binary(ast_bytes))
+        program = cache_entry['program']
+        try:
+            self.get_script_disk_cache().store(key, ast_bytes, program.code, program.recovery)
+        except OSError:
+            # A read-only or full disk only costs the next session a recompile.
+            pass
+        return cache_entry
+
+    def compile_script_entry(self, abs_script_path, mtime):
+        # Runs on the compile pool; the cache stores the result. The disk cache is checked first,
+        # so scripts compiled in an earlier session (or copies of them) never reach the compiler.
+        disk_cache = self.get_script_disk_cache()
+        key, source = disk_cache.key_for(abs_script_path)
+        cache_entry = self.load_script_entry(key, mtime)
+        if cache_entry is not None:
+            return cache_entry
+
+        if source is None:
+            with open(abs_script_path, 'rb') as file:
+                source = file.read()
+            key = disk_cache.source_key(source)
+        return self.store_script_entry(key, mtime, self.compile_script_binary(source))
+
+    def on_script_compiled(self, script_path, error):
+        self.script_compile_status[script_path] = error
+        self.script_library_model.refresh_details()
         self.update_runtime_summary()
-        return ast
 
-    def prime_script_runtime_cache(self, script_path, announce=False):
+    def prime_script_runtime_cache(self, script_path):
+        return self.script_runtime_cache.submit(script_path)
+
+    def prewarm_script_runtime_cache_batch(self, script_paths):
+        # Returns the scripts the batch run could not compile so the caller can retry them one by one.
+        abs_paths = [os.path.abspath(path) for path in script_paths]
         try:
-            self.get_cached_script_ast(script_path)
-            if announce:
-                self.append_script_output(f"Prepared runtime cache for {os.path.abspath(script_path)}")
-        except Exception as exc:
-            if announce:
-                self.append_script_output(f"Could not prepare runtime cache: {exc}")
+            mtimes = {path: os.path.getmtime(path) for path in abs_paths}
+            compiled = self.compile_scripts_batch(abs_paths)
+        except Exception:
+            return abs_paths
 
-    def prewarm_script_runtime_cache_async(self):
-        scripts = [path for path in self.script_bindings.values() if os.path.exists(path)]
-        if not scripts:
-            return
+        pending = [path for path in abs_paths if path not in compiled]
+        disk_cache = self.get_script_disk_cache()
+        for path, ast_bytes in compiled.items():
+            try:
+                key, _source = disk_cache.key_for(path)
+                self.script_runtime_cache.put(path, self.store_script_entry(key, mtimes[path], ast_bytes))
+            except Exception:
+                pending.append(path)
+        return pending
 
-        def worker():
-            for path in scripts:
-                self.prime_script_runtime_cache(path, announce=False)
+    def load_script_runtime_cache_from_disk(self, script_path):
+        # Returns whether the script was found in the disk cache and loaded into memory.
+        abs_script_path = os.path.abspath(script_path)
+        try:
+            mtime = os.path.getmtime(abs_script_path)
+            key, _source = self.get_script_disk_cache().key_for(abs_script_path)
+            cache_entry = self.load_script_entry(key, mtime)
+        except Exception:
+            return False
+        if cache_entry is None:
+            return False
+        self.script_runtime_cache.put(abs_script_path, cache_entry)
+        self.script_compiled_signal.emit(abs_script_path, "")
+        return True
+
+    def prewarm_script_runtime_cache(self, scripts):
+        # Calibrating the wait scheduler's spin threshold here keeps it off the first run.
+        try:
+            self.get_corel_runtime_module().calibrate_spin_threshold_ns()
+            if os.name == 'nt':
+                self.get_script_run_scheduler()
+        except Exception:
+            pass
+        # With a warm disk cache nothing is left pending and the compiler is never started;
+        # only the scripts the disk cache missed are compiled.
+        pending = [path for path in scripts if not self.load_script_runtime_cache_from_disk(path)]
+        if not pending:
+            return
+        if self.get_corel_compiler_library() is None and self.get_corel_compiler_daemon() is None:
+            pending = self.prewarm_script_runtime_cache_batch(pending)
+        for path in pending:
+            self.prime_script_runtime_cache(path)
 
-        thread = threading.Thread(target=worker, daemon=True)
+    def prewarm_script_runtime_cache_async(self):
+        scripts = [path for path in self.script_bindings.values() if os.path.exists(path)]
+        thread = threading.Thread(target=self.prewarm_script_runtime_cache, args=(scripts,), daemon=True)
         thread.start()
 
-    def execute_script_inprocess_thread(self, script_path, ast_nodes):
-        success = True
-        message = "Script finished successfully."
-        try:
-            runtime = self.get_corel_runtime_module()
-            interpreter = runtime.CorelInterpreter(ast_nodes)
-            interpreter.run()
-        except Exception as exc:
-            success = False
-            message = f"Script finished with errors: {exc}"
-        self.inprocess_finished_signal.emit(success, message)
+    def get_script_run_scheduler(self):
+        # Started by the prewarm thread, so the first trigger finds its runtime threads already waiting.
+        with self.script_run_scheduler_lock:
+            if self.script_run_scheduler is None:
+                self.script_run_scheduler = self.get_corel_runtime_module().CorelRunScheduler(
+                    on_finished=self.on_script_run_finished, executor=COREL_EXECUTOR
+                )
+            return self.script_run_scheduler
+
+    def on_script_run_finished(self, script_path, stats, error, stopped):
+        # Called on the runner thread.
+        name = os.path.basename(script_path)
+        if error is not None:
+            self.inprocess_finished_signal.emit(False, f"{name}: script finished with errors: {error}")
+            return
+        message = f"{name}: script stopped." if stopped else f"{name}: script finished successfully."
+        if stats['waits']:
+            message += f" (timing drift {stats['drift_ns'] / 1e6:.2f} ms over {stats['waits']} waits)"
+        self.inprocess_finished_signal.emit(True, message)
 
     def on_inprocess_script_finished(self, success, message):
-        with self.script_state_lock:
-            self.script_running_inprocess = False
         self.append_script_output(message)
-        self.run_script_button.setEnabled(True)
+        self.refresh_run_button()
+        self.update_runtime_summary()
+
+    def is_current_script_running(self):
+        scheduler = self.script_run_scheduler
+        return (
+            scheduler is not None and self.current_script_path is not None
+            and scheduler.is_running(os.path.abspath(self.current_script_path))
+        )
+
+    def refresh_run_button(self):
+        if hasattr(self, 'run_script_button'):
+            self.set_widget_text(self.run_script_button, "Stop" if self.is_current_script_running() else "Run")
+
+    def on_script_run_outcome(self, script_path, outcome):
+        name = os.path.basename(script_path)
+        if outcome == 'started':
+            self.append_script_output(f"Running script: {script_path}")
+        elif outcome in ('queued', 'restarting', 'stopping'):
+            self.append_script_output(f"{name}: {outcome}")
+        else:
+            self.append_script_output(f"{name}: not started ({outcome})")
+        self.refresh_run_button()
         self.update_runtime_summary()
 
     def remove_selected_script_binding(self):
@@ -2400,9 +4179,10 @@ class ModMenu(QMainWindow):
 
         if hotkey in self.script_bindings:
             del self.script_bindings[hotkey]
+            self.binding_run_policies.pop(hotkey, None)
             self.save_script_bindings()
             self.refresh_script_bindings_list()
-            self.restart_hotkey_listener()
+            self.apply_script_bindings()
             self.append_script_output(f"Removed binding {hotkey}")
             self.update_runtime_summary()
 
@@ -2410,6 +4190,7 @@ class ModMenu(QMainWindow):
         modified_suffix = ""
         if hasattr(self, 'script_editor') and self.script_editor.document().isModified():
             modified_suffix = " *"
+        self.refresh_run_button()
         if self.current_script_path:
             abs_path = os.path.abspath(self.current_script_path)
             self.current_script_label.setText(f"Current file: {os.path.basename(abs_path)}{modified_suffix}")
@@ -2426,8 +4207,7 @@ class ModMenu(QMainWindow):
         self.mark_editor_clean()
         self.update_current_script_label()
         self.sync_script_binding_from_script(abs_path, announce_changes=announce_sync, allow_new_binding=False)
-        self.prime_script_runtime_cache(abs_path, announce=False)
-        self.refresh_script_library_list()
+        self.prime_script_runtime_cache(abs_path)
 
     def open_script_from_binding_item(self, item):
         hotkey = item.data(Qt.UserRole)
@@ -2436,7 +4216,7 @@ class ModMenu(QMainWindow):
             return
         if not os.path.exists(script_path):
             self.append_script_output(f"Bound script no longer exists: {script_path}")
-            self.restart_hotkey_listener()
+            self.check_script_bindings()
             return
 
         try:
@@ -2456,8 +4236,7 @@ class ModMenu(QMainWindow):
             self.mark_editor_clean()
             self.update_current_script_label()
             self.sync_script_binding_from_script(self.current_script_path, announce_changes=False, allow_new_binding=False)
-            self.prime_script_runtime_cache(self.current_script_path, announce=False)
-            self.refresh_script_library_list()
+            self.prime_script_runtime_cache(self.current_script_path)
 
     def load_script(self):
         path, _ = QFileDialog.getOpenFileName(self, "Open Script", self.project_root, "Corel Files (*.corel)")
@@ -2488,15 +4267,13 @@ class ModMenu(QMainWindow):
         try:
             os.remove(path)
             abs_path = os.path.abspath(path)
-            if abs_path in self.script_runtime_cache:
-                del self.script_runtime_cache[abs_path]
+            self.script_runtime_cache.discard(abs_path)
             if os.path.abspath(path) == os.path.abspath(self.current_script_path or ""):
                 self.current_script_path = None
                 self.script_editor.clear()
                 self.mark_editor_clean()
             self.update_current_script_label()
             self.append_script_output(f"Deleted script: {path}")
-            self.refresh_script_library_list()
             self.update_runtime_summary()
         except OSError as exc:
             QMessageBox.critical(self, "Delete Script", f"Failed to delete script:\n{exc}")
@@ -2531,26 +4308,27 @@ class ModMenu(QMainWindow):
         self.update_runtime_summary()
 
     def run_script_clicked(self):
+        if self.is_current_script_running():
+            self.script_run_scheduler.stop(os.path.abspath(self.current_script_path))
+            return
         auto_save = self.auto_save_on_run_checkbox.isChecked() if hasattr(self, 'auto_save_on_run_checkbox') else True
         self.run_script(save_current=auto_save, trigger_source="manual")
 
-    def run_script_from_hotkey(self, script_path, hotkey):
-        self.run_script(script_path=script_path, save_current=False, trigger_source=f"hotkey {hotkey}")
+    def run_script_from_hotkey(self, script_path, hotkey, policy):
+        # `policy` is the pressed hotkey's, read on the hook thread together with its held flag
+        self.run_script(
+            script_path=script_path,
+            save_current=False,
+            trigger_source=f"hotkey {hotkey}",
+            policy=policy,
+            held=self.hotkey_held_events.get(hotkey)
+        )
 
-    def run_script(self, script_path=None, save_current=True, trigger_source="manual"):
+    def run_script(self, script_path=None, save_current=True, trigger_source="manual", policy=DEFAULT_RUN_POLICY, held=None):
         if os.name != 'nt':
             self.append_script_output("Running Corel scripts is currently supported only on Windows.")
             return
 
-        with self.script_state_lock:
-            if self.script_running_inprocess:
-                self.append_script_output("A script is already running.")
-                return
-
-        if self.corel_process and self.corel_process.state() != QProcess.NotRunning:
-            self.append_script_output("A script is already running.")
-            return
-
         if script_path is None:
             if not self.current_script_path:
                 self.current_script_path, _ = QFileDialog.getSaveFileName(
@@ -2573,36 +4351,50 @@ class ModMenu(QMainWindow):
 
         clear_before_run = self.clear_output_before_run_checkbox.isChecked() if hasattr(self, 'clear_output_before_run_checkbox') else True
 
-        # Fast path: run precompiled AST in-process (avoids per-trigger process startup).
+        if clear_before_run:
+            self.script_output.clear()
+        self.append_script_output(f"Trigger: {trigger_source}")
+
+        # Fast path: run the cached bytecode program in-process (avoids per-trigger process startup).
+        # If the script is still compiling, the run attaches to that compile and starts when it lands.
+        job = self.script_runtime_cache.submit(script_path)
+        job.add_done_callback(lambda future: self.dispatch_compiled_script(script_path, future, policy, held))
+
+    def dispatch_compiled_script(self, script_path, future, policy=DEFAULT_RUN_POLICY, held=None):
+        # Runs on the thread that finished the compile, or right here on a cache hit. The scheduler applies
+        # the binding's policy and hands the run to a warm runner; failures go back to the GUI thread for the runner fallback.
+        if not future.cancelled() and future.exception() is None:
+            try:
+                scheduler = self.get_script_run_scheduler()
+                outcome = scheduler.trigger(script_path, future.result()['program'], policy, held)
+                self.script_run_outcome_signal.emit(script_path, outcome)
+                return
+            except Exception:
+                pass
+        self.script_compile_ready_signal.emit(script_path, future)
+
+    def start_compiled_script(self, script_path, future):
         try:
-            ast_nodes = self.get_cached_script_ast(script_path)
-            if clear_before_run:
-                self.script_output.clear()
-            self.append_script_output(f"Trigger: {trigger_source}")
-            self.append_script_output(f"Running script: {script_path}")
-            self.run_script_button.setEnabled(False)
-            with self.script_state_lock:
-                self.script_running_inprocess = True
-            worker = threading.Thread(
-                target=self.execute_script_inprocess_thread,
-                args=(script_path, ast_nodes),
-                daemon=True
-            )
-            worker.start()
+            error = future.exception()
+        except CancelledError as exc:
+            error = exc
+        if error is None:
+            error = "runner pool unavailable"
+        # The runner fallback is a single process, so it still runs one script at a time
+        if self.corel_process and self.corel_process.state() != QProcess.NotRunning:
+            self.append_script_output("A script is already running.")
             return
-        except Exception as exc:
-            self.append_script_output(f"In-process runtime unavailable, using runner fallback: {exc}")
+        self.append_script_output(f"In-process runtime unavailable, using runner fallback: {error}")
+        self.run_script_with_runner(script_path)
 
+    def run_script_with_runner(self, script_path):
         corel_dir = os.path.join(self.project_root, 'corel')
         runner = os.path.join(corel_dir, 'corel.bat')
         if not os.path.exists(runner):
             self.append_script_output(f"Runner not found: {runner}")
+            self.run_script_button.setEnabled(True)
             return
 
-        if clear_before_run:
-            self.script_output.clear()
-        self.append_script_output(f"Trigger: {trigger_source}")
-        self.append_script_output(f"Running script: {script_path}")
         self.append_script_output("Please wait...")
 
         if self.corel_process:
@@ -2614,7 +4406,6 @@ class ModMenu(QMainWindow):
         self.corel_process.readyReadStandardError.connect(self.read_script_stderr)
         self.corel_process.finished.connect(self.on_script_finished)
 
-        self.run_script_button.setEnabled(False)
         self.corel_process.start("cmd.exe", ["/c", runner, script_path])
         if not self.corel_process.waitForStarted(3000):
             self.append_script_output("Failed to start script runner process.")
@@ -2625,15 +4416,7 @@ class ModMenu(QMainWindow):
             self.ui_stats_timer.stop()
 
         try:
-            if hasattr(self, 'listener') and self.listener is not None:
-                self.listener.stop()
-        except Exception:
-            pass
-
-        try:
-            if self.hotkey_listener is not None:
-                self.hotkey_listener.stop()
-                self.hotkey_listener = None
+            self.input_hub.stop()
         except Exception:
             pass
 
@@ -2641,8 +4424,15 @@ class ModMenu(QMainWindow):
             self.corel_process.kill()
             self.corel_process.waitForFinished(1000)
 
-        with self.script_state_lock:
-            self.script_running_inprocess = False
+        self.script_compile_executor.shutdown(wait=False, cancel_futures=True)
+        if self.script_run_scheduler is not None:
+            self.script_run_scheduler.shutdown()
+        self.stop_corel_compiler_daemon()
+
+        try:
+            self.preset_model.store.close()
+        except sqlite3.Error:
+            pass
 
         event.accept()
 
@@ -0,0 +1,96 @@
+# Threaded vs asyncio executor under many concurrent scripts: python corel/benches/async_executor.py
+# Starts `--scripts` timing-heavy scripts at once (500 by default): each presses and moves, then waits a few
+# milliseconds, for about `--seconds`. 'threads' runs them on a CorelRunnerPool with one worker per script;
+# 'asyncio' runs them as coroutines on a CorelAsyncRunner. Reports the process CPU time used while the scripts
+# ran (100% is one core busy) and how late waits woke up, from each run's wait scheduler stats.
+import argparse
+import importlib.util
+import os
+import random
+import threading
+import time
+
+runtime_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'corel_interpreter.py')
+spec = importlib.util.spec_from_file_location('corel_runtime', runtime_path)
+runtime = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(runtime)
+
+class NullInputBackend(runtime.InputBackend):
+    # Sends nothing, so the measurement is the executors' own overhead
+    def move(self, dx, dy):
+        pass
+
+    def press(self, key):
+        pass
+
+    def click(self, button):
+        pass
+
+runtime.INPUT_BACKENDS['null'] = NullInputBackend
+
+def make_programs(count, seconds, rng):
+    programs = []
+    for _ in range(count):
+        wait_ms = rng.randint(2, 20)
+        loop = runtime.LOOPnode('LOOP', max(int(seconds * 1000 / wait_ms), 1))
+        loop.children = [
+            runtime.PRESSnode('PRESS', 'f'),
+            runtime.MOVEXYnode('MOVEXY', 1, -1),
+            runtime.WAITnode('WAIT', wait_ms, 'ms')
+        ]
+        programs.append(runtime.compile_program([loop]))
+    return programs
+
+def measure(executor, programs):
+    results = []
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def on_finished(key, stats, error, stopped):
+        with lock:
+            results.append((stats, error))
+            if len(results) == len(programs):
+                done.set()
+
+    scheduler = runtime.CorelRunScheduler(len(programs), backend='null', on_finished=on_finished, executor=executor)
+    # Let the runtime threads start and calibrate before the clock starts, as the app's prewarm does
+    time.sleep(0.5)
+    threads = threading.active_count()
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    for index, program in enumerate(programs):
+        scheduler.trigger(f'script-{index}.corel', program)
+    done.wait()
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    scheduler.shutdown()
+
+    errors = [error for _stats, error in results if error is not None]
+    stats = [stats for stats, error in results if error is None]
+    waits = sum(entry['waits'] for entry in stats)
+    mean_lateness = sum(entry['mean_lateness_ns'] * entry['waits'] for entry in stats) / max(waits, 1)
+    worst = sorted(entry['max_lateness_ns'] for entry in stats)
+    drift = sorted(entry['drift_ns'] for entry in stats)
+    print(
+        f"{executor:8} threads {threads:>4}  wall {elapsed:6.2f} s  cpu {cpu:6.2f} s ({cpu / elapsed:4.0%})  "
+        f"waits {waits:>7}  lateness mean {mean_lateness / 1e3:8.1f} us  "
+        f"p50 max {worst[len(worst) // 2] / 1e3:8.1f} us  worst {worst[-1] / 1e3:8.1f} us  "
+        f"median drift {drift[len(drift) // 2] / 1e6:7.2f} ms"
+    )
+    if errors:
+        print(f"{executor:8} {len(errors)} runs failed: {errors[0]}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scripts', type=int, default=500)
+    parser.add_argument('--seconds', type=float, default=3.0, help='length of every script')
+    parser.add_argument('--executors', nargs='+', default=list(runtime.COREL_EXECUTORS), choices=runtime.COREL_EXECUTORS)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    programs = make_programs(args.scripts, args.seconds, random.Random(args.seed))
+    for executor in args.executors:
+        measure(executor, programs)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# Compile latency through the resident `corel serve` daemon vs. spawning `corel compile -` per script:
+# python corel/benches/compile_daemon.py
+# The daemon is what BASO uses when the compiler library cannot be loaded. Both paths compile the corel/test
+# fixtures and corel.corel to the optimized binary AST, and their output is compared. The daemon's start-up
+# (spawn plus first answer) is reported separately, since BASO pays it once per session.
+# Build first with `cargo build` in corel/, or point --executable at the binary.
+import argparse
+import struct
+import subprocess
+import sys
+import time
+
+# Fixture loading, the one-shot compile and the report are shared with the in-process bench
+from compile_latency import FORMAT_BINARY, OPT_BASIC, compile_subprocess, default_executable, load_sources, measure, report
+
+REQUEST_HEADER = struct.Struct('<BBHI')
+RESPONSE_HEADER = struct.Struct('<BxxxII')
+
+class Daemon:
+    def __init__(self, executable):
+        self.process = subprocess.Popen([executable, 'serve'], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def read_exact(self, length):
+        data = self.process.stdout.read(length)
+        if len(data) != length:
+            raise EOFError('corel serve closed its output')
+        return data
+
+    def compile(self, source):
+        self.process.stdin.write(REQUEST_HEADER.pack(FORMAT_BINARY, OPT_BASIC, 0, len(source)) + source)
+        self.process.stdin.flush()
+        status, ast_length, diagnostics_length = RESPONSE_HEADER.unpack(self.read_exact(RESPONSE_HEADER.size))
+        ast = self.read_exact(ast_length)
+        self.read_exact(diagnostics_length)
+        if status != 0:
+            raise RuntimeError('corel serve rejected the script')
+        return ast
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--executable', default=default_executable)
+    parser.add_argument('--rounds', type=int, default=20, help='passes over the fixtures')
+    args = parser.parse_args()
+
+    sources = load_sources()
+    started = time.perf_counter_ns()
+    daemon = Daemon(args.executable)
+    daemon.compile(sources[0][1])
+    startup_ns = time.perf_counter_ns() - started
+
+    for name, source in sources:
+        if daemon.compile(source) != compile_subprocess(args.executable, source):
+            print(f"FAIL: {name} compiles differently through the daemon and in a subprocess")
+            sys.exit(1)
+
+    print(f"daemon start-up {startup_ns / 1e3:.1f} us")
+    report('daemon', measure(daemon.compile, sources, args.rounds))
+    report('spawn', measure(lambda source: compile_subprocess(args.executable, source), sources, args.rounds))
+    daemon.close()
+
+if __name__ == '__main__':
+    main()
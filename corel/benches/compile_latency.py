@@ -0,0 +1,97 @@
+# Compile latency in-process vs. subprocess: python corel/benches/compile_latency.py
+# 'inprocess' calls corel_compile() in the compiler library through ctypes, as BASO does when the library is
+# built; 'subprocess' spawns `corel compile -` per script, the fallback BASO used to take for every compile.
+# Both compile the corel/test fixtures and corel.corel to the optimized binary AST, and their output is compared.
+# Build first with `cargo build` in corel/, or point --library / --executable at the artifacts.
+import argparse
+import ctypes
+import glob
+import os
+import subprocess
+import sys
+import time
+
+corel_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+target_dir = os.path.join(corel_dir, 'target', 'debug')
+if os.name == 'nt':
+    default_library = os.path.join(target_dir, 'corel_compiler.dll')
+    default_executable = os.path.join(target_dir, 'corel.exe')
+else:
+    default_library = os.path.join(target_dir, 'libcorel_compiler.dylib' if sys.platform == 'darwin' else 'libcorel_compiler.so')
+    default_executable = os.path.join(target_dir, 'corel')
+
+FORMAT_BINARY = 1
+OPT_BASIC = 1
+
+def load_sources():
+    paths = sorted(glob.glob(os.path.join(corel_dir, 'test', '*.corel'))) + [os.path.join(corel_dir, 'corel.corel')]
+    sources = []
+    for path in paths:
+        with open(path, 'rb') as file:
+            sources.append((os.path.basename(path), file.read()))
+    return sources
+
+def load_library(path):
+    library = ctypes.CDLL(path)
+    library.corel_compile.argtypes = [
+        ctypes.c_char_p, ctypes.c_size_t, ctypes.c_uint32, ctypes.c_uint32, ctypes.c_uint32,
+        ctypes.POINTER(ctypes.c_size_t)
+    ]
+    library.corel_compile.restype = ctypes.c_void_p
+    library.corel_free.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+    library.corel_free.restype = None
+    return library
+
+def compile_inprocess(library, source):
+    out_len = ctypes.c_size_t(0)
+    buffer = library.corel_compile(source, len(source), FORMAT_BINARY, OPT_BASIC, 0, ctypes.byref(out_len))
+    if not buffer:
+        raise RuntimeError('corel_compile rejected the script')
+    try:
+        return ctypes.string_at(buffer, out_len.value)
+    finally:
+        library.corel_free(buffer, out_len.value)
+
+def compile_subprocess(executable, source):
+    result = subprocess.run(
+        [executable, 'compile', '-', '--format', 'binary', '--opt-level', str(OPT_BASIC)], input=source, capture_output=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode('utf-8', errors='replace'))
+    return result.stdout
+
+def measure(compile_one, sources, rounds):
+    samples = []
+    for _ in range(rounds):
+        for _name, source in sources:
+            started = time.perf_counter_ns()
+            compile_one(source)
+            samples.append(time.perf_counter_ns() - started)
+    return samples
+
+def report(label, samples):
+    samples = sorted(samples)
+    print(
+        f"{label:10} compiles {len(samples):>5}  median {samples[len(samples) // 2] / 1e3:9.1f} us  "
+        f"p99 {samples[min(int(len(samples) * 0.99), len(samples) - 1)] / 1e3:9.1f} us  max {samples[-1] / 1e3:9.1f} us"
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--library', default=default_library)
+    parser.add_argument('--executable', default=default_executable)
+    parser.add_argument('--rounds', type=int, default=20, help='passes over the fixtures')
+    args = parser.parse_args()
+
+    sources = load_sources()
+    library = load_library(args.library)
+    for name, source in sources:
+        if compile_inprocess(library, source) != compile_subprocess(args.executable, source):
+            print(f"FAIL: {name} compiles differently in-process and in a subprocess")
+            sys.exit(1)
+
+    report('inprocess', measure(lambda source: compile_inprocess(library, source), sources, args.rounds))
+    report('subprocess', measure(lambda source: compile_subprocess(args.executable, source), sources, args.rounds))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+// Lexer throughput as scripts grow from 1 KB to 50 MB: `cargo bench --bench lexer`
+// Throughput should stay flat across sizes; a per-token rescan of the remaining input shows up as
+// throughput falling with size (the old regex-per-token lexer took 190 ms on 100 KB).
+use std::hint::black_box;
+
+use criterion::{criterion_group, criterion_main, BenchmarkId, Criterion, Throughput};
+use corel_compiler::corel_lexer::CorelLexer;
+
+const SIZES: [(&str, usize); 5] = [
+    ("1KB", 1_000),
+    ("100KB", 100_000),
+    ("1MB", 1_000_000),
+    ("10MB", 10_000_000),
+    ("50MB", 50_000_000),
+];
+
+// Cycles through every token class, including a non-ASCII comment the lexer has to skip
+fn script_of_size(size: usize) -> String {
+    let body = [
+        "press(\"a\")\n", "wait(15ms)\n", "move(-3y)\n", "move(12x)\n", "click('left')\n",
+        "loop(3){ move(2x) wait(1ms) }\n", "loop(*){ press('f') }\n", "// recoil step ✓\n"
+    ];
+    let mut script = String::with_capacity(size + 64);
+    script.push_str("--<F7>\n");
+    let mut index = 0;
+    while script.len() < size {
+        script.push_str(body[index % body.len()]);
+        index += 1;
+    }
+    script
+}
+
+fn bench_tokenize(c: &mut Criterion) {
+    let mut group = c.benchmark_group("tokenize");
+    group.sample_size(10);
+    for (name, size) in SIZES {
+        let source = script_of_size(size);
+        let tokens = CorelLexer { source_code: &source }.tokenize().len();
+        println!("{name}: {} bytes, {tokens} tokens", source.len());
+        group.throughput(Throughput::Bytes(source.len() as u64));
+        group.bench_with_input(BenchmarkId::from_parameter(name), source.as_str(), |bencher, source| {
+            bencher.iter(|| CorelLexer { source_code: black_box(source) }.tokenize())
+        });
+    }
+    group.finish();
+}
+
+criterion_group!(benches, bench_tokenize);
+criterion_main!(benches);
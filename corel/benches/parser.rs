@@ -0,0 +1,92 @@
+// Compile throughput on scripts nested up to the loop depth limit and on very long ones: `cargo bench --bench parser`
+use std::alloc::{GlobalAlloc, Layout, System};
+use std::hint::black_box;
+use std::sync::atomic::{AtomicUsize, Ordering};
+
+use criterion::{criterion_group, criterion_main, BenchmarkId, Criterion, Throughput};
+use corel_compiler::{compile_source, DEFAULT_MAX_LOOP_DEPTH, OPT_NONE};
+
+// Counts heap allocations so every case can report allocations per compile
+struct CountingAllocator;
+
+static ALLOCATIONS: AtomicUsize = AtomicUsize::new(0);
+
+unsafe impl GlobalAlloc for CountingAllocator {
+    unsafe fn alloc(&self, layout: Layout) -> *mut u8 {
+        ALLOCATIONS.fetch_add(1, Ordering::Relaxed);
+        System.alloc(layout)
+    }
+
+    unsafe fn realloc(&self, ptr: *mut u8, layout: Layout, new_size: usize) -> *mut u8 {
+        ALLOCATIONS.fetch_add(1, Ordering::Relaxed);
+        System.realloc(ptr, layout, new_size)
+    }
+
+    unsafe fn dealloc(&self, ptr: *mut u8, layout: Layout) {
+        System.dealloc(ptr, layout)
+    }
+}
+
+#[global_allocator]
+static GLOBAL: CountingAllocator = CountingAllocator;
+
+fn nested_script(depth: usize) -> String {
+    let mut script = String::from("--<F6>\n");
+    for _ in 0..depth {
+        script.push_str("loop(2){\n    move(1x)\n");
+    }
+    script.push_str("wait(5ms)\n");
+    for _ in 0..depth {
+        script.push_str("}\n");
+    }
+    script
+}
+
+fn long_script(statements: usize) -> String {
+    let body = [
+        "press(\"a\")\n", "wait(15ms)\n", "move(-3y)\n", "click('left')\n", "loop(3){ move(2x) wait(1ms) }\n", "// recoil step\n"
+    ];
+    let mut script = String::from("--<F7>\n");
+    for index in 0..statements {
+        script.push_str(body[index % body.len()]);
+    }
+    script
+}
+
+fn flat_script(statements: usize) -> String {
+    let body = ["press(\"a\")\n", "wait(15ms)\n", "move(-3y)\n", "move(4x)\n", "click('left')\n"];
+    let mut script = String::from("--<F8>\n");
+    for index in 0..statements {
+        script.push_str(body[index % body.len()]);
+    }
+    script
+}
+
+fn allocations_per_compile(source: &str) -> usize {
+    let before = ALLOCATIONS.load(Ordering::Relaxed);
+    black_box(compile_source(black_box(source), OPT_NONE, DEFAULT_MAX_LOOP_DEPTH));
+    ALLOCATIONS.load(Ordering::Relaxed) - before
+}
+
+fn bench_compile(c: &mut Criterion) {
+    // Deeper nesting is rejected, so the deepest script that compiles sits at the limit
+    let cases = [
+        (format!("nested-{DEFAULT_MAX_LOOP_DEPTH}"), nested_script(DEFAULT_MAX_LOOP_DEPTH)),
+        ("long-10000".to_string(), long_script(10_000)),
+        ("long-1000000".to_string(), long_script(1_000_000)),
+        ("flat-1000000".to_string(), flat_script(1_000_000)),
+    ];
+
+    let mut group = c.benchmark_group("compile");
+    for (name, source) in &cases {
+        println!("{name}: {} bytes, {} allocations per compile", source.len(), allocations_per_compile(source));
+        group.throughput(Throughput::Bytes(source.len() as u64));
+        group.bench_with_input(BenchmarkId::from_parameter(name), source.as_str(), |bencher, source| {
+            bencher.iter(|| compile_source(black_box(source), OPT_NONE, DEFAULT_MAX_LOOP_DEPTH))
+        });
+    }
+    group.finish();
+}
+
+criterion_group!(benches, bench_compile);
+criterion_main!(benches);
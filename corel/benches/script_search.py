@@ -0,0 +1,128 @@
+# Library search latency over a synthetic script library: python corel/benches/script_search.py
+# Indexes --scripts generated scripts with ScriptSearchIndex, once through corel_tokenize in the compiler library
+# and once through the regex fallback, then times the search box: ScriptLibraryModel.set_query, which ranks the
+# hits and builds the rows the list view shows. Broad queries match most of the library.
+# Build first with `cargo build` in corel/, or point --library at the artifact; without it only the regex is timed.
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import time
+
+from PyQt5.QtWidgets import QApplication
+
+corel_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+target_dir = os.path.join(corel_dir, 'target', 'debug')
+if os.name == 'nt':
+    default_library = os.path.join(target_dir, 'corel_compiler.dll')
+else:
+    default_library = os.path.join(target_dir, 'libcorel_compiler.dylib' if sys.platform == 'darwin' else 'libcorel_compiler.so')
+
+QUERIES = ['press', 'p', 'move', 'press:f', 'trigger:ctrl+k', 'loop>1500', 'press:f loop>100', 'press move', 'spry', 'zzz']
+
+class LibraryHost:
+    # The part of ModMenu that loads the compiler library
+    def __init__(self, baso, library_path):
+        self.baso = baso
+        self.library_path = library_path
+        self.project_root = os.path.join(corel_dir, '..')
+        self.corel_compiler_library = None
+        self.corel_compiler_library_error = None
+        self.corel_compiler_library_lock = baso.threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.baso.ModMenu, name).__get__(self)
+
+    def get_corel_compiler_library_path(self):
+        return self.library_path
+
+    def is_corel_build_stale(self, artifact_path):
+        return False
+
+def load_baso(path):
+    spec = importlib.util.spec_from_file_location('BASO', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def generate_scripts(count, seed):
+    rng = random.Random(seed)
+    keys = 'abcdefghijklmnopqrstuvwxyz'
+    words = ['spray', 'burst', 'recoil', 'tap', 'hold', 'strafe', 'peek', 'reload', 'crouch', 'jump']
+    scripts = []
+    for index in range(count):
+        name = f"{rng.choice(words)}_{rng.choice(words)}_{index}"
+        lines = [f"--<{rng.choice(['ctrl+', 'alt+', 'shift+', ''])}{rng.choice(keys)}>"]
+        lines.append(f"// {' '.join(rng.sample(words, 3))}")
+        for _ in range(rng.randint(3, 30)):
+            roll = rng.random()
+            if roll < 0.3:
+                lines.append(f"press('{rng.choice(keys)}')")
+            elif roll < 0.55:
+                lines.append(f"move({rng.randint(-50, 50)}x, {rng.randint(-50, 50)}y)")
+            elif roll < 0.75:
+                lines.append(f"wait({rng.randint(1, 200)}ms)")
+            elif roll < 0.85:
+                lines.append(f"click('{rng.choice(['left', 'right'])}')")
+            else:
+                lines.append(f"loop({rng.randint(1, 2000)}) {{ move(0x, 1y) wait(10ms) }}")
+        scripts.append((os.path.join('library', f"{name}.corel"), '\n'.join(lines) + '\n'))
+    return scripts
+
+def build_index(baso, scripts, tokenize):
+    index = baso.ScriptSearchIndex()
+    started = time.perf_counter()
+    for path, source in scripts:
+        index.update(path, source, tokenize(source))
+    return index, time.perf_counter() - started
+
+def time_queries(baso, index, paths, repeats):
+    model = baso.ScriptLibraryModel('library', search=index.search)
+    model.set_scripts(paths)
+    for query in QUERIES:
+        samples = []
+        for _ in range(repeats):
+            model.set_query('')
+            started = time.perf_counter()
+            model.set_query(query)
+            samples.append(time.perf_counter() - started)
+        samples.sort()
+        print(f"  {query!r:22} hits {model.match_count:>6}  rows {model.rowCount():>4}  "
+              f"median {samples[len(samples) // 2] * 1e3:6.2f} ms  max {samples[-1] * 1e3:6.2f} ms")
+
+def main():
+    default_baso = os.path.join(corel_dir, '..', 'BASO.py')
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--baso', default=default_baso, help='BASO.py to measure, e.g. a copy of an older revision')
+    parser.add_argument('--library', default=default_library)
+    parser.add_argument('--scripts', type=int, default=10_000)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    _app = QApplication.instance() or QApplication(sys.argv[:1])
+    baso = load_baso(os.path.abspath(args.baso))
+    scripts = generate_scripts(args.scripts, args.seed)
+    paths = [path for path, _source in scripts]
+
+    tokenizers = [('regex', baso.corel_regex_tokens)]
+    host = LibraryHost(baso, args.library)
+    if os.path.exists(args.library) and host.get_corel_compiler_library() is not None:
+        tokenizers.insert(0, ('corel_tokenize', host.tokenize_corel_source))
+    else:
+        print(f"compiler library not available ({args.library}), timing the regex fallback only")
+
+    indexes = []
+    for label, tokenize in tokenizers:
+        index, elapsed = build_index(baso, scripts, tokenize)
+        print(f"{label:15} indexed {len(scripts)} scripts in {elapsed:.2f} s")
+        indexes.append(index)
+    if len(indexes) == 2:
+        assert all(indexes[0].document(path).terms == indexes[1].document(path).terms for path in paths)
+
+    print('search box')
+    time_queries(baso, indexes[0], paths, args.repeats)
+
+if __name__ == '__main__':
+    main()
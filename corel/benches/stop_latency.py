@@ -0,0 +1,122 @@
+# Stop latency of running scripts: python corel/benches/stop_latency.py
+# Starts a script through a CorelRunScheduler, lets it run for a random 20-60 ms and stops it. Latency is measured
+# from the stop() call to the last input the script submitted to the (batching) backend, and to the moment the run
+# reported back as stopped.
+# Scenarios cover a tight loop(*) of moves, a loop(*) parked in a long wait and a long loop of 1 ms waits.
+# Exits non-zero if any script sends input more than `--bound-us` after it was stopped.
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import threading
+import time
+
+runtime_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'corel_interpreter.py')
+spec = importlib.util.spec_from_file_location('corel_runtime', runtime_path)
+runtime = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(runtime)
+
+last_event = [0]
+
+class ProbeInputBackend(runtime.InputBackend):
+    # Batches like WindowsInputBackend: events are queued and only count as sent when flush() submits them, so
+    # input still queued when a run is stopped shows up here if it is sent instead of discarded. Only the time
+    # of the latest submission is kept, so a tight loop(*) does not grow a list for the whole run.
+    MAX_PENDING = runtime.WindowsInputBackend.MAX_PENDING
+
+    def __init__(self):
+        self.pending = 0
+
+    def queue(self):
+        self.pending += 1
+        if self.pending >= self.MAX_PENDING:
+            self.flush()
+
+    def move(self, dx, dy):
+        self.queue()
+
+    def press(self, key):
+        self.queue()
+
+    def click(self, button):
+        self.queue()
+
+    def flush(self):
+        if self.pending:
+            self.pending = 0
+            last_event[0] = time.perf_counter_ns()
+
+    def discard(self):
+        self.pending = 0
+
+runtime.INPUT_BACKENDS['probe'] = ProbeInputBackend
+
+def loop(iterations, *children):
+    node = runtime.LOOPnode('LOOP', iterations)
+    node.children = list(children)
+    return node
+
+SCENARIOS = {
+    'tight loop(*)': [loop(runtime.LOOP_FOREVER, runtime.MOVEnode('MOVE', 'x', 1))],
+    'loop(*) wait(1s)': [loop(runtime.LOOP_FOREVER, runtime.PRESSnode('PRESS', 'f'), runtime.WAITnode('WAIT', 1, 's'))],
+    'loop(100000) wait(1ms)': [loop(100000, runtime.MOVEnode('MOVE', 'y', 1), runtime.WAITnode('WAIT', 1, 'ms'))],
+}
+
+def measure(scheduler, finished, program, stops, rng):
+    to_last_event = []
+    to_finished = []
+    for _ in range(stops):
+        finished.clear()
+        scheduler.trigger('bench', program, 'reject')
+        time.sleep(rng.uniform(0.02, 0.06))
+        stopped_at = time.perf_counter_ns()
+        scheduler.stop('bench')
+        if not finished.wait(5):
+            raise RuntimeError('run did not finish after stop()')
+        if finished.error is not None or not finished.stopped:
+            raise RuntimeError(f'run ended without being stopped: {finished.error}')
+        to_last_event.append(max(last_event[0] - stopped_at, 0))
+        to_finished.append(finished.at - stopped_at)
+    return to_last_event, to_finished
+
+def describe(samples):
+    samples = sorted(samples)
+    return (f"median {samples[len(samples) // 2] / 1e3:7.1f} us  "
+            f"p99 {samples[min(int(len(samples) * 0.99), len(samples) - 1)] / 1e3:7.1f} us  "
+            f"max {samples[-1] / 1e3:7.1f} us")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stops', type=int, default=50, help='stops per scenario')
+    parser.add_argument('--bound-us', type=float, default=1000.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--executor', default='threads', choices=runtime.COREL_EXECUTORS)
+    args = parser.parse_args()
+
+    runtime.calibrate_spin_threshold_ns()
+    rng = random.Random(args.seed)
+    finished = threading.Event()
+
+    def on_finished(key, stats, error, stopped):
+        finished.at = time.perf_counter_ns()
+        finished.error = error
+        finished.stopped = stopped
+        finished.set()
+
+    scheduler = runtime.CorelRunScheduler(1, backend='probe', on_finished=on_finished, executor=args.executor)
+    failures = []
+    for name, ast in SCENARIOS.items():
+        to_last_event, to_finished = measure(scheduler, finished, runtime.compile_program(ast), args.stops, rng)
+        print(f"{name:24} last event {describe(to_last_event)}")
+        print(f"{'':24} finished   {describe(to_finished)}")
+        if max(to_last_event) > args.bound_us * 1000:
+            failures.append(f"{name}: input sent {max(to_last_event) / 1e3:.1f} us after stop()")
+    scheduler.shutdown()
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
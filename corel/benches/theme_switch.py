@@ -0,0 +1,83 @@
+# Startup time and theme-switch latency of the BASO window: python corel/benches/theme_switch.py
+# Runs the real ModMenu (use QT_QPA_PLATFORM=offscreen without a display). Switching goes through the
+# theme selector like a user would, so each sample includes the restyle Qt does before the next frame.
+# The first pass over the themes builds their stylesheets, the second one reuses them.
+# The theme selected before the run is restored afterwards.
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+from PyQt5.QtWidgets import QApplication
+
+
+def load_baso(path):
+    spec = importlib.util.spec_from_file_location('BASO', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def open_window(baso, app):
+    started = time.perf_counter()
+    window = baso.ModMenu(app)
+    window.show()
+    app.processEvents()
+    return window, time.perf_counter() - started
+
+def switch_themes(window, app, names):
+    samples = []
+    for name in names:
+        started = time.perf_counter()
+        window.theme_selector.setCurrentText(name)
+        app.processEvents()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+def toggle_compact(window, app, count):
+    samples = []
+    for index in range(count):
+        started = time.perf_counter()
+        window.compact_mode_checkbox.setChecked(index % 2 == 0)
+        app.processEvents()
+        samples.append(time.perf_counter() - started)
+    window.compact_mode_checkbox.setChecked(False)
+    app.processEvents()
+    return samples
+
+def report(label, samples):
+    samples = sorted(samples)
+    mean = sum(samples) / len(samples)
+    print(f"{label:16} runs {len(samples):>3}  mean {mean * 1e3:8.1f} ms  max {samples[-1] * 1e3:8.1f} ms")
+
+def main():
+    default_baso = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'BASO.py')
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--baso', default=default_baso, help='BASO.py to measure, e.g. a copy of an older revision')
+    parser.add_argument('--startup-runs', type=int, default=3)
+    parser.add_argument('--toggles', type=int, default=10, help='compact mode switches to time')
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    baso = load_baso(os.path.abspath(args.baso))
+
+    startup = []
+    for _ in range(args.startup_runs):
+        window, elapsed = open_window(baso, app)
+        startup.append(elapsed)
+        window.close()
+        app.processEvents()
+    report('startup', startup)
+
+    window, _elapsed = open_window(baso, app)
+    original = window.theme_selector.currentText()
+    names = [window.theme_selector.itemText(index) for index in range(window.theme_selector.count())]
+    names = [name for name in names if name != original] + [original]
+    report('switch (first)', switch_themes(window, app, names))
+    report('switch (repeat)', switch_themes(window, app, names))
+    report('compact toggle', toggle_compact(window, app, args.toggles))
+    window.close()
+    app.processEvents()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# Trigger-to-first-event latency of in-process script runs: python corel/benches/trigger_latency.py
+# Time is measured from the trigger (where the hotkey callback hands the run off) to the first call into the
+# input backend. 'thread' is the old path: a new thread per trigger building its own CorelInterpreter and
+# backend. 'pool' submits to a CorelRunnerPool whose workers are already waiting with a warm interpreter.
+# Both paths run against a recording backend and with the wait scheduler already calibrated.
+import argparse
+import importlib.util
+import os
+import threading
+import time
+
+runtime_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'corel_interpreter.py')
+spec = importlib.util.spec_from_file_location('corel_runtime', runtime_path)
+runtime = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(runtime)
+
+first_events = []
+
+class ProbeInputBackend(runtime.RecordingInputBackend):
+    # Reports the time of the first event of every run; the pool calls flush() at the end of each run.
+    def __init__(self):
+        super().__init__()
+        self.reported = False
+
+    def press(self, key):
+        if not self.reported:
+            self.reported = True
+            first_events.append(time.perf_counter_ns())
+
+    def flush(self):
+        self.reported = False
+
+runtime.INPUT_BACKENDS['probe'] = ProbeInputBackend
+
+def make_program():
+    ast = [runtime.PRESSnode('PRESS', 'f'), runtime.MOVEXYnode('MOVEXY', 1, 1)]
+    return ast, runtime.compile_program(ast)
+
+def run_thread(ast, program, done):
+    interpreter = runtime.CorelInterpreter(ast, program=program, backend=runtime.create_input_backend('probe'))
+    interpreter.run()
+    done.set()
+
+def measure_thread(ast, program, triggers, gap):
+    samples = []
+    for _ in range(triggers):
+        done = threading.Event()
+        first_events.clear()
+        started = time.perf_counter_ns()
+        threading.Thread(target=run_thread, args=(ast, program, done), daemon=True).start()
+        done.wait()
+        samples.append(first_events[0] - started)
+        time.sleep(gap)
+    return samples
+
+def measure_pool(program, triggers, gap):
+    done = threading.Event()
+    pool = runtime.CorelRunnerPool(backend='probe', on_finished=lambda context, stats, error: done.set())
+    # Let the workers build their interpreters, as the app's prewarm thread does before the first trigger
+    time.sleep(0.1)
+    samples = []
+    for _ in range(triggers):
+        done.clear()
+        first_events.clear()
+        started = time.perf_counter_ns()
+        pool.submit(program)
+        done.wait()
+        samples.append(first_events[0] - started)
+        time.sleep(gap)
+    pool.shutdown()
+    return samples
+
+def report(label, samples):
+    first = samples[0]
+    samples = sorted(samples)
+    median = samples[len(samples) // 2]
+    p99 = samples[min(int(len(samples) * 0.99), len(samples) - 1)]
+    print(
+        f"{label:7} triggers {len(samples):>5}  first {first / 1e3:8.1f} us  median {median / 1e3:8.1f} us  "
+        f"p99 {p99 / 1e3:8.1f} us  max {samples[-1] / 1e3:8.1f} us"
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--triggers', type=int, default=500)
+    parser.add_argument('--gap-ms', type=float, default=2.0, help='idle time between triggers')
+    args = parser.parse_args()
+
+    runtime.calibrate_spin_threshold_ns()
+    ast, program = make_program()
+    gap = args.gap_ms / 1000
+    report('thread', measure_thread(ast, program, args.triggers, gap))
+    report('pool', measure_pool(program, args.triggers, gap))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# Run scheduler under a trigger storm: python corel/benches/trigger_stress.py
+# Fires `--rate` triggers per second (1,000 by default) at a CorelRunScheduler, spread over `--scripts` scripts
+# with every run policy, and releases 'hold' keys at random. Scripts are short press/wait loops run against a
+# recording backend. Exits non-zero if a trigger is unaccounted for, the concurrency cap is exceeded, or runs
+# are still in flight after everything is stopped.
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+runtime_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'corel_interpreter.py')
+spec = importlib.util.spec_from_file_location('corel_runtime', runtime_path)
+runtime = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(runtime)
+
+def make_program(iterations, wait_ms):
+    loop = runtime.LOOPnode('LOOP', iterations)
+    loop.children = [runtime.PRESSnode('PRESS', 'f'), runtime.WAITnode('WAIT', wait_ms, 'ms')]
+    return runtime.compile_program([loop])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rate', type=int, default=1000, help='triggers per second')
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--scripts', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=runtime.COREL_RUNNER_WORKERS)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--executor', default='threads', choices=runtime.COREL_EXECUTORS)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    finished = Counter()
+    finished_lock = threading.Lock()
+
+    def on_finished(key, stats, error, stopped):
+        with finished_lock:
+            finished['error' if error is not None else 'stopped' if stopped else 'completed'] += 1
+
+    scheduler = runtime.CorelRunScheduler(args.workers, backend='recording', on_finished=on_finished, executor=args.executor)
+    scripts = []
+    for index in range(args.scripts):
+        policy = runtime.RUN_POLICIES[index % len(runtime.RUN_POLICIES)]
+        program = make_program(rng.randint(2, 20), rng.randint(1, 10))
+        scripts.append((f'script-{index}.corel', program, policy, threading.Event()))
+
+    outcomes = Counter()
+    call_ns = []
+    interval_ns = 1_000_000_000 // args.rate
+    total = int(args.rate * args.seconds)
+    started = time.perf_counter_ns()
+    for index in range(total):
+        # Paced against absolute deadlines so slow trigger() calls do not lower the rate
+        deadline = started + index * interval_ns
+        while time.perf_counter_ns() < deadline:
+            time.sleep(0)
+        key, program, policy, held = rng.choice(scripts)
+        if policy == 'hold' and held.is_set() and rng.random() < 0.5:
+            held.clear()
+            scheduler.release(key)
+            continue
+        if policy == 'hold':
+            held.set()
+        call_started = time.perf_counter_ns()
+        outcomes[scheduler.trigger(key, program, policy, held)] += 1
+        call_ns.append(time.perf_counter_ns() - call_started)
+    elapsed = (time.perf_counter_ns() - started) / 1e9
+
+    scheduler.stop_all()
+    drain_deadline = time.perf_counter() + 5
+    while scheduler.stats()['active'] and time.perf_counter() < drain_deadline:
+        time.sleep(0.01)
+    stats = scheduler.stats()
+    scheduler.pool.shutdown()
+
+    call_ns.sort()
+    triggers = len(call_ns)
+    print(f"triggers {triggers} in {elapsed:.2f} s ({triggers / elapsed:.0f}/s, releases {total - triggers})")
+    print(f"trigger() median {call_ns[triggers // 2] / 1e3:.1f} us  p99 {call_ns[int(triggers * 0.99)] / 1e3:.1f} us  "
+          f"max {call_ns[-1] / 1e3:.1f} us")
+    print("outcomes " + ", ".join(f"{name}: {count}" for name, count in sorted(outcomes.items())))
+    print(f"runs {stats['runs']} ({dict(finished)}), peak concurrency {stats['max_active']}/{stats['max_concurrent']}")
+
+    failures = []
+    if sum(outcomes.values()) != triggers:
+        failures.append("some triggers have no outcome")
+    if stats['max_active'] > stats['max_concurrent']:
+        failures.append("concurrency cap exceeded")
+    if stats['active'] or stats['queued']:
+        failures.append(f"{stats['active']} runs still active, {stats['queued']} queued after stop_all")
+    if sum(finished.values()) != stats['runs']:
+        failures.append(f"{stats['runs']} runs started but {sum(finished.values())} finished")
+    if finished['error']:
+        failures.append(f"{finished['error']} runs failed")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# Lateness of Corel `wait` at 1 ms, 5 ms and 50 ms granularities: python corel/benches/wait_lateness.py
+# Compares plain relative time.sleep() (the old runtime) with the deadline-based WaitScheduler.
+# Each row runs a loop of `move(1y) wait(n)` iterations whose move costs `--work-us` microseconds.
+import argparse
+import importlib.util
+import os
+import time
+
+runtime_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'corel_interpreter.py')
+spec = importlib.util.spec_from_file_location('corel_runtime', runtime_path)
+runtime = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(runtime)
+
+def busy(duration_ns):
+    end = time.perf_counter_ns() + duration_ns
+    while time.perf_counter_ns() < end:
+        pass
+
+def run_sleep(duration_ns, iterations, work_ns):
+    lateness = []
+    start = time.perf_counter_ns()
+    for index in range(1, iterations + 1):
+        busy(work_ns)
+        time.sleep(duration_ns / 1e9)
+        lateness.append(time.perf_counter_ns() - start - index * duration_ns)
+    return lateness, lateness[-1]
+
+def run_scheduler(duration_ns, iterations, work_ns):
+    scheduler = runtime.WaitScheduler()
+    lateness = []
+    scheduler.start()
+    for _ in range(iterations):
+        busy(work_ns)
+        lateness.append(scheduler.wait(duration_ns))
+    return lateness, scheduler.drift_ns()
+
+def report(label, duration_ms, samples, drift_ns):
+    samples = sorted(samples)
+    mean = sum(samples) / len(samples)
+    p99 = samples[min(int(len(samples) * 0.99), len(samples) - 1)]
+    print(
+        f"{label:10} {duration_ms:>4} ms  waits {len(samples):>5}  mean {mean / 1e3:9.1f} us  "
+        f"p99 {p99 / 1e3:9.1f} us  max {samples[-1] / 1e3:9.1f} us  drift {drift_ns / 1e6:8.2f} ms"
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=float, default=2.0, help='approximate run time per row')
+    parser.add_argument('--work-us', type=int, default=20, help='simulated cost of the instructions between waits')
+    args = parser.parse_args()
+
+    print(f"spin threshold: {runtime.calibrate_spin_threshold_ns() / 1e3:.0f} us")
+    for duration_ms in (1, 5, 50):
+        duration_ns = duration_ms * 1_000_000
+        iterations = max(int(args.seconds * 1000 / duration_ms), 20)
+        # For time.sleep the lateness of wait n is measured against the ideal timeline, so it is the drift so far
+        report('sleep', duration_ms, *run_sleep(duration_ns, iterations, args.work_us * 1000))
+        report('scheduler', duration_ms, *run_scheduler(duration_ns, iterations, args.work_us * 1000))
+
+if __name__ == '__main__':
+    main()
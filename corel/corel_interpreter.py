@@ -1,25 +1,359 @@
 import re
+import os
+import math
 import time
+import heapq
+import asyncio
+import itertools
 import sys
 import json
+import struct
 import ctypes
+import queue
+import threading
 import builtins
-import pyautogui
+from collections import deque
+
+# pyautogui is optional: it cannot be imported without a display on Linux, and Windows uses SendInput
+try:
+    import pyautogui
+except Exception:
+    pyautogui = None
 
 # Modifying print to flush immediately
 # Taken from: https://stackoverflow.com/questions/230751/how-to-flush-output-of-python-print
 def print(*objects, sep=' ', end='\n', file=sys.stdout, flush=True):
     builtins.print(*objects, sep=sep, end=end, file=file, flush=flush)
 
-# Function for moving the mouse at the OS level as pyautogui doesn't work
-MOUSEEVENTF_MOVE = 0x0001 # This constant is taken from the Windows API
-def move_cursor(x, y):
-    ctypes.windll.user32.mouse_event(MOUSEEVENTF_MOVE, x, y, 0, 0)
-
 # pyautogui minimum time between clicks
-pyautogui.MINIMUM_DURATION = 0
-pyautogui.MINIMUM_SLEEP = 0
-pyautogui.PAUSE = 0
+if pyautogui is not None:
+    pyautogui.MINIMUM_DURATION = 0
+    pyautogui.MINIMUM_SLEEP = 0
+    pyautogui.PAUSE = 0
+
+# Windows API constants and structures used by SendInput
+INPUT_MOUSE = 0
+INPUT_KEYBOARD = 1
+MOUSEEVENTF_MOVE = 0x0001
+MOUSEEVENTF_BUTTONS = {
+    'left': (0x0002, 0x0004),
+    'right': (0x0008, 0x0010),
+    'middle': (0x0020, 0x0040)
+}
+KEYEVENTF_KEYUP = 0x0002
+VK_SHIFT = 0x10
+
+# Named keys (pyautogui's names) to Windows virtual-key codes; single characters use VkKeyScanW
+WINDOWS_VIRTUAL_KEYS = {
+    'backspace': 0x08, '\b': 0x08, 'tab': 0x09, '\t': 0x09, 'clear': 0x0C,
+    'enter': 0x0D, 'return': 0x0D, '\n': 0x0D, '\r': 0x0D,
+    'shift': 0x10, 'ctrl': 0x11, 'alt': 0x12, 'pause': 0x13, 'capslock': 0x14,
+    'kana': 0x15, 'hangul': 0x15, 'hanguel': 0x15, 'junja': 0x17, 'final': 0x18, 'hanja': 0x19, 'kanji': 0x19,
+    'esc': 0x1B, 'escape': 0x1B, 'convert': 0x1C, 'nonconvert': 0x1D, 'accept': 0x1E, 'modechange': 0x1F,
+    'space': 0x20, ' ': 0x20, 'pageup': 0x21, 'pgup': 0x21, 'pagedown': 0x22, 'pgdn': 0x22,
+    'end': 0x23, 'home': 0x24, 'left': 0x25, 'up': 0x26, 'right': 0x27, 'down': 0x28,
+    'select': 0x29, 'print': 0x2A, 'execute': 0x2B,
+    'printscreen': 0x2C, 'prntscrn': 0x2C, 'prtsc': 0x2C, 'prtscr': 0x2C,
+    'insert': 0x2D, 'delete': 0x2E, 'del': 0x2E, 'help': 0x2F,
+    'win': 0x5B, 'winleft': 0x5B, 'winright': 0x5C, 'apps': 0x5D, 'sleep': 0x5F,
+    'multiply': 0x6A, 'add': 0x6B, 'separator': 0x6C, 'subtract': 0x6D, 'decimal': 0x6E, 'divide': 0x6F,
+    'numlock': 0x90, 'scrolllock': 0x91,
+    'shiftleft': 0xA0, 'shiftright': 0xA1, 'ctrlleft': 0xA2, 'ctrlright': 0xA3, 'altleft': 0xA4, 'altright': 0xA5,
+    'browserback': 0xA6, 'browserforward': 0xA7, 'browserrefresh': 0xA8, 'browserstop': 0xA9,
+    'browsersearch': 0xAA, 'browserfavorites': 0xAB, 'browserhome': 0xAC,
+    'volumemute': 0xAD, 'volumedown': 0xAE, 'volumeup': 0xAF,
+    'nexttrack': 0xB0, 'prevtrack': 0xB1, 'stop': 0xB2, 'playpause': 0xB3,
+    'launchmail': 0xB4, 'launchmediaselect': 0xB5, 'launchapp1': 0xB6, 'launchapp2': 0xB7,
+    **{f'num{digit}': 0x60 + digit for digit in range(10)},
+    **{f'f{number}': 0x6F + number for number in range(1, 25)}
+}
+
+# Key names accepted by press(); without pyautogui, the names the Windows backend understands
+if pyautogui is not None:
+    KEYBOARD_KEYS = pyautogui.KEYBOARD_KEYS
+else:
+    KEYBOARD_KEYS = [chr(code) for code in range(0x20, 0x7F)] + list(WINDOWS_VIRTUAL_KEYS)
+
+class MOUSEINPUT(ctypes.Structure):
+    _fields_ = [
+        ('dx', ctypes.c_long), ('dy', ctypes.c_long), ('mouseData', ctypes.c_uint32),
+        ('dwFlags', ctypes.c_uint32), ('time', ctypes.c_uint32), ('dwExtraInfo', ctypes.c_size_t)
+    ]
+
+class KEYBDINPUT(ctypes.Structure):
+    _fields_ = [
+        ('wVk', ctypes.c_uint16), ('wScan', ctypes.c_uint16), ('dwFlags', ctypes.c_uint32),
+        ('time', ctypes.c_uint32), ('dwExtraInfo', ctypes.c_size_t)
+    ]
+
+class HARDWAREINPUT(ctypes.Structure):
+    _fields_ = [('uMsg', ctypes.c_uint32), ('wParamL', ctypes.c_uint16), ('wParamH', ctypes.c_uint16)]
+
+class INPUTUNION(ctypes.Union):
+    _fields_ = [('mi', MOUSEINPUT), ('ki', KEYBDINPUT), ('hi', HARDWAREINPUT)]
+
+class INPUT(ctypes.Structure):
+    _fields_ = [('type', ctypes.c_uint32), ('union', INPUTUNION)]
+
+# Input backends
+# Everything the runtime sends to the OS goes through one of these. Backends may queue events
+# until flush(), which the interpreter calls before every wait and at the end of a run; a run that
+# was stopped calls discard() instead, so nothing it queued reaches the OS after the stop.
+class InputBackend:
+    def move(self, dx, dy):
+        raise NotImplementedError
+
+    def press(self, key):
+        raise NotImplementedError
+
+    def click(self, button):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def discard(self):
+        pass
+
+class WindowsInputBackend(InputBackend):
+    # Events are queued as INPUT records and submitted with one SendInput call per flush;
+    # back-to-back moves merge into a single record, up to MAX_MERGED_MOVES of them, so a
+    # move-only loop still fills the queue and gets flushed.
+    MAX_PENDING = 256
+    MAX_MERGED_MOVES = 16
+    MAX_MERGED_DISTANCE = 1 << 16 # Keeps merged deltas far from the c_long limits of MOUSEINPUT
+    user32 = None
+
+    def __init__(self):
+        if WindowsInputBackend.user32 is None:
+            user32 = ctypes.WinDLL('user32', use_last_error=True)
+            user32.SendInput.argtypes = [ctypes.c_uint, ctypes.POINTER(INPUT), ctypes.c_int]
+            user32.SendInput.restype = ctypes.c_uint
+            user32.VkKeyScanW.argtypes = [ctypes.c_wchar]
+            user32.VkKeyScanW.restype = ctypes.c_short
+            WindowsInputBackend.user32 = user32
+        self.send_input = WindowsInputBackend.user32.SendInput
+        self.vk_key_scan = WindowsInputBackend.user32.VkKeyScanW
+        self.pending = []
+        self.merged_moves = 0 # Moves folded into the last pending record
+
+    def queue(self, record):
+        self.pending.append(record)
+        if len(self.pending) >= self.MAX_PENDING:
+            self.flush()
+
+    def move(self, dx, dy):
+        if self.pending and self.merged_moves < self.MAX_MERGED_MOVES:
+            last = self.pending[-1]
+            if last.type == INPUT_MOUSE and last.union.mi.dwFlags == MOUSEEVENTF_MOVE:
+                x = last.union.mi.dx + dx
+                y = last.union.mi.dy + dy
+                if abs(x) <= self.MAX_MERGED_DISTANCE and abs(y) <= self.MAX_MERGED_DISTANCE:
+                    last.union.mi.dx = x
+                    last.union.mi.dy = y
+                    self.merged_moves += 1
+                    return
+        record = INPUT(type=INPUT_MOUSE)
+        record.union.mi = MOUSEINPUT(dx=dx, dy=dy, dwFlags=MOUSEEVENTF_MOVE)
+        self.merged_moves = 1
+        self.queue(record)
+
+    def click(self, button):
+        for flag in MOUSEEVENTF_BUTTONS[button]:
+            record = INPUT(type=INPUT_MOUSE)
+            record.union.mi = MOUSEINPUT(dwFlags=flag)
+            self.queue(record)
+
+    def press(self, key):
+        virtual_key, shifted = self.virtual_key(key)
+        strokes = [(virtual_key, 0), (virtual_key, KEYEVENTF_KEYUP)]
+        if shifted:
+            strokes = [(VK_SHIFT, 0)] + strokes + [(VK_SHIFT, KEYEVENTF_KEYUP)]
+        for code, flags in strokes:
+            record = INPUT(type=INPUT_KEYBOARD)
+            record.union.ki = KEYBDINPUT(wVk=code, dwFlags=flags)
+            self.queue(record)
+
+    def virtual_key(self, key):
+        virtual_key = WINDOWS_VIRTUAL_KEYS.get(key)
+        if virtual_key is not None:
+            return virtual_key, False
+        if len(key) == 1:
+            scan = self.vk_key_scan(key)
+            if scan != -1:
+                return scan & 0xFF, bool(scan & 0x100)
+        raise Exception(f'Key not supported by the Windows input backend: {key}')
+
+    def flush(self):
+        if not self.pending:
+            return
+        count = len(self.pending)
+        records = (INPUT * count)(*self.pending)
+        self.pending.clear()
+        if self.send_input(count, records, ctypes.sizeof(INPUT)) != count:
+            raise ctypes.WinError(ctypes.get_last_error())
+
+    def discard(self):
+        self.pending.clear()
+
+class PyAutoGUIInputBackend(InputBackend):
+    def __init__(self):
+        if pyautogui is None:
+            raise Exception('pyautogui is not available')
+
+    def move(self, dx, dy):
+        pyautogui.moveRel(dx, dy)
+
+    def press(self, key):
+        pyautogui.press(key)
+
+    def click(self, button):
+        pyautogui.click(button=button)
+
+class RecordingInputBackend(InputBackend):
+    # Captures (perf_counter_ns, kind, *args) tuples instead of touching the OS; used for tests and benchmarks.
+    def __init__(self):
+        self.events = []
+
+    def move(self, dx, dy):
+        self.events.append((time.perf_counter_ns(), 'move', dx, dy))
+
+    def press(self, key):
+        self.events.append((time.perf_counter_ns(), 'press', key))
+
+    def click(self, button):
+        self.events.append((time.perf_counter_ns(), 'click', button))
+
+INPUT_BACKENDS = {
+    'windows': WindowsInputBackend,
+    'pyautogui': PyAutoGUIInputBackend,
+    'recording': RecordingInputBackend
+}
+
+def create_input_backend(name=None):
+    # SendInput on Windows, pyautogui elsewhere
+    if name is None:
+        name = 'windows' if os.name == 'nt' else 'pyautogui'
+    if name not in INPUT_BACKENDS:
+        raise Exception(f'Unknown input backend: {name}\nValid backends: {list(INPUT_BACKENDS)}')
+    return INPUT_BACKENDS[name]()
+
+# Waits are scheduled against absolute perf_counter_ns() deadlines: each deadline is the previous
+# one plus the wait's duration, so sleep overshoot and the time spent on other instructions do not
+# accumulate. The bulk of a wait blocks on the run's cancellation event, so stopping wakes it at once; the
+# last `spin_threshold_ns` (the calibrated worst-case wake-up overshoot) is spun on the clock instead.
+SPIN_CALIBRATION_SAMPLES = 25
+SPIN_THRESHOLD_MIN_NS = 50_000
+SPIN_THRESHOLD_MAX_NS = 4_000_000
+MAX_SCHEDULE_LAG_NS = 50_000_000 # Further behind than this, the schedule is rebased instead of caught up
+
+_spin_threshold_ns = None
+
+class CancellationToken:
+    # Stops a run: the interpreter reads `cancelled` before every instruction (a plain attribute, cheaper
+    # than Event.is_set in the dispatch loop) and waits block on `event`, so cancel() also wakes them.
+    # Runs on the async executor do not block on `event`; they set `on_cancel` to wake their wait instead.
+    __slots__ = ('cancelled', 'event', 'on_cancel')
+
+    def __init__(self):
+        self.cancelled = False
+        self.event = threading.Event()
+        self.on_cancel = None
+
+    def cancel(self):
+        self.cancelled = True
+        self.event.set()
+        if self.on_cancel is not None:
+            self.on_cancel()
+
+def calibrate_spin_threshold_ns():
+    # Measures how late a 1 ms Event.wait() wakes up on this machine; computed once per process.
+    global _spin_threshold_ns
+    if _spin_threshold_ns is None:
+        if os.name == 'nt':
+            # Timed waits on Windows round up to the system timer tick (15.6 ms by default)
+            ctypes.WinDLL('winmm').timeBeginPeriod(1)
+        idle = threading.Event()
+        overshoots = []
+        for _ in range(SPIN_CALIBRATION_SAMPLES):
+            start = time.perf_counter_ns()
+            idle.wait(0.001)
+            overshoots.append(time.perf_counter_ns() - start - 1_000_000)
+        _spin_threshold_ns = spin_threshold_from_overshoots(overshoots)
+    return _spin_threshold_ns
+
+def spin_threshold_from_overshoots(overshoots):
+    overshoots = sorted(overshoots)
+    worst = overshoots[int(len(overshoots) * 0.9)]
+    return min(max(worst + worst // 2, SPIN_THRESHOLD_MIN_NS), SPIN_THRESHOLD_MAX_NS)
+
+class WaitScheduler:
+    def __init__(self, spin_threshold_ns=None):
+        self.spin_threshold_ns = spin_threshold_ns if spin_threshold_ns is not None else calibrate_spin_threshold_ns()
+        self.deadline_ns = None
+        self.waits = 0
+        self.total_lateness_ns = 0
+        self.max_lateness_ns = 0
+        self.last_lateness_ns = 0
+        self.rebased_ns = 0
+        self.idle = CancellationToken() # Never cancelled; used when a wait is given no token
+
+    def start(self):
+        # Stats cover the run being started, so one scheduler can be reused across runs
+        self.deadline_ns = time.perf_counter_ns()
+        self.waits = 0
+        self.total_lateness_ns = 0
+        self.max_lateness_ns = 0
+        self.last_lateness_ns = 0
+        self.rebased_ns = 0
+
+    def wait(self, duration_ns, token=None):
+        # Returns how late the wait woke up relative to its deadline, in nanoseconds,
+        # or None if `token` was cancelled during the wait.
+        now = time.perf_counter_ns()
+        deadline = self.schedule(duration_ns, now)
+        remaining = deadline - now
+        if token is None:
+            token = self.idle
+        if remaining > self.spin_threshold_ns and token.event.wait((remaining - self.spin_threshold_ns) / 1e9):
+            return None
+        while time.perf_counter_ns() < deadline:
+            if token.cancelled:
+                return None
+        return self.settle(deadline, time.perf_counter_ns() - deadline)
+
+    def schedule(self, duration_ns, now):
+        # Deadline of the next wait; the async executor sleeps until it on the shared timer heap instead of wait()
+        if self.deadline_ns is None:
+            self.deadline_ns = now
+        deadline = self.deadline_ns + duration_ns
+        if now - deadline > MAX_SCHEDULE_LAG_NS:
+            # Catching up would replay the missed waits back to back; give up the lost time instead.
+            self.rebased_ns += now - deadline
+            deadline = now
+        return deadline
+
+    def settle(self, deadline, lateness):
+        # Records a finished wait; the next one is scheduled from its deadline, not from when it woke up
+        self.deadline_ns = deadline
+        self.waits += 1
+        self.total_lateness_ns += lateness
+        self.last_lateness_ns = lateness
+        if lateness > self.max_lateness_ns:
+            self.max_lateness_ns = lateness
+        return lateness
+
+    def drift_ns(self):
+        # How far behind its ideal timeline the run finished the latest wait, including time given up by rebasing.
+        return self.rebased_ns + self.last_lateness_ns
+
+    def stats(self):
+        return {
+            'waits': self.waits,
+            'mean_lateness_ns': self.total_lateness_ns // self.waits if self.waits else 0,
+            'max_lateness_ns': self.max_lateness_ns,
+            'drift_ns': self.drift_ns()
+        }
 
 # Nodes
 class ASTnode:
@@ -72,6 +406,15 @@ class MOVEnode(ASTnode):
     def __repr__(self):
         return f"MOVEnode({repr(self.type)}, {repr(self.direction)}, {repr(self.value)})"
 
+class MOVEXYnode(ASTnode):
+    def __init__(self, type, x, y):
+        super().__init__(type)
+        self.x = x
+        self.y = y
+
+    def __repr__(self):
+        return f"MOVEXYnode({repr(self.type)}, {repr(self.x)}, {repr(self.y)})"
+
 class LOOPnode(ASTnode):
     def __init__(self, type, value):
         super().__init__(type)
@@ -89,85 +432,595 @@ class STRINGnode(ASTnode):
     def __repr__(self):
         return f"STRINGnode({repr(self.type)}, {repr(self.value)})"
 
+# Bytecode
+# The AST is lowered once into a flat list of (opcode, a, b, message) instructions whose operands
+# are already resolved: wait durations in nanoseconds, validated key and button names, (dx, dy) for moves.
+# `message` is the trace line printed in verbose mode.
+OP_MOVE = 0       # a = dx, b = dy
+OP_END_LOOP = 1   # a = index of the first body instruction
+OP_WAIT = 2       # a = nanoseconds
+OP_PRESS = 3      # a = key
+OP_CLICK = 4      # a = button
+OP_LOOP = 5       # a = iteration count (math.inf for loop(*)), b = index just past the matching OP_END_LOOP
+OP_KEY = 6        # trigger key declaration, trace only
+OP_FAIL = 7       # a = error raised when the instruction is reached
+
+LOOP_FOREVER = -1 # Loop count of loop(*) in the AST (see corel_parser.rs)
+WAIT_SCALES_NS = {'s': 1_000_000_000, 'ds': 100_000_000, 'cs': 10_000_000, 'ms': 1_000_000}
+VALID_BUTTONS = ['left', 'middle', 'right']
+
+class CorelProgram:
+    def __init__(self, code, recovery):
+        self.code = code
+        # recovery[pc] is where execution resumes when instruction pc fails: the end of the
+        # top-level statement containing it, matching the old per-statement error handling.
+        self.recovery = recovery
+
+def compile_program(ast):
+    code = []
+    recovery = []
+    valid_keys = frozenset(KEYBOARD_KEYS)
+
+    def lower(node):
+        if isinstance(node, WAITnode):
+            message = f'Waiting {node.value} {node.magnitude}...'
+            scale = WAIT_SCALES_NS.get(node.magnitude)
+            if scale is None:
+                code.append((OP_FAIL, f'Invalid time magnitude: {node.magnitude}', None, message))
+            else:
+                code.append((OP_WAIT, node.value * scale, None, message))
+        elif isinstance(node, PRESSnode):
+            if node.value in valid_keys:
+                code.append((OP_PRESS, node.value, None, f'Pressing {node.value}...'))
+            else:
+                code.append((OP_FAIL, f'Invalid key: {node.value}\nValid keys: {KEYBOARD_KEYS}', None, None))
+        elif isinstance(node, KEYnode):
+            code.append((OP_KEY, None, None, f'Using trigger key declaration: {node.value}'))
+        elif isinstance(node, MOVEnode):
+            message = f'Moving {node.value} {node.direction}...'
+            if node.direction == 'x':
+                code.append((OP_MOVE, node.value, 0, message))
+            elif node.direction == 'y':
+                code.append((OP_MOVE, 0, node.value, message))
+            else:
+                code.append((OP_FAIL, f'Invalid direction: {node.direction}\nValid directions: x, y', None, message))
+        elif isinstance(node, MOVEXYnode):
+            code.append((OP_MOVE, node.x, node.y, f'Moving {node.x} x, {node.y} y...'))
+        elif isinstance(node, CLICKnode):
+            message = f'Clicking {node.value}...'
+            if node.value in VALID_BUTTONS:
+                code.append((OP_CLICK, node.value, None, message))
+            else:
+                code.append((OP_FAIL, f'Invalid button: {node.value}\nValid buttons: {VALID_BUTTONS}', None, message))
+        elif isinstance(node, LOOPnode):
+            loop_index = len(code)
+            code.append(None)
+            for child in node.children:
+                lower(child)
+            code.append((OP_END_LOOP, loop_index + 1, None, None))
+            if node.value == LOOP_FOREVER:
+                # The counter never reaches zero, so OP_END_LOOP needs no special case; only stopping ends it
+                code[loop_index] = (OP_LOOP, math.inf, len(code), 'Looping until stopped...')
+            else:
+                code[loop_index] = (OP_LOOP, node.value, len(code), f'Looping {node.value} times...')
+        else:
+            code.append((OP_FAIL, f'Invalid node type: {node.type}', None, None))
+
+    for node in ast:
+        lower(node)
+        recovery.extend([len(code)] * (len(code) - len(recovery)))
+
+    return CorelProgram(code, recovery)
+
 # Interpreter
 class CorelInterpreter:
-    def __init__(self, ast):
+    def __init__(self, ast, verbose=False, program=None, scheduler=None, backend=None):
         self.ast = ast
+        self.verbose = verbose
+        self.program = program if program is not None else compile_program(ast)
+        self.scheduler = scheduler if scheduler is not None else WaitScheduler()
+        self.backend = backend if backend is not None else create_input_backend()
 
-    def run(self):
-        for node in self.ast:
+    def run(self, program=None, token=None):
+        # `program` replaces the one given at construction, so a warm interpreter can run any script.
+        # `token` is the run's CancellationToken: it is checked before every instruction and
+        # wakes a wait in progress, so nothing is emitted once it is cancelled.
+        if program is not None:
+            self.program = program
+        code = self.program.code
+        recovery = self.program.recovery
+        verbose = self.verbose
+        backend = self.backend
+        move = backend.move
+        flush = backend.flush
+        wait = self.scheduler.wait
+        if token is None:
+            token = CancellationToken()
+        press = backend.press
+        click = backend.click
+        counters = [] # Remaining iterations of every loop being executed, innermost last
+        end = len(code)
+        pc = 0
+
+        # The schedule starts with the run, so the nth wait ends at the sum of the first n durations
+        self.scheduler.start()
+        while pc < end:
             try:
-                self.execute_node(node)
+                while pc < end:
+                    if token.cancelled:
+                        pc = end
+                        break
+                    op, a, b, message = code[pc]
+                    if verbose and message is not None:
+                        print(message)
+                    if op == OP_MOVE:
+                        move(a, b)
+                    elif op == OP_END_LOOP:
+                        remaining = counters[-1] - 1
+                        if remaining > 0:
+                            counters[-1] = remaining
+                            pc = a
+                            continue
+                        counters.pop()
+                    elif op == OP_WAIT:
+                        # Queued input has to reach the OS before the pause, not after it
+                        flush()
+                        wait(a, token)
+                    elif op == OP_PRESS:
+                        press(a)
+                    elif op == OP_CLICK:
+                        click(a)
+                    elif op == OP_LOOP:
+                        if a <= 0:
+                            pc = b
+                            continue
+                        counters.append(a)
+                    elif op == OP_FAIL:
+                        raise Exception(a)
+                    pc += 1
             except Exception as e:
                 print(f'Unexpected error: {e}')
+                counters.clear()
+                pc = recovery[pc]
+        if token.cancelled:
+            backend.discard()
+        else:
+            flush()
 
-    def execute_node(self, node):
-        if isinstance(node, WAITnode):
-            self.execute_WAIT(node)
-        elif isinstance(node, PRESSnode):
-            self.execute_PRESS(node)
-        elif isinstance(node, KEYnode):
-            self.execute_KEY(node)
-        elif isinstance(node, MOVEnode):
-            self.execute_MOVE(node)
-        elif isinstance(node, CLICKnode):
-            self.execute_CLICK(node)
-        elif isinstance(node, LOOPnode):
-            self.execute_LOOP(node)
-        else:
-            raise Exception(f'Invalid node type: {node.type}')
-
-    def execute_WAIT(self, node):
-        print(f'Waiting {node.value} {node.magnitude}...')
-        
-        sleep_time = node.value
-        magnitude = node.magnitude
-        match magnitude:
-            case 's':
-                sleep_time *= 1
-            case 'ms':
-                sleep_time /= 1000
-            case 'cs':
-                sleep_time /= 100
-            case 'ds':
-                sleep_time /= 10
-            case _:
-                raise Exception(f'Invalid time magnitude: {magnitude}')
-        time.sleep(sleep_time)
-
-    def execute_PRESS(self, node):
-        if node.value in pyautogui.KEYBOARD_KEYS:
-            print(f'Pressing {node.value}...')
-            pyautogui.press(node.value)
-        else:
-            raise Exception(f'Invalid key: {node.value}\nValid keys: {pyautogui.KEYBOARD_KEYS}')
-
-    def execute_KEY(self, node):
-        # Trigger keys are metadata for tooling; runtime execution ignores them.
-        print(f'Using trigger key declaration: {node.value}')
-    
-    def execute_MOVE(self, node):
-        print(f'Moving {node.value} {node.direction}...')
-        if node.direction == 'x':
-            move_cursor(node.value, 0)
-        elif node.direction == 'y':
-            move_cursor(0, node.value)
+# Runner pool
+# Pre-started runtime threads, each holding a warm interpreter: its input backend is open and the wait
+# scheduler calibrated before the first trigger arrives, so a run starts with the program's first instruction.
+COREL_RUNNER_WORKERS = 4
+
+class CorelRunnerPool:
+    def __init__(self, workers=COREL_RUNNER_WORKERS, backend=None, on_finished=None):
+        # on_finished(context, stats, error) is called on the worker thread once a run ends;
+        # stats is the scheduler's stats() for that run, or None when it failed.
+        calibrate_spin_threshold_ns()
+        self.on_finished = on_finished
+        self.jobs = queue.SimpleQueue()
+        self.threads = []
+        for index in range(workers):
+            thread = threading.Thread(target=self.work, args=(backend,), name=f'corel-runner-{index}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, program, context=None, token=None):
+        self.jobs.put((program, context, token))
+
+    def shutdown(self):
+        # Workers exit after the run they are in; queued runs behind the sentinels are dropped.
+        for _ in self.threads:
+            self.jobs.put(None)
+
+    def work(self, backend_name):
+        # A backend is bound to the thread it was created on (SendInput batches per thread)
+        try:
+            interpreter = CorelInterpreter([], backend=create_input_backend(backend_name))
+            setup_error = None
+        except Exception as exc:
+            interpreter = None
+            setup_error = exc
+
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            program, context, token = job
+            stats = None
+            error = setup_error
+            if interpreter is not None:
+                try:
+                    interpreter.run(program, token)
+                    stats = interpreter.scheduler.stats()
+                except Exception as exc:
+                    error = exc
+            if self.on_finished is not None:
+                self.on_finished(context, stats, error)
+
+# Async executor
+# Runs every script as a coroutine on one asyncio loop in a dedicated thread instead of a pool thread per
+# running script, so hundreds of concurrent scripts cost one thread, and the Qt loop and input hooks compete
+# for the GIL with that thread only. All waits go through one TimerHeap, and all input through one backend
+# created on the loop thread. Coroutines only switch at waits, right after the backend was flushed, and at
+# loop back-edges every COREL_ASYNC_SLICE iterations, so batched input of different scripts never mixes.
+COREL_ASYNC_SLICE = 1000
+
+class TimerHeap:
+    # Wakes sleeping runs at their absolute perf_counter_ns() deadlines. Only the earliest deadline has a loop
+    # timer. Selectors round their timeout up to whole milliseconds, so it is armed `wake_ahead_ns` early; the
+    # loop thread then finishes the wait like WaitScheduler.wait(), blocking on `interrupt` and spinning the last
+    # `spin_threshold_ns`, and every run due by then wakes at once. Other threads set `interrupt` when they hand
+    # the loop work, so a trigger or a stop is not held up behind the wait.
+    def __init__(self, loop, wake_ahead_ns, spin_threshold_ns):
+        self.loop = loop
+        self.wake_ahead_ns = wake_ahead_ns
+        self.spin_threshold_ns = spin_threshold_ns
+        self.interrupt = threading.Event()
+        self.heap = [] # (deadline_ns, sequence, future)
+        self.sequence = itertools.count()
+        self.timer = None
+        self.timer_deadline_ns = None
+
+    def sleep_until(self, deadline_ns):
+        # Returns a future resolved at the deadline; a run stopped during its wait resolves it early
+        future = self.loop.create_future()
+        heapq.heappush(self.heap, (deadline_ns, next(self.sequence), future))
+        if self.timer_deadline_ns is None or deadline_ns < self.timer_deadline_ns:
+            self.arm(deadline_ns)
+        return future
+
+    def arm(self, deadline_ns):
+        if self.timer is not None:
+            self.timer.cancel()
+        self.timer_deadline_ns = deadline_ns
+        delay_ns = deadline_ns - self.wake_ahead_ns - time.perf_counter_ns()
+        self.timer = self.loop.call_later(max(delay_ns, 0) / 1e9, self.fire)
+
+    def fire(self):
+        self.timer = None
+        self.timer_deadline_ns = None
+        heap = self.heap
+        while heap and heap[0][2].done():
+            heapq.heappop(heap)
+        if not heap:
+            return
+        deadline = heap[0][0]
+        remaining = deadline - time.perf_counter_ns()
+        if remaining <= self.wake_ahead_ns:
+            if remaining > self.spin_threshold_ns and self.interrupt.wait((remaining - self.spin_threshold_ns) / 1e9):
+                # Let the loop run what was handed to it, then come back for this deadline
+                self.interrupt.clear()
+                self.arm(deadline)
+                return
+            while time.perf_counter_ns() < deadline:
+                pass
+            now = time.perf_counter_ns()
+            while heap and heap[0][0] <= now:
+                future = heapq.heappop(heap)[2]
+                if not future.done():
+                    future.set_result(None)
+        # Re-armed rather than spun in place, so the runs just woken get to run before the next deadline
+        if heap:
+            self.arm(heap[0][0])
+
+class CorelAsyncRunner:
+    def __init__(self, backend=None, on_finished=None):
+        # Drop-in for CorelRunnerPool; on_finished(context, stats, error) is called on the loop thread.
+        self.on_finished = on_finished
+        self.loop = asyncio.new_event_loop()
+        # Conservative until calibrate() has measured the loop's own timers
+        self.timers = TimerHeap(self.loop, SPIN_THRESHOLD_MAX_NS, calibrate_spin_threshold_ns())
+        self.backend = None
+        self.setup_error = None
+        self.tasks = set()
+        self.closing = False
+        self.calibrated = False
+        self.thread = threading.Thread(target=self.work, args=(backend,), name='corel-async-runner', daemon=True)
+        self.thread.start()
+
+    def submit(self, program, context=None, token=None):
+        self.call_threadsafe(self.start, program, context, token)
+
+    def call_threadsafe(self, callback, *args):
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            return # The loop was shut down; dropped like runs queued behind the pool's sentinels
+        self.timers.interrupt.set()
+
+    def shutdown(self):
+        # The loop exits after the runs in progress; runs submitted from now on are dropped.
+        self.call_threadsafe(self.close)
+
+    def close(self):
+        self.closing = True
+        self.stop_if_idle()
+
+    def stop_if_idle(self):
+        # During calibration the loop is inside run_until_complete(), which stop() would abort;
+        # work() checks for a shutdown requested meanwhile once calibration is done.
+        if self.closing and self.calibrated and not self.tasks:
+            self.loop.stop()
+
+    def work(self, backend_name):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.backend = create_input_backend(backend_name)
+        except Exception as exc:
+            self.setup_error = exc
+        self.loop.run_until_complete(self.calibrate())
+        self.calibrated = True
+        if not (self.closing and not self.tasks):
+            self.loop.run_forever()
+        self.loop.close()
+
+    async def calibrate(self):
+        # Like calibrate_spin_threshold_ns(), but for the loop's timers. Sleeps between 1 and 2 ms, because the
+        # selector's rounding to whole milliseconds only shows for timeouts that are not whole milliseconds.
+        overshoots = []
+        for index in range(SPIN_CALIBRATION_SAMPLES):
+            duration_ns = 1_000_000 + 1_000_000 * index // SPIN_CALIBRATION_SAMPLES
+            start = time.perf_counter_ns()
+            await asyncio.sleep(duration_ns / 1e9)
+            overshoots.append(time.perf_counter_ns() - start - duration_ns)
+        self.timers.wake_ahead_ns = spin_threshold_from_overshoots(overshoots)
+
+    def start(self, program, context, token):
+        if self.closing:
+            return
+        self.tasks.add(self.loop.create_task(self.execute(program, context, token)))
+
+    async def execute(self, program, context, token):
+        stats = None
+        error = self.setup_error
+        if error is None:
+            try:
+                stats = await self.run(program, token if token is not None else CancellationToken())
+            except Exception as exc:
+                error = exc
+        self.tasks.discard(asyncio.current_task())
+        self.stop_if_idle()
+        if self.on_finished is not None:
+            self.on_finished(context, stats, error)
+
+    async def run(self, program, token):
+        # CorelInterpreter.run() as a coroutine: waits sleep on the shared timer heap instead of blocking
+        code = program.code
+        recovery = program.recovery
+        backend = self.backend
+        move = backend.move
+        flush = backend.flush
+        press = backend.press
+        click = backend.click
+        # Only used for this run's deadline chain and stats; its wait() is never called
+        scheduler = WaitScheduler(self.timers.spin_threshold_ns)
+        schedule = scheduler.schedule
+        settle = scheduler.settle
+        sleep_until = self.timers.sleep_until
+        waiting = [None] # The wait future while the run sleeps
+
+        def wake():
+            future = waiting[0]
+            if future is not None and not future.done():
+                future.set_result(None)
+
+        # Called from whichever thread stops the run
+        token.on_cancel = lambda: self.call_threadsafe(wake)
+        counters = []
+        slice_left = COREL_ASYNC_SLICE
+        end = len(code)
+        pc = 0
+
+        scheduler.start()
+        while pc < end:
+            try:
+                while pc < end:
+                    if token.cancelled:
+                        pc = end
+                        break
+                    op, a, b, _message = code[pc]
+                    if op == OP_MOVE:
+                        move(a, b)
+                    elif op == OP_END_LOOP:
+                        remaining = counters[-1] - 1
+                        if remaining > 0:
+                            counters[-1] = remaining
+                            pc = a
+                            slice_left -= 1
+                            if not slice_left:
+                                # A loop without waits would otherwise hold the loop thread until it ends
+                                slice_left = COREL_ASYNC_SLICE
+                                flush()
+                                await asyncio.sleep(0)
+                            continue
+                        counters.pop()
+                    elif op == OP_WAIT:
+                        flush()
+                        deadline = schedule(a, time.perf_counter_ns())
+                        waiting[0] = sleep_until(deadline)
+                        await waiting[0]
+                        waiting[0] = None
+                        if token.cancelled:
+                            pc = end
+                            break
+                        settle(deadline, time.perf_counter_ns() - deadline)
+                    elif op == OP_PRESS:
+                        press(a)
+                    elif op == OP_CLICK:
+                        click(a)
+                    elif op == OP_LOOP:
+                        if a <= 0:
+                            pc = b
+                            continue
+                        counters.append(a)
+                    elif op == OP_FAIL:
+                        raise Exception(a)
+                    pc += 1
+            except Exception as e:
+                print(f'Unexpected error: {e}')
+                counters.clear()
+                pc = recovery[pc]
+        token.on_cancel = None
+        # Runs only switch after a flush, so everything queued belongs to this run
+        if token.cancelled:
+            backend.discard()
         else:
-            raise Exception(f'Invalid direction: {node.direction}\nValid directions: x, y')
-
-    def execute_CLICK(self, node):
-        print(f'Clicking {node.value}...')
-        valid_buttons = ['left', 'middle', 'right']
-        if node.value not in valid_buttons:
-            raise Exception(f'Invalid button: {node.value}\nValid buttons: {valid_buttons}')
-        
-        pyautogui.click(button=node.value)
-
-    def execute_LOOP(self, node):
-        print(f'Looping {node.value} times...')
-        for i in range(node.value):
-            for child in node.children:
-                self.execute_node(child)
+            flush()
+        return scheduler.stats()
+
+# Run scheduler
+# Decides what a trigger does with the script's current run, according to the binding's policy:
+#   reject   ignore triggers while the script runs
+#   queue    run again after the current run, up to MAX_QUEUED_RUNS pending runs
+#   restart  stop the current run and start over
+#   toggle   stop the current run; trigger again to start
+#   hold     run while the hotkey is held: release() stops it, and a trigger whose `held` event
+#            was already cleared (the key came up before the script compiled) does not start
+# Different scripts run concurrently, at most `max_concurrent` at a time: one per pool worker with the
+# 'threads' executor, or up to COREL_ASYNC_MAX_RUNS coroutines with the 'asyncio' executor.
+COREL_EXECUTORS = ('threads', 'asyncio')
+COREL_ASYNC_MAX_RUNS = 256
+RUN_POLICIES = ('reject', 'queue', 'restart', 'toggle', 'hold')
+DEFAULT_RUN_POLICY = 'reject'
+MAX_QUEUED_RUNS = 8
+
+# trigger() outcomes
+RUN_STARTED = 'started'
+RUN_QUEUED = 'queued'
+RUN_RESTARTING = 'restarting'
+RUN_STOPPING = 'stopping'
+RUN_REJECTED_BUSY = 'already running'
+RUN_REJECTED_QUEUE_FULL = 'queue full'
+RUN_REJECTED_LIMIT = 'concurrency limit reached'
+RUN_REJECTED_RELEASED = 'released before start'
+RUN_REJECTED = (RUN_REJECTED_BUSY, RUN_REJECTED_QUEUE_FULL, RUN_REJECTED_LIMIT, RUN_REJECTED_RELEASED)
+
+class CorelRun:
+    def __init__(self, key, program):
+        self.key = key
+        self.program = program
+        self.token = CancellationToken()
+
+class ScriptRunState:
+    def __init__(self):
+        self.run = None
+        self.pending = deque()
+        self.runs = 0
+        self.rejected = 0
+
+class CorelRunScheduler:
+    def __init__(self, workers=None, backend=None, on_finished=None, executor='threads'):
+        # on_finished(key, stats, error, stopped) is called on the worker (or loop) thread after every run.
+        if executor not in COREL_EXECUTORS:
+            raise Exception(f'Unknown executor: {executor}\nValid executors: {list(COREL_EXECUTORS)}')
+        if workers is None:
+            workers = COREL_RUNNER_WORKERS if executor == 'threads' else COREL_ASYNC_MAX_RUNS
+        self.on_finished = on_finished
+        self.max_concurrent = workers
+        self.states = {}
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        if executor == 'threads':
+            self.pool = CorelRunnerPool(workers, backend, on_finished=self.finished)
+        else:
+            self.pool = CorelAsyncRunner(backend, on_finished=self.finished)
+
+    def trigger(self, key, program, policy=DEFAULT_RUN_POLICY, held=None):
+        # Safe from any thread; returns one of the RUN_* outcomes. For 'hold', clear `held` before calling release().
+        if policy not in RUN_POLICIES:
+            raise Exception(f'Unknown run policy: {policy}\nValid policies: {list(RUN_POLICIES)}')
+        with self.lock:
+            state = self.states.get(key)
+            if state is None:
+                state = self.states[key] = ScriptRunState()
+            if policy == 'hold' and held is not None and not held.is_set():
+                return RUN_REJECTED_RELEASED
+            if state.run is not None:
+                if policy == 'queue':
+                    if len(state.pending) >= MAX_QUEUED_RUNS:
+                        state.rejected += 1
+                        return RUN_REJECTED_QUEUE_FULL
+                    state.pending.append(program)
+                    return RUN_QUEUED
+                if policy == 'restart':
+                    # The replacement takes over the stopped run's slot when it ends
+                    state.pending.clear()
+                    state.pending.append(program)
+                    state.run.token.cancel()
+                    return RUN_RESTARTING
+                if policy == 'toggle':
+                    state.pending.clear()
+                    state.run.token.cancel()
+                    return RUN_STOPPING
+                state.rejected += 1
+                return RUN_REJECTED_BUSY
+            if self.active >= self.max_concurrent:
+                state.rejected += 1
+                return RUN_REJECTED_LIMIT
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            self.start(state, key, program)
+            return RUN_STARTED
+
+    def start(self, state, key, program):
+        # Called with the lock held and a slot already counted in self.active.
+        run = CorelRun(key, program)
+        state.run = run
+        state.runs += 1
+        self.pool.submit(program, run, run.token)
+
+    def release(self, key):
+        # End of a 'hold' trigger; also drops runs queued behind it.
+        self.stop(key)
+
+    def stop(self, key):
+        with self.lock:
+            state = self.states.get(key)
+            if state is None or state.run is None:
+                return False
+            state.pending.clear()
+            state.run.token.cancel()
+            return True
+
+    def stop_all(self):
+        with self.lock:
+            for state in self.states.values():
+                state.pending.clear()
+                if state.run is not None:
+                    state.run.token.cancel()
+
+    def is_running(self, key):
+        with self.lock:
+            state = self.states.get(key)
+            return state is not None and state.run is not None
+
+    def finished(self, run, stats, error):
+        with self.lock:
+            state = self.states[run.key]
+            state.run = None
+            if state.pending:
+                self.start(state, run.key, state.pending.popleft())
+            else:
+                self.active -= 1
+        if self.on_finished is not None:
+            self.on_finished(run.key, stats, error, run.token.cancelled)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'active': self.active,
+                'max_concurrent': self.max_concurrent,
+                'max_active': self.max_active,
+                'queued': sum(len(state.pending) for state in self.states.values()),
+                'runs': sum(state.runs for state in self.states.values()),
+                'rejected': sum(state.rejected for state in self.states.values())
+            }
+
+    def shutdown(self):
+        self.stop_all()
+        self.pool.shutdown()
 
 # Debug code
 def build_ast_from_json(json_file):
@@ -184,6 +1037,8 @@ def build_ast_from_json(json_file):
             return loop_node
         elif node_type == "MOVE":
             return MOVEnode(node_type, node_info['direction'], node_info['value'])
+        elif node_type == "MOVEXY":
+            return MOVEXYnode(node_type, node_info['x'], node_info['y'])
         elif node_type == "PRESS":
             return PRESSnode(node_type, node_info['value'])
         elif node_type == "WAIT":
@@ -199,11 +1054,83 @@ def build_ast_from_json(json_file):
     
     return ast
 
+# Binary AST format written by the Corel compiler (see corel/src/corel_binary.rs)
+AST_BINARY_MAGIC = b'CAST'
+AST_BINARY_VERSION = 1
+AST_NO_STRING = 0xFFFFFFFF
+AST_HEADER = struct.Struct('<4sHHIIII')
+AST_STRING_ENTRY = struct.Struct('<II')
+AST_NODE_RECORD = struct.Struct('<BxxxiIII')
+AST_NODE_KINDS = ('KEY', 'WAIT', 'PRESS', 'CLICK', 'LOOP', 'MOVE', 'MOVEXY')
+
+def build_ast_from_binary(buffer):
+    view = memoryview(buffer)
+    if len(view) < AST_HEADER.size:
+        raise Exception('Binary AST is truncated')
+    magic, version, _reserved, node_count, root_count, string_count, pool_size = AST_HEADER.unpack_from(view, 0)
+    if magic != AST_BINARY_MAGIC:
+        raise Exception('Not a binary Corel AST')
+    if version != AST_BINARY_VERSION:
+        raise Exception(f'Unsupported binary AST version: {version}')
+
+    strings_start = AST_HEADER.size
+    pool_start = strings_start + string_count * AST_STRING_ENTRY.size
+    nodes_start = pool_start + pool_size
+    nodes_end = nodes_start + node_count * AST_NODE_RECORD.size
+    if nodes_end != len(view) or root_count > node_count:
+        raise Exception('Binary AST is malformed')
+
+    # Every distinct string is decoded once and shared by all nodes referencing it
+    pool = view[pool_start:nodes_start]
+    strings = [
+        str(pool[offset:offset + length], 'utf-8')
+        for offset, length in AST_STRING_ENTRY.iter_unpack(view[strings_start:pool_start])
+    ]
+
+    # Children always come after their parent, so building back to front
+    # guarantees every LOOP finds its children already constructed.
+    records = list(AST_NODE_RECORD.iter_unpack(view[nodes_start:nodes_end]))
+    nodes = [None] * node_count
+    for index in range(node_count - 1, -1, -1):
+        kind, value, string_index, first_child, child_count = records[index]
+        if kind >= len(AST_NODE_KINDS):
+            raise Exception(f'Unknown node kind: {kind}')
+        node_type = AST_NODE_KINDS[kind]
+        if node_type == "LOOP":
+            if first_child <= index or first_child + child_count > node_count:
+                raise Exception('Binary AST is malformed')
+            node = LOOPnode(node_type, value)
+            node.children = nodes[first_child:first_child + child_count]
+        elif node_type == "MOVEXY":
+            # dy is stored in the string slot as a two's complement i32
+            node = MOVEXYnode(node_type, value, string_index - (1 << 32) if string_index >= 1 << 31 else string_index)
+        else:
+            if string_index == AST_NO_STRING or string_index >= len(strings):
+                raise Exception('Binary AST is malformed')
+            text = strings[string_index]
+            if node_type == "KEY":
+                node = KEYnode(node_type, text)
+            elif node_type == "WAIT":
+                node = WAITnode(node_type, value, text)
+            elif node_type == "PRESS":
+                node = PRESSnode(node_type, text)
+            elif node_type == "CLICK":
+                node = CLICKnode(node_type, text)
+            else:
+                node = MOVEnode(node_type, text, value)
+        nodes[index] = node
+
+    return nodes[:root_count]
+
 def main(arg):
-    # print('AST from JSON:')
-    with open(arg, 'r') as file:
-        json_data = json.load(file)
-        ast = build_ast_from_json(json_data)
+    # ast.bin is the compact binary format, anything else is read as JSON
+    if arg.endswith('.bin'):
+        with open(arg, 'rb') as file:
+            ast = build_ast_from_binary(file.read())
+    else:
+        with open(arg, 'r') as file:
+            json_data = json.load(file)
+            ast = build_ast_from_json(json_data)
     
     # This is done for debug purposes, which we don't need atm.
     # for node in ast:
@@ -213,8 +1140,15 @@ def main(arg):
     #             print('\t' + str(child))
 
     print('\nRunning interpreter...')
-    interpreter = CorelInterpreter(ast)
+    interpreter = CorelInterpreter(ast, verbose=True)
     interpreter.run()
 
+    stats = interpreter.scheduler.stats()
+    if stats['waits']:
+        print(
+            f"Timing: {stats['waits']} waits, mean lateness {stats['mean_lateness_ns'] / 1e6:.3f} ms, "
+            f"max {stats['max_lateness_ns'] / 1e6:.3f} ms, drift {stats['drift_ns'] / 1e6:.3f} ms"
+        )
+
 if __name__ == '__main__':
     main(sys.argv[1])
@@ -0,0 +1,121 @@
+// Compact binary AST format
+//
+// Layout (all integers little-endian):
+//   header:  magic "CAST", version u16, reserved u16, node_count u32, root_count u32,
+//            string_count u32, string_pool_len u32
+//   strings: string_count x (offset u32, len u32) into the string pool
+//   pool:    string_pool_len bytes of UTF-8, every distinct string stored once
+//   nodes:   node_count x (kind u8, padding [u8; 3], value i32, string u32,
+//            first_child u32, child_count u32)
+//
+// MOVEXY (optimizer output only) keeps dx in `value` and dy in the `string` slot as an i32.
+//
+// Nodes are laid out breadth-first: the first root_count nodes are the top-level
+// statements and the children of every LOOP occupy one contiguous index range.
+use std::collections::{HashMap, VecDeque};
+
+use crate::corel_parser::{Ast, NodeKind};
+
+pub const MAGIC: &[u8; 4] = b"CAST";
+pub const VERSION: u16 = 1;
+pub const NO_STRING: u32 = u32::MAX;
+
+pub const KIND_KEY: u8 = 0;
+pub const KIND_WAIT: u8 = 1;
+pub const KIND_PRESS: u8 = 2;
+pub const KIND_CLICK: u8 = 3;
+pub const KIND_LOOP: u8 = 4;
+pub const KIND_MOVE: u8 = 5;
+pub const KIND_MOVEXY: u8 = 6;
+
+struct NodeRecord {
+    kind: u8,
+    value: i32,
+    string: u32,
+    first_child: u32,
+    child_count: u32
+}
+
+#[derive(Default)]
+struct StringPool<'a> {
+    indices: HashMap<&'a str, u32>,
+    entries: Vec<(u32, u32)>,
+    bytes: Vec<u8>
+}
+impl<'a> StringPool<'a> {
+    fn intern(&mut self, value: &'a str) -> u32 {
+        if let Some(&index) = self.indices.get(value) {
+            return index;
+        }
+        let index = self.entries.len() as u32;
+        self.entries.push((self.bytes.len() as u32, value.len() as u32));
+        self.bytes.extend_from_slice(value.as_bytes());
+        self.indices.insert(value, index);
+        index
+    }
+}
+
+pub fn ast_to_binary(ast: &Ast) -> Vec<u8> {
+    let mut pool = StringPool::default();
+    let mut records: Vec<NodeRecord> = Vec::with_capacity(ast.nodes.len());
+    let mut pending: VecDeque<u32> = ast.roots().collect();
+    let root_count = pending.len() as u32;
+    let mut next_free = root_count;
+
+    while let Some(index) = pending.pop_front() {
+        let record = match ast.nodes[index as usize].kind {
+            NodeKind::Key { value } => NodeRecord {
+                kind: KIND_KEY, value: 0, string: pool.intern(value), first_child: 0, child_count: 0
+            },
+            NodeKind::Wait { value, magnitude } => NodeRecord {
+                kind: KIND_WAIT, value, string: pool.intern(magnitude), first_child: 0, child_count: 0
+            },
+            NodeKind::Press { value } => NodeRecord {
+                kind: KIND_PRESS, value: 0, string: pool.intern(value), first_child: 0, child_count: 0
+            },
+            NodeKind::Click { value } => NodeRecord {
+                kind: KIND_CLICK, value: 0, string: pool.intern(value), first_child: 0, child_count: 0
+            },
+            NodeKind::Move { value, direction } => NodeRecord {
+                kind: KIND_MOVE, value: value as i32, string: pool.intern(direction), first_child: 0, child_count: 0
+            },
+            NodeKind::MoveXY { x, y } => NodeRecord {
+                kind: KIND_MOVEXY, value: x, string: y as u32, first_child: 0, child_count: 0
+            },
+            NodeKind::Loop { value } => {
+                let first_child = next_free;
+                let queued = pending.len();
+                pending.extend(ast.children(index));
+                let child_count = (pending.len() - queued) as u32;
+                next_free += child_count;
+                NodeRecord {
+                    kind: KIND_LOOP, value, string: NO_STRING, first_child, child_count
+                }
+            }
+        };
+        records.push(record);
+    }
+
+    let mut buffer = Vec::with_capacity(24 + pool.entries.len() * 8 + pool.bytes.len() + records.len() * 20);
+    buffer.extend_from_slice(MAGIC);
+    buffer.extend_from_slice(&VERSION.to_le_bytes());
+    buffer.extend_from_slice(&0u16.to_le_bytes());
+    buffer.extend_from_slice(&(records.len() as u32).to_le_bytes());
+    buffer.extend_from_slice(&root_count.to_le_bytes());
+    buffer.extend_from_slice(&(pool.entries.len() as u32).to_le_bytes());
+    buffer.extend_from_slice(&(pool.bytes.len() as u32).to_le_bytes());
+    for (offset, len) in &pool.entries {
+        buffer.extend_from_slice(&offset.to_le_bytes());
+        buffer.extend_from_slice(&len.to_le_bytes());
+    }
+    buffer.extend_from_slice(&pool.bytes);
+    for record in &records {
+        buffer.push(record.kind);
+        buffer.extend_from_slice(&[0u8; 3]);
+        buffer.extend_from_slice(&record.value.to_le_bytes());
+        buffer.extend_from_slice(&record.string.to_le_bytes());
+        buffer.extend_from_slice(&record.first_child.to_le_bytes());
+        buffer.extend_from_slice(&record.child_count.to_le_bytes());
+    }
+    buffer
+}
@@ -1,99 +1,243 @@
-extern crate regex;
-use regex::Regex;
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum TokenKind {
+    StartKey,
+    Wait,
+    Move,
+    Press,
+    Click,
+    Loop,
+    String,
+    Time,
+    Coordinate,
+    Number,
+    Comment,
+    LParen,
+    RParen,
+    LBrace,
+    RBrace,
+    Star
+}
+impl TokenKind {
+    // Names used in diagnostics, unchanged from when token types were strings
+    pub fn as_str(self) -> &'static str {
+        match self {
+            TokenKind::StartKey => "STARTKEY",
+            TokenKind::Wait => "WAIT",
+            TokenKind::Move => "MOVE",
+            TokenKind::Press => "PRESS",
+            TokenKind::Click => "CLICK",
+            TokenKind::Loop => "LOOP",
+            TokenKind::String => "STRING",
+            TokenKind::Time => "TIME",
+            TokenKind::Coordinate => "COORDINATE",
+            TokenKind::Number => "NUMBER",
+            TokenKind::Comment => "COMMENT",
+            TokenKind::LParen => "LPAREN",
+            TokenKind::RParen => "RPAREN",
+            TokenKind::LBrace => "LBRACE",
+            TokenKind::RBrace => "RBRACE",
+            TokenKind::Star => "STAR",
+        }
+    }
+}
 
-#[derive(Debug, Clone)]
-pub struct Token {
-    pub r#type: String,
-    pub value: String,
+// Tokens borrow their text from the source, so lexing allocates nothing but the token vector
+#[derive(Debug, Clone, Copy)]
+pub struct Token<'a> {
+    pub kind: TokenKind,
+    pub value: &'a str,
     pub line_number: i32,
     pub column_number: i32
 }
 
-#[derive(Debug)]
-pub struct CorelLexer {
-    pub source_code: String,
-    pub tokens: Vec<Token>,
-    pub current_line: i32,
-    pub current_column: i32,
-    pub position : i32
+#[derive(Debug, Default)]
+pub struct CorelLexer<'a> {
+    pub source_code: &'a str
 }
 
-impl Default for CorelLexer {
-    fn default() -> Self {
-        Self {
-            source_code: String::new(),
-            tokens: Vec::new(),
-            current_line: 1,
-            current_column: 0,
-            position: 0
-        }
-    }
-}
+// Keywords recognised by the lexer, checked in the same order the old regex table used
+const KEYWORDS: [(&str, TokenKind); 5] = [
+    ("wait", TokenKind::Wait),
+    ("move", TokenKind::Move),
+    ("press", TokenKind::Press),
+    ("click", TokenKind::Click),
+    ("loop", TokenKind::Loop),
+];
 
-impl CorelLexer {
-    pub fn tokenize(&self) -> Vec<Token> {
-        let regex_tokens = Self::initialize_regex_tokens();
-        let mut tokens: Vec<Token> = Vec::new();
+impl<'a> CorelLexer<'a> {
+    // Single pass over the source: every position gets exactly one anchored match attempt,
+    // dispatched on its first byte, so lexing is linear in the size of the input.
+    pub fn tokenize(&self) -> Vec<Token<'a>> {
+        let source = self.source_code;
+        let bytes = source.as_bytes();
+        let mut tokens: Vec<Token<'a>> = Vec::with_capacity(bytes.len() / 8);
         let mut current_line = 1;
         let mut current_column = 0;
 
         let mut position = 0;
-        while position < self.source_code.len() {
-            let mut matched = false;
-
-            for (token_type, regex) in &regex_tokens {
-                if let Some(mat) = regex.find(&self.source_code[position..]) {
-                    if mat.start() == 0 { // Ensure the match is at the current position
-                        let token = Token {
-                            r#type: token_type.clone(),
-                            value: mat.as_str().to_string(),
-                            line_number: current_line,
-                            column_number: current_column,
-                        };
-                        tokens.push(token);
-                        position += mat.end();
-                        current_column += mat.end() as i32;
-                        matched = true;
-                        break; // Exit the loop after the first match
-                    }
-                }
+        while position < bytes.len() {
+            if let Some((kind, length)) = Self::match_token(source, position) {
+                tokens.push(Token {
+                    kind,
+                    value: &source[position..position + length],
+                    line_number: current_line,
+                    column_number: current_column,
+                });
+                position += length;
+                current_column += length as i32;
+                continue;
             }
 
-            if !matched {
-                // Handle newlines and increment position
-                if self.source_code.chars().nth(position).unwrap() == '\n' {
-                    current_line += 1;
-                    current_column = 0;
-                } else {
-                    current_column += 1;
-                }
-                position += 1;
+            // Handle newlines and skip the unmatched character
+            if bytes[position] == b'\n' {
+                current_line += 1;
+                current_column = 0;
+            } else {
+                current_column += 1;
             }
+            position += Self::char_length(bytes[position]);
         }
 
         tokens
     }
 
-    fn initialize_regex_tokens() -> Vec<(String, Regex)> {
-        // Order matters here: more specific patterns are placed before broader ones.
-        let regex_tokens = vec![
-            ("STARTKEY".to_string(), Regex::new(r"--<[^>\r\n]+>").unwrap()),
-            ("WAIT".to_string(), Regex::new(r"\bwait\b").unwrap()),
-            ("MOVE".to_string(), Regex::new(r"\bmove\b").unwrap()),
-            ("PRESS".to_string(), Regex::new(r"\bpress\b").unwrap()),
-            ("CLICK".to_string(), Regex::new(r"\bclick\b").unwrap()),
-            ("LOOP".to_string(), Regex::new(r"\bloop\b").unwrap()),
-            ("STRING".to_string(), Regex::new(r#"('([^']*)')|(\"([^\"]*)\")"#).unwrap()),
-            ("TIME".to_string(), Regex::new(r"\b\d+(s|ms|cs|ds)\b").unwrap()),
-            ("COORDINATE".to_string(), Regex::new(r"-?\d+(x|y)\b").unwrap()),
-            ("NUMBER".to_string(), Regex::new(r"\b[0-9]+\b").unwrap()),
-            ("COMMENT".to_string(), Regex::new(r"//.*").unwrap()),
-            ("LPAREN".to_string(), Regex::new(r"\(\s*").unwrap()),
-            ("RPAREN".to_string(), Regex::new(r"\)\s*").unwrap()),
-            ("LBRACE".to_string(), Regex::new(r"\{\s*").unwrap()),
-            ("RBRACE".to_string(), Regex::new(r"\}\s*").unwrap()),
-        ];
-
-        regex_tokens
+    // Returns the token kind and byte length of the token starting at `start`, if any.
+    // Every matcher treats `start` as the beginning of the text, mirroring the old
+    // per-position regex search (a leading `\b` always holds there).
+    fn match_token(source: &str, start: usize) -> Option<(TokenKind, usize)> {
+        let bytes = source.as_bytes();
+        match bytes[start] {
+            b'-' => Self::match_startkey(bytes, start)
+                .map(|length| (TokenKind::StartKey, length))
+                .or_else(|| Self::match_coordinate(source, start).map(|length| (TokenKind::Coordinate, length))),
+            b'a'..=b'z' => Self::match_keyword(source, start),
+            b'\'' | b'"' => Self::match_string(bytes, start).map(|length| (TokenKind::String, length)),
+            b'0'..=b'9' => Self::match_time(source, start)
+                .map(|length| (TokenKind::Time, length))
+                .or_else(|| Self::match_coordinate(source, start).map(|length| (TokenKind::Coordinate, length)))
+                .or_else(|| Self::match_number(source, start).map(|length| (TokenKind::Number, length))),
+            b'/' => Self::match_comment(bytes, start).map(|length| (TokenKind::Comment, length)),
+            b'(' => Some((TokenKind::LParen, Self::with_trailing_whitespace(source, start))),
+            b')' => Some((TokenKind::RParen, Self::with_trailing_whitespace(source, start))),
+            b'{' => Some((TokenKind::LBrace, Self::with_trailing_whitespace(source, start))),
+            b'}' => Some((TokenKind::RBrace, Self::with_trailing_whitespace(source, start))),
+            b'*' => Some((TokenKind::Star, Self::with_trailing_whitespace(source, start))),
+            _ => None,
+        }
+    }
+
+    // --<[^>\r\n]+>
+    fn match_startkey(bytes: &[u8], start: usize) -> Option<usize> {
+        if !bytes[start..].starts_with(b"--<") {
+            return None;
+        }
+        let body_start = start + 3;
+        let mut end = body_start;
+        while end < bytes.len() {
+            match bytes[end] {
+                b'>' if end > body_start => return Some(end + 1 - start),
+                b'>' | b'\r' | b'\n' => return None,
+                _ => end += 1,
+            }
+        }
+        None
+    }
+
+    // \bwait\b, \bmove\b, \bpress\b, \bclick\b, \bloop\b
+    fn match_keyword(source: &str, start: usize) -> Option<(TokenKind, usize)> {
+        let rest = &source.as_bytes()[start..];
+        for (keyword, kind) in KEYWORDS {
+            if rest.starts_with(keyword.as_bytes()) && Self::is_word_boundary(source, start + keyword.len()) {
+                return Some((kind, keyword.len()));
+            }
+        }
+        None
+    }
+
+    // ('([^']*)')|("([^"]*)")
+    fn match_string(bytes: &[u8], start: usize) -> Option<usize> {
+        let quote = bytes[start];
+        bytes[start + 1..]
+            .iter()
+            .position(|&byte| byte == quote)
+            .map(|offset| offset + 2)
+    }
+
+    // \b\d+(s|ms|cs|ds)\b
+    fn match_time(source: &str, start: usize) -> Option<usize> {
+        let bytes = source.as_bytes();
+        let digits_end = Self::skip_digits(bytes, start);
+        let unit_length = match bytes.get(digits_end) {
+            Some(b's') => 1,
+            Some(b'm' | b'c' | b'd') if bytes.get(digits_end + 1) == Some(&b's') => 2,
+            _ => return None,
+        };
+        let end = digits_end + unit_length;
+        Self::is_word_boundary(source, end).then_some(end - start)
+    }
+
+    // -?\d+(x|y)\b
+    fn match_coordinate(source: &str, start: usize) -> Option<usize> {
+        let bytes = source.as_bytes();
+        let digits_start = if bytes[start] == b'-' { start + 1 } else { start };
+        let digits_end = Self::skip_digits(bytes, digits_start);
+        if digits_end == digits_start {
+            return None;
+        }
+        match bytes.get(digits_end) {
+            Some(b'x' | b'y') if Self::is_word_boundary(source, digits_end + 1) => Some(digits_end + 1 - start),
+            _ => None,
+        }
+    }
+
+    // \b[0-9]+\b
+    fn match_number(source: &str, start: usize) -> Option<usize> {
+        let end = Self::skip_digits(source.as_bytes(), start);
+        Self::is_word_boundary(source, end).then_some(end - start)
+    }
+
+    // //.*
+    fn match_comment(bytes: &[u8], start: usize) -> Option<usize> {
+        if bytes.get(start + 1) != Some(&b'/') {
+            return None;
+        }
+        let length = bytes[start..]
+            .iter()
+            .position(|&byte| byte == b'\n')
+            .unwrap_or(bytes.len() - start);
+        Some(length)
+    }
+
+    // Single punctuation character followed by \s*
+    fn with_trailing_whitespace(source: &str, start: usize) -> usize {
+        let rest = &source[start + 1..];
+        let trimmed = rest.trim_start_matches(char::is_whitespace);
+        1 + rest.len() - trimmed.len()
+    }
+
+    fn skip_digits(bytes: &[u8], start: usize) -> usize {
+        let mut end = start;
+        while end < bytes.len() && bytes[end].is_ascii_digit() {
+            end += 1;
+        }
+        end
+    }
+
+    // Every token ending in \b ends on a word character, so a boundary follows
+    // exactly when the next character is not a word character (or the input ends).
+    fn is_word_boundary(source: &str, position: usize) -> bool {
+        match source[position..].chars().next() {
+            Some(next) => !(next.is_alphanumeric() || next == '_'),
+            None => true,
+        }
+    }
+
+    fn char_length(first_byte: u8) -> usize {
+        match first_byte {
+            0xF0..=0xFF => 4,
+            0xE0..=0xEF => 3,
+            0xC0..=0xDF => 2,
+            _ => 1,
+        }
     }
 }
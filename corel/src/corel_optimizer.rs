@@ -0,0 +1,147 @@
+// Optimization pass run between parsing and encoding (opt level 1)
+//
+// Every rewrite keeps the order and timing of the input events a script emits:
+//   - adjacent moves fuse into one relative move (MOVE for a single axis, MOVEXY for both)
+//   - adjacent waits fold into one wait in milliseconds
+//   - loops that never run their body are dropped and loop(1) is replaced by its body
+//   - a loop whose optimized body is a single move becomes one move of N times the distance
+//   - loop(*) is only optimized inside: it runs until the script is stopped, even with an empty body
+// Moves and waits cannot fail at runtime, so merging them never changes what an error skips.
+// The interpreter recovers from errors per top-level statement, so a top-level loop(1) is
+// only inlined when nothing but its last statement can fail.
+use crate::corel_parser::{ASTnode, Ast, NodeKind, Siblings, LOOP_FOREVER};
+
+enum Item<'a> {
+    Node(NodeKind<'a>),
+    Loop(i32, Vec<Item<'a>>)
+}
+
+pub fn optimize<'a>(ast: &Ast<'a>) -> Ast<'a> {
+    let items = optimize_siblings(ast, ast.roots(), true);
+    let mut nodes = Vec::with_capacity(ast.nodes.len());
+    emit(&items, &mut nodes);
+    Ast { nodes }
+}
+
+fn optimize_siblings<'a>(ast: &Ast<'a>, siblings: Siblings<'_, 'a>, top_level: bool) -> Vec<Item<'a>> {
+    let mut items = Vec::new();
+    for index in siblings {
+        let NodeKind::Loop { value } = ast.nodes[index as usize].kind else {
+            push(&mut items, Item::Node(ast.nodes[index as usize].kind));
+            continue;
+        };
+
+        let body = optimize_siblings(ast, ast.children(index), false);
+        if value == LOOP_FOREVER {
+            items.push(Item::Loop(value, body));
+            continue;
+        }
+        if value == 0 || body.is_empty() {
+            continue;
+        }
+        if value == 1 && (!top_level || !body[..body.len() - 1].iter().any(can_fail)) {
+            for item in body {
+                push(&mut items, item);
+            }
+            continue;
+        }
+        if let [Item::Node(kind)] = body.as_slice() {
+            let repeated = move_delta(kind)
+                .and_then(|(x, y)| Some((x.checked_mul(value)?, y.checked_mul(value)?)));
+            if let Some((x, y)) = repeated {
+                push(&mut items, Item::Node(move_node(x, y)));
+                continue;
+            }
+        }
+        items.push(Item::Loop(value, body));
+    }
+    items
+}
+
+// Appends an item, merging it into the previous one where possible
+fn push<'a>(items: &mut Vec<Item<'a>>, item: Item<'a>) {
+    if let (Some(Item::Node(previous)), Item::Node(next)) = (items.last_mut(), &item) {
+        if let Some(merged) = merge(previous, next) {
+            *previous = merged;
+            if is_noop(&merged) {
+                items.pop();
+            }
+            return;
+        }
+    }
+    if let Item::Node(kind) = &item {
+        if is_noop(kind) {
+            return;
+        }
+    }
+    items.push(item);
+}
+
+fn merge<'a>(previous: &NodeKind<'a>, next: &NodeKind<'a>) -> Option<NodeKind<'a>> {
+    if let (Some((x1, y1)), Some((x2, y2))) = (move_delta(previous), move_delta(next)) {
+        return Some(move_node(x1.checked_add(x2)?, y1.checked_add(y2)?));
+    }
+    if let (NodeKind::Wait { value: v1, magnitude: m1 }, NodeKind::Wait { value: v2, magnitude: m2 }) = (previous, next) {
+        let milliseconds = to_milliseconds(*v1, m1)?.checked_add(to_milliseconds(*v2, m2)?)?;
+        return Some(NodeKind::Wait { value: milliseconds, magnitude: "ms" });
+    }
+    None
+}
+
+// A relative move by (0, 0) sends no motion, so it can be dropped
+fn is_noop(kind: &NodeKind) -> bool {
+    move_delta(kind) == Some((0, 0))
+}
+
+fn can_fail(item: &Item) -> bool {
+    match item {
+        Item::Node(NodeKind::Press { .. } | NodeKind::Click { .. }) => true,
+        Item::Node(_) => false,
+        Item::Loop(_, body) => body.iter().any(can_fail),
+    }
+}
+
+fn move_delta(kind: &NodeKind) -> Option<(i32, i32)> {
+    match *kind {
+        NodeKind::Move { value, direction: "x" } => Some((value as i32, 0)),
+        NodeKind::Move { value, direction: "y" } => Some((0, value as i32)),
+        NodeKind::MoveXY { x, y } => Some((x, y)),
+        _ => None,
+    }
+}
+
+fn move_node<'a>(x: i32, y: i32) -> NodeKind<'a> {
+    match (i16::try_from(x), i16::try_from(y)) {
+        (Ok(value), Ok(0)) => NodeKind::Move { value, direction: "x" },
+        (Ok(0), Ok(value)) => NodeKind::Move { value, direction: "y" },
+        _ => NodeKind::MoveXY { x, y },
+    }
+}
+
+fn to_milliseconds(value: i32, magnitude: &str) -> Option<i32> {
+    let scale = match magnitude {
+        "s" => 1000,
+        "ds" => 100,
+        "cs" => 10,
+        "ms" => 1,
+        _ => return None,
+    };
+    value.checked_mul(scale)
+}
+
+fn emit<'a>(items: &[Item<'a>], nodes: &mut Vec<ASTnode<'a>>) {
+    for item in items {
+        match item {
+            Item::Node(kind) => {
+                let end = nodes.len() as u32 + 1;
+                nodes.push(ASTnode { kind: *kind, end });
+            },
+            Item::Loop(value, body) => {
+                let index = nodes.len();
+                nodes.push(ASTnode { kind: NodeKind::Loop { value: *value }, end: 0 });
+                emit(body, nodes);
+                nodes[index].end = nodes.len() as u32;
+            }
+        }
+    }
+}
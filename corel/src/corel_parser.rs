@@ -1,185 +1,257 @@
-use serde::{Serialize, Deserialize};
-use crate::corel_lexer;
-use std::fs;
+use serde::ser::{Serialize, SerializeStruct, Serializer};
+use crate::corel_lexer::{Token, TokenKind};
 
-// AST nodes
-#[derive(Debug, Clone, Serialize, Deserialize)]
-pub enum NodeType {
-    WAIT(Box<WAITnode>),
-    PRESS(Box<PRESSnode>),
-    KEY(Box<KEYnode>),
-    CLICK(Box<CLICKnode>),
-    LOOP(Box<LOOPnode>),
-    MOVE(Box<MOVEnode>)
+// Loops nested deeper than this are reported and skipped instead of parsed
+pub const DEFAULT_MAX_LOOP_DEPTH: usize = 64;
+// Loop count of loop(*), which repeats until the script is stopped; counts in the source are never negative
+pub const LOOP_FOREVER: i32 = -1;
+
+// AST nodes; every string borrows from the source code
+#[derive(Debug, Clone, Copy)]
+pub enum NodeKind<'a> {
+    Wait { value: i32, magnitude: &'a str },
+    Press { value: &'a str },
+    Key { value: &'a str },
+    Click { value: &'a str },
+    Loop { value: i32 },
+    Move { value: i16, direction: &'a str },
+    // Only produced by the optimizer: one relative move on both axes
+    MoveXY { x: i32, y: i32 }
 }
 
-// AST nodes struct
-#[derive(Debug, Clone, Serialize, Deserialize)]
-pub struct ASTnode {
-    node_type: NodeType,
-    children: Vec<ASTnode>
+// Nodes live in one arena in pre-order: a LOOP's body directly follows it and `end`
+// is the index just past its subtree (index + 1 for every other node).
+#[derive(Debug, Clone, Copy)]
+pub struct ASTnode<'a> {
+    pub kind: NodeKind<'a>,
+    pub end: u32
 }
-impl ASTnode {
-    pub fn new(node_type: NodeType) -> Self {
-        Self {
-            node_type,
-            children: Vec::new()
-        }
+
+#[derive(Debug, Default)]
+pub struct Ast<'a> {
+    pub nodes: Vec<ASTnode<'a>>
+}
+impl<'a> Ast<'a> {
+    pub fn roots(&self) -> Siblings<'_, 'a> {
+        Siblings { ast: self, next: 0, end: self.nodes.len() as u32 }
     }
 
-    pub fn add_child(&mut self, child: ASTnode) {
-        self.children.push(child);
+    pub fn children(&self, index: u32) -> Siblings<'_, 'a> {
+        Siblings { ast: self, next: index + 1, end: self.nodes[index as usize].end }
     }
 }
 
-#[derive(Debug, Clone, Serialize, Deserialize)]
-pub struct WAITnode {
-    value: i32,
-    magnitude: String
+// Walks one level of the tree by jumping over each sibling's subtree
+pub struct Siblings<'s, 'a> {
+    ast: &'s Ast<'a>,
+    next: u32,
+    end: u32
 }
-impl WAITnode {
-    pub fn new(value: i32, magnitude: String) -> Self {
-        Self {
-            value: value,
-            magnitude: magnitude
+impl Iterator for Siblings<'_, '_> {
+    type Item = u32;
+
+    fn next(&mut self) -> Option<u32> {
+        if self.next >= self.end {
+            return None;
         }
+        let index = self.next;
+        self.next = self.ast.nodes[index as usize].end;
+        Some(index)
     }
 }
-#[derive(Debug, Clone, Serialize, Deserialize)]
-pub struct PRESSnode {
-    value: String
-}
-impl PRESSnode {
-    pub fn new(value: String) -> Self {
-        Self {
-            value: value
-        }
+
+// Serialization keeps the JSON shape of the old boxed tree:
+// [{"node_type":{"LOOP":{"value":2,"children":[...]}},"children":[]}, ...]
+impl Serialize for Ast<'_> {
+    fn serialize<S: Serializer>(&self, serializer: S) -> Result<S::Ok, S::Error> {
+        serializer.collect_seq(self.roots().map(|index| NodeRef { ast: self, index }))
     }
 }
-#[derive(Debug, Clone, Serialize, Deserialize)]
-pub struct KEYnode {
-    value: String
+
+struct NodeRef<'s, 'a> {
+    ast: &'s Ast<'a>,
+    index: u32
+}
+impl Serialize for NodeRef<'_, '_> {
+    fn serialize<S: Serializer>(&self, serializer: S) -> Result<S::Ok, S::Error> {
+        let mut node = serializer.serialize_struct("ASTnode", 2)?;
+        node.serialize_field("node_type", &NodeTypeRef(self))?;
+        node.serialize_field("children", &[(); 0])?;
+        node.end()
+    }
 }
-impl KEYnode {
-    pub fn new(value: String) -> Self {
-        Self {
-            value: value
+
+struct NodeTypeRef<'r, 's, 'a>(&'r NodeRef<'s, 'a>);
+impl Serialize for NodeTypeRef<'_, '_, '_> {
+    fn serialize<S: Serializer>(&self, serializer: S) -> Result<S::Ok, S::Error> {
+        let NodeRef { ast, index } = *self.0;
+        match ast.nodes[index as usize].kind {
+            NodeKind::Wait { value, magnitude } => {
+                serializer.serialize_newtype_variant("NodeType", 0, "WAIT", &WaitFields { value, magnitude })
+            },
+            NodeKind::Press { value } => {
+                serializer.serialize_newtype_variant("NodeType", 1, "PRESS", &ValueFields { value })
+            },
+            NodeKind::Key { value } => {
+                serializer.serialize_newtype_variant("NodeType", 2, "KEY", &ValueFields { value })
+            },
+            NodeKind::Click { value } => {
+                serializer.serialize_newtype_variant("NodeType", 3, "CLICK", &ValueFields { value })
+            },
+            NodeKind::Loop { value } => {
+                let children = ChildrenRef { ast, index };
+                serializer.serialize_newtype_variant("NodeType", 4, "LOOP", &LoopFields { value, children })
+            },
+            NodeKind::Move { value, direction } => {
+                serializer.serialize_newtype_variant("NodeType", 5, "MOVE", &MoveFields { value, direction })
+            },
+            NodeKind::MoveXY { x, y } => {
+                serializer.serialize_newtype_variant("NodeType", 6, "MOVEXY", &MoveXYFields { x, y })
+            },
         }
     }
 }
-#[derive(Debug, Clone, Serialize, Deserialize)]
-pub struct CLICKnode {
-    value: String
+
+struct ChildrenRef<'s, 'a> {
+    ast: &'s Ast<'a>,
+    index: u32
 }
-impl CLICKnode {
-    pub fn new(value: String) -> Self {
-        Self {
-            value: value
-        }
+impl Serialize for ChildrenRef<'_, '_> {
+    fn serialize<S: Serializer>(&self, serializer: S) -> Result<S::Ok, S::Error> {
+        let ast = self.ast;
+        serializer.collect_seq(ast.children(self.index).map(|index| NodeRef { ast, index }))
     }
 }
-#[derive(Debug, Clone, Serialize, Deserialize)]
-pub struct LOOPnode {
+
+#[derive(serde::Serialize)]
+struct WaitFields<'a> {
     value: i32,
-    children: Vec<ASTnode>
+    magnitude: &'a str
 }
-impl LOOPnode {
-    pub fn new(value: i32, children: Vec<ASTnode>) -> Self {
-        Self {
-            value: value,
-            children: children
-        }
-    }
+#[derive(serde::Serialize)]
+struct ValueFields<'a> {
+    value: &'a str
+}
+#[derive(serde::Serialize)]
+struct LoopFields<'s, 'a> {
+    value: i32,
+    children: ChildrenRef<'s, 'a>
 }
-#[derive(Debug, Clone, Serialize, Deserialize)]
-pub struct MOVEnode {
+#[derive(serde::Serialize)]
+struct MoveFields<'a> {
     value: i16,
-    direction: String
+    direction: &'a str
 }
-impl MOVEnode {
-    pub fn new(value: i16, direction: String) -> Self {
-        Self {
-            value: value,
-            direction: direction
-        }
-    }
+#[derive(serde::Serialize)]
+struct MoveXYFields {
+    x: i32,
+    y: i32
 }
 
 // Parser
-pub struct CorelParser {
-    pub tokens: Vec<corel_lexer::Token>,
-    pub current_position: i32, 
-    pub nodes: Vec<ASTnode>,
+pub struct CorelParser<'a> {
+    pub tokens: Vec<Token<'a>>,
+    pub current_position: usize,
+    pub nodes: Vec<ASTnode<'a>>,
+    pub diagnostics: Vec<String>,
+    pub max_loop_depth: usize,
+    // Set when a loop nested deeper than `max_loop_depth` was dropped, which leaves the AST incomplete
+    pub loop_depth_exceeded: bool,
+    // Arena indices of the loops whose body is still being parsed, innermost last
+    open_loops: Vec<u32>
 }
-impl Default for CorelParser {
+impl Default for CorelParser<'_> {
     fn default() -> Self {
         Self {
             tokens: Vec::new(),
             current_position: 0,
-            nodes: Vec::new()
+            nodes: Vec::new(),
+            diagnostics: Vec::new(),
+            max_loop_depth: DEFAULT_MAX_LOOP_DEPTH,
+            loop_depth_exceeded: false,
+            open_loops: Vec::new()
         }
     }
 }
-impl CorelParser {
-    fn current_token(&self) -> Option<corel_lexer::Token> {
-        self.tokens.get(self.current_position as usize).cloned()
+impl<'a> CorelParser<'a> {
+    pub fn new(tokens: Vec<Token<'a>>) -> Self {
+        Self {
+            tokens: tokens,
+            ..Default::default()
+        }
+    }
+
+    fn current_token(&self) -> Option<Token<'a>> {
+        self.tokens.get(self.current_position).copied()
+    }
+
+    fn push_node(&mut self, kind: NodeKind<'a>) {
+        let end = self.nodes.len() as u32 + 1;
+        self.nodes.push(ASTnode { kind, end });
+    }
+
+    // Diagnostics are collected instead of printed so that library callers decide where they go
+    fn report(&mut self, message: String) {
+        self.diagnostics.push(message);
     }
 
     fn fail_and_advance(&mut self, message: String) {
-        eprintln!("{message}");
+        self.report(message);
         self.current_position += 1;
     }
 
     fn unexpected_eof(&mut self, context: &str) {
-        eprintln!("Error: Unexpected end of input while parsing {context}");
-        self.current_position = self.tokens.len() as i32;
+        self.report(format!("Error: Unexpected end of input while parsing {context}"));
+        self.current_position = self.tokens.len();
     }
 
     pub fn parse_line(&mut self) {
         let Some(token) = self.current_token() else {
             return;
         };
-        let token_type = token.r#type.clone();
 
         // Checking the token and parsing it
-        match token_type.as_str() {
-            "WAIT" => self.parse_wait(),
-            "PRESS" => self.parse_press(),
-            "STARTKEY" => self.parse_key(),
-            "CLICK" => self.parse_click(),
-            "LOOP" => self.parse_loop(),
-            "MOVE" => self.parse_move(),
-            "COMMENT" => self.current_position += 1, // Skip the COMMENT token
+        match token.kind {
+            TokenKind::RBrace if !self.open_loops.is_empty() => self.close_loop(),
+            TokenKind::Wait => self.parse_wait(),
+            TokenKind::Press => self.parse_press(),
+            TokenKind::StartKey => self.parse_key(),
+            TokenKind::Click => self.parse_click(),
+            TokenKind::Loop => self.parse_loop(),
+            TokenKind::Move => self.parse_move(),
+            TokenKind::Comment => self.current_position += 1, // Skip the COMMENT token
             _ => self.fail_and_advance(format!(
                 "Error: Invalid token type: {} at line: {}",
-                token_type, token.line_number
+                token.kind.as_str(), token.line_number
             )),
         }
     }
 
-    pub fn parse(&mut self) -> Vec<ASTnode> {
-        while self.current_position < self.tokens.len() as i32 {
+    // Statements are parsed one at a time; loop nesting lives on `open_loops` instead of
+    // the call stack, so deep nesting cannot overflow it.
+    pub fn parse(&mut self) -> Ast<'a> {
+        while self.current_position < self.tokens.len() {
             let previous_position = self.current_position;
             self.parse_line();
 
             // Last-resort recovery: never allow the parser to stall in place.
             if self.current_position <= previous_position {
-                eprintln!(
+                self.report(format!(
                     "Error: Parser stalled at token index {}, forcing recovery",
                     self.current_position
-                );
+                ));
                 self.current_position += 1;
             }
         }
-        // Before returning the AST, we will pass it to a JSON file
-        // so that we can use it in the interpreter
-        let ast = self.nodes.clone();
-        let ast_json = serde_json::to_string(&ast)
-            .expect("Error: Could not convert AST to JSON");
-        fs::write("ast.json", ast_json)
-            .expect("Error: Could not write AST to file");
-        
-        ast // Returning the AST (cloned for borrow checker)
+
+        // Loops still open at the end of input are dropped together with their bodies
+        while let Some(loop_index) = self.open_loops.pop() {
+            self.report("Error: Unexpected end of input while parsing loop body".to_string());
+            self.nodes.truncate(loop_index as usize);
+        }
+
+        // Handing the nodes over to the caller, which decides how to serialize them
+        Ast { nodes: std::mem::take(&mut self.nodes) }
     }
 
     fn parse_wait(&mut self) {
@@ -190,7 +262,7 @@ impl CorelParser {
         };
 
         // Checking for correct syntax (wait(5s, 10ms, 15ds, 20cs))
-        if token.r#type != "LPAREN" {
+        if token.kind != TokenKind::LParen {
             self.fail_and_advance(format!("Error: Expected LPAREN at line: {}", token.line_number));
             return;
         }
@@ -200,13 +272,13 @@ impl CorelParser {
             return;
         };
 
-        if token.r#type != "TIME" {
+        if token.kind != TokenKind::Time {
             self.fail_and_advance(format!("Error: Expected TIME at line: {}", token.line_number));
             return;
         }
 
         // Split the time into numeric value and unit
-        let time_str = &token.value;
+        let time_str = token.value;
         let digits_end = time_str.trim_end_matches(|c: char| !c.is_digit(10)).len();
         let (value_str, unit) = time_str.split_at(digits_end);
 
@@ -227,16 +299,14 @@ impl CorelParser {
             self.unexpected_eof("wait");
             return;
         };
-        if token.r#type != "RPAREN" {
+        if token.kind != TokenKind::RParen {
             self.fail_and_advance(format!("Error: Expected RPAREN at line: {}", token.line_number));
             return;
         }
         self.current_position += 1; // Skip the RPAREN token
 
         // Creating the AST node
-        let wait_node = Box::new(WAITnode::new(value, unit.to_string()));
-        let ast_node = ASTnode::new(NodeType::WAIT(wait_node));
-        self.nodes.push(ast_node); 
+        self.push_node(NodeKind::Wait { value, magnitude: unit });
     }
 
 
@@ -248,7 +318,7 @@ impl CorelParser {
         };
 
         // Checking for correct syntax (press("a"))
-        if token.r#type != "LPAREN" {
+        if token.kind != TokenKind::LParen {
             self.fail_and_advance(format!("Error: Expected LPAREN at line: {}", token.line_number));
             return;
         }
@@ -258,27 +328,25 @@ impl CorelParser {
             return;
         };
 
-        if token.r#type != "STRING" {
+        if token.kind != TokenKind::String {
             self.fail_and_advance(format!("Error: Expected STRING at line: {}", token.line_number));
             return;
         }
-        let value = token.value.clone();
+        let value = token.value;
         self.current_position += 1; // Skip the STRING token
 
         let Some(token) = self.current_token() else {
             self.unexpected_eof("press");
             return;
         };
-        if token.r#type != "RPAREN" {
+        if token.kind != TokenKind::RParen {
             self.fail_and_advance(format!("Error: Expected RPAREN at line: {}", token.line_number));
             return;
         }
         self.current_position += 1; // Skip the RPAREN token
 
         // Creating the AST node
-        let press_node = Box::new(PRESSnode::new(value));
-        let ast_node = ASTnode::new(NodeType::PRESS(press_node));
-        self.nodes.push(ast_node);
+        self.push_node(NodeKind::Press { value });
     }
 
     fn parse_click(&mut self) {
@@ -289,7 +357,7 @@ impl CorelParser {
         };
 
         // Checking for correct syntax (click("a"))
-        if token.r#type != "LPAREN" {
+        if token.kind != TokenKind::LParen {
             self.fail_and_advance(format!("Error: Expected LPAREN at line: {}", token.line_number));
             return;
         }
@@ -299,30 +367,29 @@ impl CorelParser {
             return;
         };
 
-        if token.r#type != "STRING" {
+        if token.kind != TokenKind::String {
             self.fail_and_advance(format!("Error: Expected STRING at line: {}", token.line_number));
             return;
         }
-        let value = token.value.clone();
+        let value = token.value;
         self.current_position += 1; // Skip the STRING token
 
         let Some(token) = self.current_token() else {
             self.unexpected_eof("click");
             return;
         };
-        if token.r#type != "RPAREN" {
+        if token.kind != TokenKind::RParen {
             self.fail_and_advance(format!("Error: Expected RPAREN at line: {}", token.line_number));
             return;
         }
         self.current_position += 1; // Skip the RPAREN token
 
         // Creating the AST node
-        let click_node = Box::new(CLICKnode::new(value));
-        let ast_node = ASTnode::new(NodeType::CLICK(click_node));
-        self.nodes.push(ast_node);
+        self.push_node(NodeKind::Click { value });
     }
 
     fn parse_loop(&mut self) {
+        let loop_line = self.tokens[self.current_position].line_number;
         self.current_position += 1; // Skip the LOOP token
         let Some(token) = self.current_token() else {
             self.unexpected_eof("loop");
@@ -330,7 +397,7 @@ impl CorelParser {
         };
 
         // Checking for correct syntax (loop(5))
-        if token.r#type != "LPAREN" {
+        if token.kind != TokenKind::LParen {
             self.fail_and_advance(format!("Error: Expected LPAREN at line: {}", token.line_number));
             return;
         }
@@ -340,27 +407,30 @@ impl CorelParser {
             return;
         };
 
-        if token.r#type != "NUMBER" {
-            self.fail_and_advance(format!("Error: Expected NUMBER at line: {}", token.line_number));
-            return;
-        }
-        let value = match token.value.parse::<i32>() {
-            Ok(value) => value,
-            Err(_) => {
-                self.fail_and_advance(format!(
-                    "Error: Invalid loop count at line: {}",
-                    token.line_number
-                ));
+        let value = match token.kind {
+            TokenKind::Star => LOOP_FOREVER,
+            TokenKind::Number => match token.value.parse::<i32>() {
+                Ok(value) => value,
+                Err(_) => {
+                    self.fail_and_advance(format!(
+                        "Error: Invalid loop count at line: {}",
+                        token.line_number
+                    ));
+                    return;
+                }
+            },
+            _ => {
+                self.fail_and_advance(format!("Error: Expected NUMBER or STAR at line: {}", token.line_number));
                 return;
             }
         };
-        self.current_position += 1; // Skip the NUMBER token
+        self.current_position += 1; // Skip the NUMBER or STAR token
 
         let Some(token) = self.current_token() else {
             self.unexpected_eof("loop");
             return;
         };
-        if token.r#type != "RPAREN" {
+        if token.kind != TokenKind::RParen {
             self.fail_and_advance(format!("Error: Expected RPAREN at line: {}", token.line_number));
             return;
         }
@@ -371,40 +441,51 @@ impl CorelParser {
             self.unexpected_eof("loop");
             return;
         };
-        if token.r#type != "LBRACE" {
+        if token.kind != TokenKind::LBrace {
             self.fail_and_advance(format!("Error: Expected LBRACE at line: {}", token.line_number));
             return;
         }
         self.current_position += 1; // Skip the LBRACE token
 
-        let mut children: Vec<ASTnode> = Vec::new();
-        while self.current_position < self.tokens.len() as i32 {
-            let Some(token) = self.current_token() else {
-                self.unexpected_eof("loop");
-                return;
-            };
-            if token.r#type == "RBRACE" {
-                break;
-            }
-            let previous_len = self.nodes.len();
-            self.parse_line();
-            if self.nodes.len() > previous_len {
-                if let Some(node) = self.nodes.pop() {
-                    children.push(node);
-                }
-            }
+        if self.open_loops.len() >= self.max_loop_depth {
+            self.report(format!(
+                "Error: Loops nested deeper than {} at line: {}",
+                self.max_loop_depth, loop_line
+            ));
+            self.loop_depth_exceeded = true;
+            self.skip_loop_body();
+            return;
         }
 
-        if self.current_position >= self.tokens.len() as i32 {
-            self.unexpected_eof("loop body");
-            return;
+        // The body is parsed by the main loop; `close_loop` finishes the node at its RBRACE
+        self.open_loops.push(self.nodes.len() as u32);
+        self.push_node(NodeKind::Loop { value });
+    }
+
+    fn close_loop(&mut self) {
+        if let Some(loop_index) = self.open_loops.pop() {
+            self.nodes[loop_index as usize].end = self.nodes.len() as u32;
         }
         self.current_position += 1; // Skip the RBRACE token
+    }
 
-        // Creating the AST node
-        let loop_node = Box::new(LOOPnode::new(value, children)); 
-        let ast_node = ASTnode::new(NodeType::LOOP(loop_node));
-        self.nodes.push(ast_node);
+    // Skips a rejected loop body up to and including its matching RBRACE
+    fn skip_loop_body(&mut self) {
+        let mut depth = 1;
+        while let Some(token) = self.current_token() {
+            self.current_position += 1;
+            match token.kind {
+                TokenKind::LBrace => depth += 1,
+                TokenKind::RBrace => {
+                    depth -= 1;
+                    if depth == 0 {
+                        return;
+                    }
+                },
+                _ => {},
+            }
+        }
+        self.unexpected_eof("loop body");
     }
 
     fn parse_move(&mut self) {
@@ -415,7 +496,7 @@ impl CorelParser {
         };
 
         // Checking for correct syntax (move(100x) or move(100y))
-        if token.r#type != "LPAREN" {
+        if token.kind != TokenKind::LParen {
             self.fail_and_advance(format!("Error: Expected LPAREN at line: {}", token.line_number));
             return;
         }
@@ -425,15 +506,15 @@ impl CorelParser {
             self.unexpected_eof("move");
             return;
         };
-        match token.r#type.as_str() {
-            "NUMBER" => {
+        match token.kind {
+            TokenKind::Number => {
                 self.fail_and_advance(format!(
                     "Error: Expected COORDINATE at line: {}",
                     token.line_number
                 ));
                 return;
             },
-            "COORDINATE" => {
+            TokenKind::Coordinate => {
                 let (value_str, axis) = token.value.split_at(token.value.len() - 1);
                 let value = match value_str.parse::<i32>() {
                     Ok(value) => value,
@@ -451,7 +532,7 @@ impl CorelParser {
                     self.unexpected_eof("move");
                     return;
                 };
-                if token.r#type != "RPAREN" {
+                if token.kind != TokenKind::RParen {
                     self.fail_and_advance(format!(
                         "Error: Expected RPAREN at line: {}",
                         token.line_number
@@ -462,14 +543,12 @@ impl CorelParser {
                 let value_int = value as i16;
 
                 // Creating the AST node
-                let move_node = Box::new(MOVEnode::new(value_int, axis.to_string()));
-                let ast_node = ASTnode::new(NodeType::MOVE(move_node));
-                self.nodes.push(ast_node);
+                self.push_node(NodeKind::Move { value: value_int, direction: axis });
             },
             _ => {
                 self.fail_and_advance(format!(
                     "Error: Invalid token type: {} at line: {}",
-                    token.r#type, token.line_number
+                    token.kind.as_str(), token.line_number
                 ));
             }
         }    
@@ -482,9 +561,7 @@ impl CorelParser {
         };
 
         // Adding the KEY node to the AST
-        let key_node = Box::new(KEYnode::new(token.value.clone()));
-        let ast_node = ASTnode::new(NodeType::KEY(key_node));
-        self.nodes.push(ast_node);
+        self.push_node(NodeKind::Key { value: token.value });
 
         self.current_position += 1; // Skip the KEY token
     }
@@ -0,0 +1,167 @@
+use std::panic;
+use std::slice;
+
+pub mod corel_binary;
+pub mod corel_lexer;
+pub mod corel_optimizer;
+pub mod corel_parser;
+
+// Output formats understood by `corel_compile` and the `--format` CLI flag
+pub const FORMAT_JSON: u32 = 0;
+pub const FORMAT_BINARY: u32 = 1;
+
+// Optimization levels understood by `corel_compile` and the `--opt-level` CLI flag;
+// anything above OPT_BASIC is treated as OPT_BASIC
+pub const OPT_NONE: u32 = 0;
+pub const OPT_BASIC: u32 = 1;
+
+// Loops nested deeper than `max_loop_depth` reject the script; 0 selects the parser's default
+pub use corel_parser::DEFAULT_MAX_LOOP_DEPTH;
+
+pub fn max_loop_depth_or_default(max_loop_depth: usize) -> usize {
+    if max_loop_depth == 0 { DEFAULT_MAX_LOOP_DEPTH } else { max_loop_depth }
+}
+
+// Result of compiling a single Corel script; the AST borrows its strings from the source.
+// A rejected script is missing part of its body in the AST, so callers must not run it.
+pub struct CompileOutput<'a> {
+    pub ast: corel_parser::Ast<'a>,
+    pub diagnostics: Vec<String>,
+    pub rejected: bool
+}
+
+pub fn compile_source(source_code: &str, opt_level: u32, max_loop_depth: usize) -> CompileOutput<'_> {
+    // Creating the lexer
+    let lexer = corel_lexer::CorelLexer {
+        source_code: source_code
+    };
+
+    // Tokenizing the source code
+    let tokens = lexer.tokenize();
+
+    // Creating the parser
+    let mut parser = corel_parser::CorelParser::new(tokens);
+    parser.max_loop_depth = max_loop_depth_or_default(max_loop_depth);
+
+    // Parsing the tokens
+    let mut ast = parser.parse();
+    if opt_level >= OPT_BASIC {
+        ast = corel_optimizer::optimize(&ast);
+    }
+    CompileOutput {
+        ast: ast,
+        diagnostics: parser.diagnostics,
+        rejected: parser.loop_depth_exceeded
+    }
+}
+
+pub fn ast_to_json(ast: &corel_parser::Ast) -> String {
+    serde_json::to_string(ast).expect("Error: Could not convert AST to JSON")
+}
+
+// JSON is kept as the debug format; the binary format is what BASO loads
+pub fn encode_ast(ast: &corel_parser::Ast, format: u32) -> Option<Vec<u8>> {
+    match format {
+        FORMAT_JSON => Some(ast_to_json(ast).into_bytes()),
+        FORMAT_BINARY => Some(corel_binary::ast_to_binary(ast)),
+        _ => None,
+    }
+}
+
+// Token stream returned by `corel_tokenize`, all integers little-endian:
+//   token_count x (kind u8, start u32, len u32)
+// `kind` is the TokenKind's position in its declaration, `start` and `len` are byte offsets into the source.
+pub const TOKEN_RECORD_LEN: usize = 9;
+
+pub fn encode_tokens(source_code: &str, tokens: &[corel_lexer::Token]) -> Vec<u8> {
+    let mut buffer = Vec::with_capacity(tokens.len() * TOKEN_RECORD_LEN);
+    for token in tokens {
+        let start = token.value.as_ptr() as usize - source_code.as_ptr() as usize;
+        buffer.push(token.kind as u8);
+        buffer.extend_from_slice(&(start as u32).to_le_bytes());
+        buffer.extend_from_slice(&(token.value.len() as u32).to_le_bytes());
+    }
+    buffer
+}
+
+fn into_raw_buffer(buffer: Vec<u8>, out_len: *mut usize) -> *mut u8 {
+    let buffer = buffer.into_boxed_slice();
+    unsafe {
+        *out_len = buffer.len();
+    }
+    Box::into_raw(buffer) as *mut u8
+}
+
+/// C ABI used by BASO through ctypes: source bytes in, AST bytes in `format` out, optimized at `opt_level`.
+/// Returns null if the input is not valid UTF-8, nests loops deeper than `max_loop_depth` (0 for the default),
+/// the format is unknown or compilation panicked.
+/// The returned buffer must be released with `corel_free`.
+///
+/// # Safety
+///
+/// `source` must point to `source_len` readable bytes that stay unchanged for the duration of the call,
+/// and `out_len` must point to a writable `usize`; either may be null, which returns null.
+/// On success `*out_len` is set to the length of the returned buffer.
+#[no_mangle]
+pub unsafe extern "C" fn corel_compile(
+    source: *const u8, source_len: usize, format: u32, opt_level: u32, max_loop_depth: u32, out_len: *mut usize
+) -> *mut u8 {
+    if source.is_null() || out_len.is_null() {
+        return std::ptr::null_mut();
+    }
+    let source_bytes = slice::from_raw_parts(source, source_len);
+    let result = panic::catch_unwind(|| {
+        let source_code = std::str::from_utf8(source_bytes).ok()?;
+        let output = compile_source(source_code, opt_level, max_loop_depth as usize);
+        if output.rejected {
+            return None;
+        }
+        encode_ast(&output.ast, format)
+    });
+
+    match result {
+        Ok(Some(buffer)) => into_raw_buffer(buffer, out_len),
+        _ => std::ptr::null_mut(),
+    }
+}
+
+/// C ABI for BASO's script search: source bytes in, the lexer's tokens out in the `encode_tokens` layout.
+/// Returns null if the input is not valid UTF-8 or lexing panicked.
+/// The returned buffer must be released with `corel_free`.
+///
+/// # Safety
+///
+/// `source` must point to `source_len` readable bytes that stay unchanged for the duration of the call,
+/// and `out_len` must point to a writable `usize`; either may be null, which returns null.
+/// On success `*out_len` is set to the length of the returned buffer.
+#[no_mangle]
+pub unsafe extern "C" fn corel_tokenize(source: *const u8, source_len: usize, out_len: *mut usize) -> *mut u8 {
+    if source.is_null() || out_len.is_null() {
+        return std::ptr::null_mut();
+    }
+    let source_bytes = slice::from_raw_parts(source, source_len);
+    let result = panic::catch_unwind(|| {
+        let source_code = std::str::from_utf8(source_bytes).ok()?;
+        let lexer = corel_lexer::CorelLexer { source_code };
+        Some(encode_tokens(source_code, &lexer.tokenize()))
+    });
+
+    match result {
+        Ok(Some(buffer)) => into_raw_buffer(buffer, out_len),
+        _ => std::ptr::null_mut(),
+    }
+}
+
+/// Releases a buffer returned by `corel_compile` or `corel_tokenize`.
+///
+/// # Safety
+///
+/// `buffer` must be null or a pointer returned by `corel_compile` or `corel_tokenize` that was not freed yet,
+/// and `len` must be the `*out_len` that call reported. The buffer must not be used afterwards.
+#[no_mangle]
+pub unsafe extern "C" fn corel_free(buffer: *mut u8, len: usize) {
+    if buffer.is_null() {
+        return;
+    }
+    drop(Box::from_raw(slice::from_raw_parts_mut(buffer, len)));
+}
@@ -1,32 +1,315 @@
-use std::fs;
-use std::io;
-
-mod corel_lexer;
-mod corel_parser;
-
+use std::env;
+use std::fs;
+use std::io::{self, Read, Write};
+use std::path::{Path, PathBuf};
+use std::process;
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::thread;
+
+use corel_compiler::{
+    compile_source, encode_ast, max_loop_depth_or_default, DEFAULT_MAX_LOOP_DEPTH, FORMAT_BINARY, FORMAT_JSON, OPT_BASIC,
+    OPT_NONE
+};
+
+const USAGE: &str = "Usage:
+    corel [--format json|binary]
+        Compiles corel.corel into ast.json (or ast.bin) in the working directory
+    corel compile <input...> --out-dir <dir> [--format json|binary] [--opt-level 0|1] [--max-loop-depth <n>] [--jobs <n>]
+        Compiles every input in parallel; each output is named after a hash of its source
+        and an `<input>\\t<output>` line is printed per input
+    corel compile - [--format json|binary] [--opt-level 0|1] [--max-loop-depth <n>]
+        Reads one script from stdin and writes its AST to stdout
+        Scripts with loops nested deeper than --max-loop-depth (default 64) are rejected
+    corel serve
+        Stays resident and answers framed compile requests on stdin/stdout:
+        request  = format u8, opt_level u8, max_loop_depth u16 (0 = default), source_len u32 (little-endian),
+                   source bytes
+        response = status u8, reserved [u8; 3], ast_len u32, diagnostics_len u32, AST bytes,
+                   newline-separated diagnostics (status 0 = ok, 1 = rejected input)";
+
+struct CompileOptions {
+    inputs: Vec<String>,
+    out_dir: Option<PathBuf>,
+    format: u32,
+    opt_level: u32,
+    max_loop_depth: usize,
+    jobs: usize
+}
+
 fn main() -> io::Result<()> {
+    let args: Vec<String> = env::args().skip(1).collect();
+    let result = match args.first().map(String::as_str) {
+        Some("compile") => parse_compile_options(&args[1..]).and_then(run_compile),
+        Some("serve") if args.len() == 1 => run_serve(),
+        _ => parse_format_only(&args).and_then(run_legacy),
+    };
+
+    match result {
+        Ok(true) => Ok(()),
+        Ok(false) => process::exit(1),
+        Err(message) => {
+            eprintln!("{message}\n\n{USAGE}");
+            process::exit(2);
+        }
+    }
+}
+
+fn parse_format(value: Option<&String>) -> Result<u32, String> {
+    match value.map(String::as_str) {
+        Some("json") => Ok(FORMAT_JSON),
+        Some("binary") => Ok(FORMAT_BINARY),
+        Some(other) => Err(format!("Error: Unknown format: {other}")),
+        None => Err("Error: --format expects json or binary".to_string()),
+    }
+}
+
+fn parse_format_only(args: &[String]) -> Result<u32, String> {
+    match args {
+        [] => Ok(FORMAT_JSON),
+        [flag, value] if flag == "--format" => parse_format(Some(value)),
+        _ => Err(format!("Error: Unexpected arguments: {}", args.join(" "))),
+    }
+}
+
+fn parse_compile_options(args: &[String]) -> Result<CompileOptions, String> {
+    let mut options = CompileOptions {
+        inputs: Vec::new(),
+        out_dir: None,
+        format: FORMAT_JSON,
+        opt_level: OPT_NONE,
+        max_loop_depth: DEFAULT_MAX_LOOP_DEPTH,
+        jobs: thread::available_parallelism().map(|count| count.get()).unwrap_or(1)
+    };
+
+    let mut iter = args.iter();
+    while let Some(arg) = iter.next() {
+        match arg.as_str() {
+            "--out-dir" => {
+                let dir = iter.next().ok_or("Error: --out-dir expects a directory")?;
+                options.out_dir = Some(PathBuf::from(dir));
+            },
+            "--format" => options.format = parse_format(iter.next())?,
+            "--opt-level" => {
+                options.opt_level = match iter.next().map(String::as_str) {
+                    Some("0") => OPT_NONE,
+                    Some("1") => OPT_BASIC,
+                    _ => return Err("Error: --opt-level expects 0 or 1".to_string()),
+                };
+            },
+            "--max-loop-depth" => {
+                options.max_loop_depth = iter.next()
+                    .and_then(|value| value.parse::<usize>().ok())
+                    .filter(|&depth| depth > 0)
+                    .ok_or("Error: --max-loop-depth expects a positive number")?;
+            },
+            "--jobs" => {
+                options.jobs = iter.next()
+                    .and_then(|value| value.parse::<usize>().ok())
+                    .filter(|&jobs| jobs > 0)
+                    .ok_or("Error: --jobs expects a positive number")?;
+            },
+            _ => options.inputs.push(arg.clone()),
+        }
+    }
+
+    if options.inputs.is_empty() {
+        return Err("Error: No input scripts given".to_string());
+    }
+    if options.out_dir.is_none() && options.inputs.len() != 1 {
+        return Err("Error: --out-dir is required when compiling more than one script".to_string());
+    }
+    if options.out_dir.is_some() && options.inputs.iter().any(|input| input == "-") {
+        return Err("Error: stdin input writes to stdout and cannot be combined with --out-dir".to_string());
+    }
+    Ok(options)
+}
+
+// Original single-file mode used by corel.bat: corel.corel in, ast.json (or ast.bin) out
+fn run_legacy(format: u32) -> Result<bool, String> {
     let source_code_path = "corel.corel";
     let source_code = fs::read_to_string(source_code_path)
         .expect("Something went wrong reading the file");
-    
-    // Creating the lexer
-    let lexer = corel_lexer::CorelLexer {
-        source_code: source_code,
-        ..Default::default()
+
+    // Lexing and parsing the source code
+    let output = compile_source(&source_code, OPT_NONE, DEFAULT_MAX_LOOP_DEPTH);
+    for diagnostic in &output.diagnostics {
+        eprintln!("{diagnostic}");
+    }
+    if output.rejected {
+        return Ok(false);
+    }
+
+    // Passing the AST to a file so that we can use it in the interpreter
+    let ast_path = if format == FORMAT_BINARY { "ast.bin" } else { "ast.json" };
+    let ast_bytes = encode_ast(&output.ast, format).expect("Error: Could not encode AST");
+    fs::write(ast_path, ast_bytes)
+        .expect("Error: Could not write AST to file");
+
+    Ok(true)
+}
+
+fn run_compile(options: CompileOptions) -> Result<bool, String> {
+    let Some(out_dir) = &options.out_dir else {
+        return Ok(compile_to_stdout(&options.inputs[0], &options));
     };
+    fs::create_dir_all(out_dir)
+        .map_err(|error| format!("Error: Could not create {}: {error}", out_dir.display()))?;
+
+    // Workers pull the next input index until every script is compiled
+    let next_input = AtomicUsize::new(0);
+    let jobs = options.jobs.min(options.inputs.len());
+    let mut results: Vec<(usize, Result<PathBuf, String>)> = thread::scope(|scope| {
+        let workers: Vec<_> = (0..jobs)
+            .map(|_| scope.spawn(|| {
+                let mut compiled = Vec::new();
+                loop {
+                    let index = next_input.fetch_add(1, Ordering::Relaxed);
+                    let Some(input) = options.inputs.get(index) else {
+                        break;
+                    };
+                    compiled.push((index, compile_file(index, input, out_dir, &options)));
+                }
+                compiled
+            }))
+            .collect();
+        workers.into_iter().flat_map(|worker| worker.join().unwrap_or_default()).collect()
+    });
+    results.sort_by_key(|(index, _)| *index);
+
+    let stdout = io::stdout();
+    let mut stdout = stdout.lock();
+    let mut all_ok = true;
+    for (index, result) in results {
+        let input = &options.inputs[index];
+        match result {
+            Ok(output_path) => {
+                let _ = writeln!(stdout, "{input}\t{}", output_path.display());
+            },
+            Err(message) => {
+                eprintln!("{input}: {message}");
+                all_ok = false;
+            }
+        }
+    }
+    Ok(all_ok)
+}
+
+fn compile_file(index: usize, input: &str, out_dir: &Path, options: &CompileOptions) -> Result<PathBuf, String> {
+    let source = fs::read(input).map_err(|error| format!("Error: Could not read script: {error}"))?;
+    let source_code = std::str::from_utf8(&source)
+        .map_err(|_| "Error: Script is not valid UTF-8".to_string())?;
+    let output = compile_source(source_code, options.opt_level, options.max_loop_depth);
+    for diagnostic in &output.diagnostics {
+        eprintln!("{input}: {diagnostic}");
+    }
+    if output.rejected {
+        return Err("Error: Script rejected".to_string());
+    }
+    let ast_bytes = encode_ast(&output.ast, options.format).ok_or("Error: Could not encode AST")?;
 
-    // Tokenizing the source code
-    let tokens = lexer.tokenize();
+    // Outputs are content-addressed, so identical sources share one file; the opt level and a
+    // non-default loop depth limit are part of the name because they change the AST
+    let extension = if options.format == FORMAT_BINARY { "bin" } else { "json" };
+    let depth_suffix = if options.max_loop_depth == DEFAULT_MAX_LOOP_DEPTH {
+        String::new()
+    } else {
+        format!("-D{}", options.max_loop_depth)
+    };
+    let name = format!("{:016x}-O{}{depth_suffix}.{extension}", content_hash(&source), options.opt_level);
+    let output_path = out_dir.join(&name);
+    let temp_path = out_dir.join(format!("{name}.{}-{index}.tmp", process::id()));
+    fs::write(&temp_path, ast_bytes)
+        .and_then(|_| fs::rename(&temp_path, &output_path))
+        .map_err(|error| {
+            let _ = fs::remove_file(&temp_path);
+            format!("Error: Could not write AST: {error}")
+        })?;
+    Ok(output_path)
+}
 
-    // Creating the parser
-    let mut parser = corel_parser::CorelParser {
-        tokens: tokens,
-        ..Default::default()
+fn compile_to_stdout(input: &str, options: &CompileOptions) -> bool {
+    let mut source = Vec::new();
+    let read = if input == "-" {
+        io::stdin().read_to_end(&mut source).map(|_| ())
+    } else {
+        fs::read(input).map(|bytes| source = bytes)
+    };
+    if let Err(error) = read {
+        eprintln!("{input}: Error: Could not read script: {error}");
+        return false;
+    }
+    let Ok(source_code) = std::str::from_utf8(&source) else {
+        eprintln!("{input}: Error: Script is not valid UTF-8");
+        return false;
     };
 
-    // Parsing the tokens
-    let _ast = parser.parse();
+    let output = compile_source(source_code, options.opt_level, options.max_loop_depth);
+    for diagnostic in &output.diagnostics {
+        eprintln!("{diagnostic}");
+    }
+    if output.rejected {
+        return false;
+    }
+    let ast_bytes = encode_ast(&output.ast, options.format).expect("Error: Could not encode AST");
+    io::stdout().lock().write_all(&ast_bytes).is_ok()
+}
+
+// Compile daemon: one request/response frame per script until stdin is closed
+fn run_serve() -> Result<bool, String> {
+    let stdin = io::stdin();
+    let mut input = stdin.lock();
+    let stdout = io::stdout();
+    let mut output = stdout.lock();
+
+    loop {
+        let mut header = [0u8; 8];
+        match input.read_exact(&mut header) {
+            Ok(()) => {},
+            Err(error) if error.kind() == io::ErrorKind::UnexpectedEof => return Ok(true),
+            Err(error) => return Err(format!("Error: Could not read request: {error}")),
+        }
+        let format = header[0] as u32;
+        let opt_level = header[1] as u32;
+        let max_loop_depth = max_loop_depth_or_default(u16::from_le_bytes([header[2], header[3]]) as usize);
+        let source_len = u32::from_le_bytes([header[4], header[5], header[6], header[7]]) as usize;
+        let mut source = vec![0u8; source_len];
+        input.read_exact(&mut source)
+            .map_err(|error| format!("Error: Could not read request: {error}"))?;
+
+        let (status, ast_bytes, diagnostics) = match std::str::from_utf8(&source) {
+            Ok(source_code) => {
+                let output = compile_source(source_code, opt_level, max_loop_depth);
+                if output.rejected {
+                    (1u8, Vec::new(), output.diagnostics.join("\n"))
+                } else {
+                    match encode_ast(&output.ast, format) {
+                        Some(ast_bytes) => (0u8, ast_bytes, output.diagnostics.join("\n")),
+                        None => (1u8, Vec::new(), format!("Error: Unknown format: {format}")),
+                    }
+                }
+            },
+            Err(_) => (1u8, Vec::new(), "Error: Script is not valid UTF-8".to_string()),
+        };
+
+        let mut response = Vec::with_capacity(12 + ast_bytes.len() + diagnostics.len());
+        response.push(status);
+        response.extend_from_slice(&[0u8; 3]);
+        response.extend_from_slice(&(ast_bytes.len() as u32).to_le_bytes());
+        response.extend_from_slice(&(diagnostics.len() as u32).to_le_bytes());
+        response.extend_from_slice(&ast_bytes);
+        response.extend_from_slice(diagnostics.as_bytes());
+        output.write_all(&response)
+            .and_then(|_| output.flush())
+            .map_err(|error| format!("Error: Could not write response: {error}"))?;
+    }
+}
 
-   
-    Ok(())
+// 64-bit FNV-1a: stable across platforms and compiler releases, unlike std's hasher
+fn content_hash(bytes: &[u8]) -> u64 {
+    let mut hash: u64 = 0xcbf29ce484222325;
+    for &byte in bytes {
+        hash ^= byte as u64;
+        hash = hash.wrapping_mul(0x100000001b3);
+    }
+    hash
 }
@@ -0,0 +1,120 @@
+# Shared fixtures: the Corel runtime is loaded by path like the benches do, and the compiler library is
+# the one `cargo build` leaves in corel/target/debug (or COREL_COMPILER_LIBRARY). Tests that need the
+# compiler are skipped when it has not been built. BASO itself is imported without a display, with pynput's
+# dummy backend and Qt's offscreen platform.
+import ctypes
+import glob
+import importlib.util
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COREL_DIR = os.path.join(REPO_ROOT, 'corel')
+COREL_FIXTURES = sorted(glob.glob(os.path.join(COREL_DIR, 'test', '*.corel')))
+
+FORMAT_JSON = 0
+FORMAT_BINARY = 1
+
+def compiler_library_path():
+    path = os.environ.get('COREL_COMPILER_LIBRARY')
+    if path:
+        return path
+    target_dir = os.path.join(COREL_DIR, 'target', 'debug')
+    if os.name == 'nt':
+        return os.path.join(target_dir, 'corel_compiler.dll')
+    if sys.platform == 'darwin':
+        return os.path.join(target_dir, 'libcorel_compiler.dylib')
+    return os.path.join(target_dir, 'libcorel_compiler.so')
+
+class CorelCompiler:
+    def __init__(self, path):
+        self.library = ctypes.CDLL(path)
+        self.library.corel_compile.argtypes = [
+            ctypes.c_char_p, ctypes.c_size_t, ctypes.c_uint32, ctypes.c_uint32, ctypes.c_uint32,
+            ctypes.POINTER(ctypes.c_size_t)
+        ]
+        self.library.corel_compile.restype = ctypes.c_void_p
+        self.library.corel_tokenize.argtypes = [ctypes.c_char_p, ctypes.c_size_t, ctypes.POINTER(ctypes.c_size_t)]
+        self.library.corel_tokenize.restype = ctypes.c_void_p
+        self.library.corel_free.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        self.library.corel_free.restype = None
+
+    def compile(self, source, output_format, opt_level, max_loop_depth=0):
+        ast_bytes = self.try_compile(source, output_format, opt_level, max_loop_depth)
+        assert ast_bytes is not None, 'corel_compile rejected the script'
+        return ast_bytes
+
+    def try_compile(self, source, output_format, opt_level, max_loop_depth=0):
+        # None when corel_compile rejects the script
+        out_len = ctypes.c_size_t(0)
+        buffer = self.library.corel_compile(
+            source, len(source), output_format, opt_level, max_loop_depth, ctypes.byref(out_len)
+        )
+        if not buffer:
+            return None
+        try:
+            return ctypes.string_at(buffer, out_len.value)
+        finally:
+            self.library.corel_free(buffer, out_len.value)
+
+@pytest.fixture(scope='session')
+def runtime():
+    spec = importlib.util.spec_from_file_location('corel_runtime', os.path.join(COREL_DIR, 'corel_interpreter.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture(scope='session')
+def baso():
+    os.environ.setdefault('PYNPUT_BACKEND', 'dummy')
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    pytest.importorskip('PyQt5')
+    spec = importlib.util.spec_from_file_location('BASO', os.path.join(REPO_ROOT, 'BASO.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture(scope='session')
+def compiler_executable():
+    # The `corel` binary built next to the compiler library
+    path = os.path.join(os.path.dirname(compiler_library_path()), 'corel.exe' if os.name == 'nt' else 'corel')
+    if not os.path.exists(path):
+        pytest.skip(f'Corel compiler executable not built: {path}')
+    return path
+
+@pytest.fixture(scope='session')
+def compiler():
+    path = compiler_library_path()
+    if not os.path.exists(path):
+        pytest.skip(f'Corel compiler library not built: {path}')
+    return CorelCompiler(path)
+
+class ModMenuHarness:
+    # Stands in for a ModMenu without building its window: methods not defined on the harness are taken from
+    # ModMenu and bound to it, so a test only provides the state and collaborators the code under test touches
+    def __init__(self, baso):
+        self.baso = baso
+
+    def __getattr__(self, name):
+        return getattr(self.baso.ModMenu, name).__get__(self)
+
+class Signal:
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, *args):
+        self.emitted.append(args)
+
+def read_fixture(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+def ast_tree(nodes):
+    # Nodes have no __eq__; compare them as (class, fields, children) tuples
+    return [
+        (type(node).__name__, sorted((key, value) for key, value in vars(node).items() if key != 'children'),
+         ast_tree(node.children))
+        for node in nodes
+    ]
@@ -0,0 +1,21 @@
+import json
+import os
+
+import pytest
+
+from conftest import COREL_FIXTURES, FORMAT_BINARY, FORMAT_JSON, ast_tree, read_fixture
+
+@pytest.mark.parametrize('opt_level', [0, 1])
+@pytest.mark.parametrize('path', COREL_FIXTURES, ids=os.path.basename)
+def test_json_and_binary_load_the_same_tree(runtime, compiler, path, opt_level):
+    source = read_fixture(path)
+    from_json = runtime.build_ast_from_json(json.loads(compiler.compile(source, FORMAT_JSON, opt_level)))
+    from_binary = runtime.build_ast_from_binary(compiler.compile(source, FORMAT_BINARY, opt_level))
+    assert ast_tree(from_binary) == ast_tree(from_json)
+
+def test_loop_forever_round_trips(runtime, compiler):
+    source = b"--<f>\nloop(*) {\n    move(1x)\n    wait(5ms)\n}\n"
+    from_json = runtime.build_ast_from_json(json.loads(compiler.compile(source, FORMAT_JSON, 1)))
+    from_binary = runtime.build_ast_from_binary(compiler.compile(source, FORMAT_BINARY, 1))
+    assert ast_tree(from_binary) == ast_tree(from_json)
+    assert from_binary[1].value == runtime.LOOP_FOREVER
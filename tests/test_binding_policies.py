@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+from conftest import ModMenuHarness, Signal
+
+class BindingsHarness(ModMenuHarness):
+    # The binding bookkeeping of ModMenu, with the widgets and the input hub left out
+    def __init__(self, baso, bindings_file):
+        super().__init__(baso)
+        self.script_bindings_file = bindings_file
+        self.script_bindings = {}
+        self.binding_run_policies = {}
+        self.hotkey_held_events = {}
+        self.script_run_scheduler = None
+        self.run_script_signal = Signal()
+        self.output = []
+
+    def append_script_output(self, text):
+        self.output.append(text)
+
+    def refresh_script_bindings_list(self):
+        pass
+
+    def apply_script_bindings(self):
+        pass
+
+    def prewarm_script_runtime_cache_async(self):
+        pass
+
+    def update_runtime_summary(self):
+        pass
+
+@pytest.fixture
+def script(tmp_path):
+    path = tmp_path / 'burst.corel'
+    path.write_text('--<k>\nmove(1x)\n')
+    return str(path)
+
+@pytest.fixture
+def menu(baso, tmp_path, script):
+    bindings_file = tmp_path / 'script_bindings.json'
+    bindings_file.write_text(json.dumps({'k': {'script': script, 'policy': 'hold'}, 'j': script}))
+    menu = BindingsHarness(baso, str(bindings_file))
+    menu.load_script_bindings()
+    return menu
+
+def test_hotkeys_of_one_script_keep_their_own_policy(menu, script):
+    assert menu.get_binding_run_policy('k') == 'hold'
+    assert menu.get_binding_run_policy('j') == 'reject'
+
+    menu.on_hotkey_pressed('k', script)
+    menu.on_hotkey_pressed('j', script)
+    assert menu.run_script_signal.emitted == [(script, 'k', 'hold'), (script, 'j', 'reject')]
+    assert menu.hotkey_held_events['k'].is_set()
+    assert 'j' not in menu.hotkey_held_events
+
+def test_policies_are_saved_per_hotkey(menu, baso, script):
+    menu.binding_run_policies['j'] = 'queue'
+    menu.save_script_bindings()
+
+    reloaded = BindingsHarness(baso, menu.script_bindings_file)
+    reloaded.load_script_bindings()
+    assert reloaded.binding_run_policies == {'k': 'hold', 'j': 'queue'}
+
+def test_resyncing_the_trigger_keeps_the_policy(menu, script):
+    # Saving the script rebuilds its binding from the --<k> trigger; the other hotkey goes, k's policy stays
+    menu.sync_script_binding_from_script(script)
+    assert menu.script_bindings == {'k': script}
+    assert menu.binding_run_policies == {'k': 'hold'}
+
+def test_changed_trigger_moves_the_policy(menu, script):
+    with open(script, 'w') as file:
+        file.write('--<m>\nmove(1x)\n')
+    menu.sync_script_binding_from_script(script)
+    assert menu.script_bindings == {'m': script}
+    assert menu.binding_run_policies == {'m': 'hold'}
+
+class SelectedItem:
+    def __init__(self, hotkey):
+        self.hotkey = hotkey
+
+    def data(self, role):
+        return self.hotkey
+
+class BindingList:
+    def __init__(self, hotkey):
+        self.item = SelectedItem(hotkey)
+
+    def currentItem(self):
+        return self.item
+
+def test_removing_one_hotkey_keeps_the_others_policy(menu, baso, monkeypatch, script):
+    menu.binding_run_policies['j'] = 'toggle'
+    menu.script_binding_list = BindingList('k')
+    monkeypatch.setattr(baso.QMessageBox, 'question', lambda *args: baso.QMessageBox.Yes)
+    menu.remove_selected_script_binding()
+
+    assert menu.script_bindings == {'j': script}
+    assert menu.binding_run_policies == {'j': 'toggle'}
@@ -0,0 +1,50 @@
+import threading
+import time
+
+from conftest import ModMenuHarness, compiler_library_path
+
+class LibraryHarness(ModMenuHarness):
+    # A stale build every time it is checked, so each caller that gets past the lock would build again
+    def __init__(self, baso, library_path):
+        super().__init__(baso)
+        self.library_path = library_path
+        self.corel_compiler_library = None
+        self.corel_compiler_library_error = None
+        self.corel_compiler_library_lock = threading.Lock()
+        self.builds = 0
+
+    def get_corel_compiler_library_path(self):
+        return self.library_path
+
+    def is_corel_build_stale(self, artifact_path):
+        return True
+
+    def build_corel(self):
+        self.builds += 1
+        time.sleep(0.05)
+
+def test_concurrent_first_compiles_build_and_load_once(baso, compiler):
+    menu = LibraryHarness(baso, compiler_library_path())
+    barrier = threading.Barrier(8)
+    libraries = []
+
+    def first_compile():
+        barrier.wait()
+        libraries.append(menu.get_corel_compiler_library())
+
+    threads = [threading.Thread(target=first_compile) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert menu.builds == 1
+    assert menu.corel_compiler_library_error is None
+    assert len(libraries) == 8 and all(library is libraries[0] for library in libraries)
+
+def test_failed_build_is_remembered(baso, tmp_path):
+    menu = LibraryHarness(baso, str(tmp_path / 'missing.so'))
+    assert menu.get_corel_compiler_library() is None
+    assert menu.get_corel_compiler_library() is None
+    assert menu.builds == 1
+    assert 'not found after build' in menu.corel_compiler_library_error
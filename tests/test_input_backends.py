@@ -0,0 +1,106 @@
+import threading
+
+import pytest
+
+class FakeUser32:
+    # Stands in for user32.dll: keeps what every SendInput call submitted
+    def __init__(self, on_send=None):
+        self.batches = []
+        self.on_send = on_send
+        self.on_key_scan = None
+
+    def SendInput(self, count, records, size):
+        self.batches.append([(records[index].union.mi.dx, records[index].union.mi.dy) for index in range(count)])
+        if self.on_send is not None:
+            self.on_send()
+        return count
+
+    def VkKeyScanW(self, key):
+        if self.on_key_scan is not None:
+            self.on_key_scan()
+        return ord(key.upper())
+
+@pytest.fixture
+def user32(runtime, monkeypatch):
+    user32 = FakeUser32()
+    monkeypatch.setattr(runtime.WindowsInputBackend, 'user32', user32)
+    return user32
+
+def loop(runtime, iterations, *children):
+    node = runtime.LOOPnode('LOOP', iterations)
+    node.children = list(children)
+    return node
+
+def test_move_only_loop_is_flushed_while_it_runs(runtime, user32):
+    backend = runtime.WindowsInputBackend()
+    token = runtime.CancellationToken()
+    user32.on_send = token.cancel
+    program = runtime.compile_program([loop(runtime, runtime.LOOP_FOREVER, runtime.MOVEnode('MOVE', 'x', 1))])
+    interpreter = runtime.CorelInterpreter(None, program=program, scheduler=runtime.WaitScheduler(0), backend=backend)
+    interpreter.run(token=token)
+
+    # The first full queue is sent mid-loop, and every record carries a bounded number of moves
+    first = user32.batches[0]
+    assert len(first) == runtime.WindowsInputBackend.MAX_PENDING
+    assert all(1 <= dx <= runtime.WindowsInputBackend.MAX_MERGED_MOVES and dy == 0 for dx, dy in first)
+
+def test_long_move_loop_sends_every_move(runtime, user32):
+    backend = runtime.WindowsInputBackend()
+    program = runtime.compile_program([loop(runtime, 100_000, runtime.MOVEXYnode('MOVEXY', 1, -1))])
+    runtime.CorelInterpreter(None, program=program, scheduler=runtime.WaitScheduler(0), backend=backend).run()
+
+    assert len(user32.batches) > 1
+    assert sum(dx for batch in user32.batches for dx, _dy in batch) == 100_000
+    assert sum(dy for batch in user32.batches for _dx, dy in batch) == -100_000
+
+def test_large_moves_do_not_wrap(runtime, user32):
+    backend = runtime.WindowsInputBackend()
+    for _ in range(3):
+        backend.move(2**31 - 1, -(2**31 - 1))
+    backend.flush()
+
+    assert user32.batches == [[(2**31 - 1, -(2**31 - 1))] * 3]
+
+def move_then_press(runtime):
+    # The press is looked up while the move is still queued, so the lookup can stop the run in between
+    return runtime.compile_program([runtime.MOVEnode('MOVE', 'x', 5), runtime.PRESSnode('PRESS', 'f')])
+
+def test_stopped_run_discards_queued_input(runtime, user32):
+    backend = runtime.WindowsInputBackend()
+    token = runtime.CancellationToken()
+    user32.on_key_scan = token.cancel
+    interpreter = runtime.CorelInterpreter([], scheduler=runtime.WaitScheduler(0), backend=backend)
+    interpreter.run(move_then_press(runtime), token)
+
+    assert user32.batches == []
+    assert backend.pending == []
+
+    user32.on_key_scan = None
+    interpreter.run(move_then_press(runtime))
+    assert len(user32.batches) == 1
+
+def test_stopped_async_run_discards_queued_input(runtime, user32):
+    finished = threading.Event()
+    runner = runtime.CorelAsyncRunner('windows', on_finished=lambda context, stats, error: finished.set())
+    token = runtime.CancellationToken()
+    user32.on_key_scan = token.cancel
+    runner.submit(move_then_press(runtime), token=token)
+    assert finished.wait(5)
+    runner.shutdown()
+    runner.thread.join(5)
+
+    assert user32.batches == []
+
+@pytest.mark.parametrize('runs', [0, 1])
+def test_async_runner_shuts_down_during_calibration(runtime, runs):
+    # shutdown() right after construction lands while the loop is still calibrating its timers
+    finished = threading.Event()
+    runner = runtime.CorelAsyncRunner('recording', on_finished=lambda context, stats, error: finished.set())
+    for _ in range(runs):
+        runner.submit(runtime.compile_program([runtime.WAITnode('WAIT', 1, 'ms')]))
+    runner.shutdown()
+    runner.thread.join(5)
+
+    assert not runner.thread.is_alive()
+    assert runner.loop.is_closed()
+    assert finished.is_set() == bool(runs)
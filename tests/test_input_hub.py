@@ -0,0 +1,51 @@
+import pytest
+
+class FakeListener:
+    # Maps left/right modifier keys onto the generic one, as the platform listeners do
+    CANONICAL = {'ctrl_l': 'ctrl', 'ctrl_r': 'ctrl', 'alt_l': 'alt'}
+
+    def canonical(self, key):
+        return self.CANONICAL.get(key, key)
+
+@pytest.fixture
+def hub(baso, monkeypatch):
+    # The dummy pynput backend aliases every Key member, so modifiers are stood in for by names
+    monkeypatch.setattr(baso, 'HOTKEY_MODIFIER_BITS', {'ctrl': 1, 'alt': 2})
+    pressed = []
+    released = []
+    hub = baso.InputHub(lambda *match: pressed.append(match), None, lambda *match: released.append(match))
+    hub.keyboard_listener = FakeListener()
+    hub.table = {'k': {0: ('k', 'plain.corel'), 3: ('<ctrl>+<alt>+k', 'combo.corel')}}
+    hub.pressed = pressed
+    hub.released = released
+    return hub
+
+def test_modifiers_then_key(hub):
+    for key in ('ctrl_l', 'alt_l', 'k'):
+        hub.on_press(key)
+    hub.on_press('k')
+    hub.on_release('k')
+
+    assert hub.pressed == [('<ctrl>+<alt>+k', 'combo.corel')]
+    assert hub.released == [('<ctrl>+<alt>+k', 'combo.corel')]
+
+def test_key_then_modifiers(hub):
+    for key in ('k', 'ctrl_l', 'alt_l'):
+        hub.on_press(key)
+    hub.on_press('alt_l')
+    hub.on_release('k')
+
+    assert hub.pressed == [('k', 'plain.corel'), ('<ctrl>+<alt>+k', 'combo.corel')]
+    assert hub.released == hub.pressed
+
+def test_releasing_one_of_two_ctrl_keys_keeps_ctrl_down(hub):
+    for key in ('ctrl_l', 'ctrl_r', 'alt_l'):
+        hub.on_press(key)
+    hub.on_release('ctrl_l')
+    hub.on_press('k')
+    hub.on_release('k')
+    hub.on_release('ctrl_r')
+    hub.on_press('k')
+
+    assert hub.modifiers == 2
+    assert hub.pressed == [('<ctrl>+<alt>+k', 'combo.corel')]
@@ -0,0 +1,51 @@
+import json
+import struct
+import subprocess
+
+from conftest import FORMAT_BINARY, FORMAT_JSON
+
+NESTED_LOOPS = b"--<f>\nloop(2) {\n    loop(2) {\n        loop(2) {\n            press(\"f\")\n        }\n    }\n}\n"
+
+def loop_depth(nodes):
+    loops = [node for node in nodes if type(node).__name__ == 'LOOPnode']
+    return 1 + max((loop_depth(node.children) for node in loops), default=0) if loops else 0
+
+def test_default_limit_keeps_shallow_nesting(runtime, compiler):
+    nodes = runtime.build_ast_from_json(json.loads(compiler.compile(NESTED_LOOPS, FORMAT_JSON, 0)))
+    assert loop_depth(nodes) == 3
+
+def test_nesting_at_the_limit_compiles(runtime, compiler):
+    nodes = runtime.build_ast_from_json(json.loads(compiler.compile(NESTED_LOOPS, FORMAT_JSON, 0, max_loop_depth=3)))
+    assert loop_depth(nodes) == 3
+
+def test_deeper_nesting_rejects_the_script(compiler):
+    # Dropping the too-deep loop would run the script with part of its body missing
+    assert compiler.try_compile(NESTED_LOOPS, FORMAT_JSON, 0, max_loop_depth=2) is None
+    assert compiler.try_compile(NESTED_LOOPS, FORMAT_BINARY, 1, max_loop_depth=2) is None
+
+def test_cli_rejects_deeper_nesting(compiler_executable, tmp_path):
+    result = subprocess.run(
+        [compiler_executable, 'compile', '-', '--max-loop-depth', '2'], input=NESTED_LOOPS, capture_output=True
+    )
+    assert result.returncode != 0
+    assert result.stdout == b''
+    assert b'nested deeper than 2' in result.stderr
+
+    script = tmp_path / 'nested.corel'
+    script.write_bytes(NESTED_LOOPS)
+    out_dir = tmp_path / 'out'
+    result = subprocess.run(
+        [compiler_executable, 'compile', str(script), '--out-dir', str(out_dir), '--max-loop-depth', '2'],
+        capture_output=True
+    )
+    assert result.returncode != 0
+    assert result.stdout == b''
+    assert list(out_dir.iterdir()) == []
+
+def test_daemon_rejects_deeper_nesting(compiler_executable):
+    request = struct.pack('<BBHI', FORMAT_BINARY, 1, 2, len(NESTED_LOOPS)) + NESTED_LOOPS
+    result = subprocess.run([compiler_executable, 'serve'], input=request, capture_output=True, timeout=10)
+    status, ast_length, diagnostics_length = struct.unpack('<BxxxII', result.stdout[:12])
+    assert status == 1
+    assert ast_length == 0
+    assert b'nested deeper than 2' in result.stdout[12:12 + diagnostics_length]
@@ -0,0 +1,75 @@
+import json
+import os
+
+import pytest
+
+from conftest import COREL_FIXTURES, FORMAT_BINARY, FORMAT_JSON, read_fixture
+
+class TracingScheduler:
+    # Records every wait into the backend's event list instead of sleeping, so traces include timing
+    def __init__(self, backend):
+        self.backend = backend
+
+    def start(self):
+        pass
+
+    def wait(self, duration_ns, token=None):
+        self.backend.events.append((None, 'wait', duration_ns))
+        return 0
+
+def run_trace(runtime, nodes):
+    backend = runtime.RecordingInputBackend()
+    runtime.CorelInterpreter(nodes, scheduler=TracingScheduler(backend), backend=backend).run()
+    return [event[1:] for event in backend.events]
+
+def normalize(trace):
+    # Back-to-back moves and back-to-back waits are what the optimizer fuses; the input backends
+    # deliver a merged move the same way, so only their sums have to match
+    merged = []
+    for kind, *args in trace:
+        if merged and merged[-1][0] == kind == 'move':
+            merged[-1] = ('move', merged[-1][1] + args[0], merged[-1][2] + args[1])
+        elif merged and merged[-1][0] == kind == 'wait':
+            merged[-1] = ('wait', merged[-1][1] + args[0])
+        else:
+            merged.append((kind, *args))
+    return [event for event in merged if event not in (('move', 0, 0), ('wait', 0))]
+
+def load(runtime, compiler, source, opt_level):
+    return runtime.build_ast_from_binary(compiler.compile(source, FORMAT_BINARY, opt_level))
+
+def assert_equivalent(runtime, compiler, source):
+    unoptimized = run_trace(runtime, load(runtime, compiler, source, 0))
+    optimized = run_trace(runtime, load(runtime, compiler, source, 1))
+    assert normalize(optimized) == normalize(unoptimized)
+    return unoptimized, optimized
+
+@pytest.mark.parametrize('path', COREL_FIXTURES, ids=os.path.basename)
+def test_fixtures_run_the_same_at_every_opt_level(runtime, compiler, path):
+    assert_equivalent(runtime, compiler, read_fixture(path))
+
+def test_moves_merge_into_movexy(runtime, compiler):
+    source = b"--<f>\nmove(100x)\nmove(50y)\nmove(-20x)\n"
+    unoptimized, optimized = assert_equivalent(runtime, compiler, source)
+    assert [type(node).__name__ for node in load(runtime, compiler, source, 1)] == ['KEYnode', 'MOVEXYnode']
+    assert unoptimized == [('move', 100, 0), ('move', 0, 50), ('move', -20, 0)]
+    assert optimized == [('move', 80, 50)]
+
+def test_waits_fold_into_one(runtime, compiler):
+    source = b"--<f>\npress(\"f\")\nwait(1s)\nwait(25cs)\nwait(5ms)\npress(\"f\")\n"
+    unoptimized, optimized = assert_equivalent(runtime, compiler, source)
+    assert unoptimized.count(('press', 'f')) == optimized.count(('press', 'f')) == 2
+    assert [event for event in optimized if event[0] == 'wait'] == [('wait', 1_255_000_000)]
+
+def test_single_iteration_loop_is_inlined(runtime, compiler):
+    # Only the last statement can fail, so the top-level loop(1) keeps its error recovery once inlined
+    source = b"--<f>\nloop(1) {\n    move(5x)\n    press(\"f\")\n}\nloop(0) {\n    click(\"left\")\n}\n"
+    unoptimized, optimized = assert_equivalent(runtime, compiler, source)
+    nodes = load(runtime, compiler, source, 1)
+    assert not any(type(node).__name__ == 'LOOPnode' for node in nodes)
+    assert optimized == [('move', 5, 0), ('press', 'f')]
+
+def test_json_and_binary_run_the_same(runtime, compiler):
+    source = read_fixture(COREL_FIXTURES[0])
+    from_json = runtime.build_ast_from_json(json.loads(compiler.compile(source, FORMAT_JSON, 1)))
+    assert run_trace(runtime, from_json) == run_trace(runtime, load(runtime, compiler, source, 1))
@@ -0,0 +1,43 @@
+from conftest import ModMenuHarness
+
+class PresetsHarness(ModMenuHarness):
+    def __init__(self, baso, presets_db_file, presets_file):
+        super().__init__(baso)
+        self.presets_db_file = presets_db_file
+        self.presets_file = presets_file
+
+def test_legacy_presets_are_imported_once(baso, tmp_path):
+    legacy = tmp_path / 'presets.txt'
+    legacy.write_text('AK - Y: 4 - X: -1 - Delay: 10 ms\n')
+    store = baso.PresetStore(str(tmp_path / 'presets.db'))
+    store.open(legacy_path=str(legacy))
+    assert [preset.name for preset in store.load_all()] == ['AK']
+    assert store.import_error is None
+
+def test_unreadable_legacy_presets_do_not_abort_startup(baso, tmp_path):
+    legacy = tmp_path / 'presets.txt'
+    legacy.write_bytes(b'AK - Y: 4 - X: -1 - Delay: 10 ms\n\xff\xfe\x00broken\n')
+    store = baso.PresetStore(str(tmp_path / 'presets.db'))
+    store.open(legacy_path=str(legacy))
+    assert isinstance(store.import_error, UnicodeDecodeError)
+    assert store.load_all() == []
+
+def test_unavailable_database_warns_the_user(baso, tmp_path, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(baso.QMessageBox, 'warning', lambda parent, title, text: warnings.append(text))
+    # A directory cannot be opened as a database
+    menu = PresetsHarness(baso, str(tmp_path), str(tmp_path / 'presets.txt'))
+    store = menu.open_preset_store()
+
+    assert store.path == ':memory:'
+    assert len(warnings) == 1 and 'will not be saved' in warnings[0]
+
+def test_failed_legacy_import_warns_the_user(baso, tmp_path, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(baso.QMessageBox, 'warning', lambda parent, title, text: warnings.append(text))
+    legacy = tmp_path / 'presets.txt'
+    legacy.write_bytes(b'\xff\xfe\x00')
+    menu = PresetsHarness(baso, str(tmp_path / 'presets.db'), str(legacy))
+    menu.open_preset_store()
+
+    assert len(warnings) == 1 and 'Could not import presets' in warnings[0]
@@ -0,0 +1,83 @@
+import pytest
+
+from conftest import FORMAT_BINARY, ModMenuHarness, Signal
+
+class MemoryCache:
+    # The in-memory script cache: records what prewarm loaded and what it handed to the compile pool
+    def __init__(self):
+        self.entries = {}
+        self.submitted = []
+
+    def put(self, path, entry):
+        self.entries[path] = entry
+
+    def submit(self, path):
+        self.submitted.append(path)
+
+class PrewarmHarness(ModMenuHarness):
+    # The parts of ModMenu prewarm touches, with the compiler library and daemon unavailable so
+    # everything the disk cache misses goes through one batch compile
+    def __init__(self, baso, runtime, compiler, cache_dir):
+        super().__init__(baso)
+        self.runtime = runtime
+        self.compiler = compiler
+        self.disk_cache = baso.ScriptDiskCache(cache_dir, b'fingerprint')
+        self.script_runtime_cache = MemoryCache()
+        self.script_compiled_signal = Signal()
+        self.batches = []
+
+    def get_corel_runtime_module(self):
+        return self.runtime
+
+    def get_script_disk_cache(self):
+        return self.disk_cache
+
+    def get_corel_compiler_library(self):
+        return None
+
+    def get_corel_compiler_daemon(self):
+        return None
+
+    def compile_scripts_batch(self, paths):
+        self.batches.append(list(paths))
+        compiled = {}
+        for path in paths:
+            with open(path, 'rb') as file:
+                compiled[path] = self.compiler.compile(file.read(), FORMAT_BINARY, 1)
+        return compiled
+
+@pytest.fixture
+def scripts(tmp_path):
+    paths = []
+    for index in range(3):
+        path = tmp_path / f'script_{index}.corel'
+        path.write_bytes(f'--<{index}>\nmove({index + 1}x)\nwait(5ms)\n'.encode())
+        paths.append(str(path))
+    return paths
+
+def prewarm(baso, runtime, compiler, cache_dir, scripts):
+    harness = PrewarmHarness(baso, runtime, compiler, cache_dir)
+    harness.prewarm_script_runtime_cache(scripts)
+    return harness
+
+def test_warm_disk_cache_needs_no_compiles(baso, runtime, compiler, tmp_path, scripts):
+    cache_dir = str(tmp_path / 'cache')
+    cold = prewarm(baso, runtime, compiler, cache_dir, scripts)
+    assert cold.batches == [scripts]
+    assert sorted(cold.script_runtime_cache.entries) == sorted(scripts)
+
+    warm = prewarm(baso, runtime, compiler, cache_dir, scripts)
+    assert warm.batches == []
+    assert warm.script_runtime_cache.submitted == []
+    assert sorted(warm.script_runtime_cache.entries) == sorted(scripts)
+
+def test_only_disk_cache_misses_are_compiled(baso, runtime, compiler, tmp_path, scripts):
+    cache_dir = str(tmp_path / 'cache')
+    prewarm(baso, runtime, compiler, cache_dir, scripts)
+
+    with open(scripts[1], 'ab') as file:
+        file.write(b'move(1y)\n')
+    warm = prewarm(baso, runtime, compiler, cache_dir, scripts)
+    assert warm.batches == [[scripts[1]]]
+    assert warm.script_runtime_cache.submitted == []
+    assert sorted(warm.script_runtime_cache.entries) == sorted(scripts)
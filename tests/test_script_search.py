@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from conftest import COREL_DIR, COREL_FIXTURES, ModMenuHarness, read_fixture
+
+EDGE_CASES = [
+    '',
+    "--<ctrl+k>\r\nloop(*) { press('f') wait(10ms) }\r\n",
+    "loop ( 3 )\t{\n\tmove(-12x, 7y)\n}\n",
+    "// comment with 'quotes' and loop(5)\nwaiting presser 12abc 12 ms 5msx -3x_ x1\n",
+    "press('unterminated\nclick(\"left\") --<> --<a\n>\n",
+    "move(1x) // naïve ünïcödé → 10ms\npress('é')\n",
+]
+
+@pytest.fixture
+def menu(baso, compiler):
+    menu = ModMenuHarness(baso)
+    menu.library = compiler.library
+    return menu
+
+@pytest.mark.parametrize('path', COREL_FIXTURES + [os.path.join(COREL_DIR, 'corel.corel')])
+def test_regex_fallback_matches_the_lexer_on_fixtures(menu, baso, path):
+    source = read_fixture(path).decode('utf-8')
+    assert baso.corel_regex_tokens(source) == menu.tokenize_corel_source_inprocess(menu.library, source)
+
+@pytest.mark.parametrize('source', EDGE_CASES)
+def test_regex_fallback_matches_the_lexer_on_edge_cases(menu, baso, source):
+    assert baso.corel_regex_tokens(source) == menu.tokenize_corel_source_inprocess(menu.library, source)
+
+def test_index_takes_tokens_from_the_library(menu, baso):
+    menu.get_corel_compiler_library = lambda: menu.library
+    index = baso.ScriptSearchIndex()
+    source = "--<ctrl+k>\nloop(*) { press('f') }\nloop(20) { click('left') }\n"
+    index.update('burst.corel', source, menu.tokenize_corel_source(source))
+
+    document = index.document('burst.corel')
+    assert document.trigger == 'ctrl+k'
+    assert document.max_loop == float('inf')
+    assert {'burst', 'trigger:ctrl+k', 'loop:*', 'press:f', 'click:left', '20'} <= document.terms
+
+def test_search_limit_keeps_the_head_of_the_ranking(baso):
+    index = baso.ScriptSearchIndex()
+    for number in range(40):
+        index.update(f'{number:02}.corel', f"press('{'f' if number % 3 else 'g'}')\nwait({number}ms)\n")
+
+    ranked, count = index.search('press')
+    assert count == 40
+    for limit in (1, 5, 13, 40, 100):
+        assert index.search('press', limit) == (ranked[:limit], count)
+    assert index.search('press:f', 5) == ([(f'{number:02}.corel', 3.0) for number in (1, 2, 4, 5, 7)], 26)
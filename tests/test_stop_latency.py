@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+
+STOP_BOUND_NS = 1_000_000
+
+class ProbeInputBackend:
+    # Batches like WindowsInputBackend: events only count as sent when flush() submits them, so input still
+    # queued at a stop shows up if it is sent instead of discarded. Keeps the time of the latest submission.
+    MAX_PENDING = 256
+    last_sent_ns = 0
+
+    def __init__(self):
+        self.pending = 0
+
+    def queue(self):
+        self.pending += 1
+        if self.pending >= self.MAX_PENDING:
+            self.flush()
+
+    def move(self, dx, dy):
+        self.queue()
+
+    def press(self, key):
+        self.queue()
+
+    def click(self, button):
+        self.queue()
+
+    def flush(self):
+        if self.pending:
+            self.pending = 0
+            ProbeInputBackend.last_sent_ns = time.perf_counter_ns()
+
+    def discard(self):
+        self.pending = 0
+
+@pytest.fixture
+def probe(runtime, monkeypatch):
+    monkeypatch.setitem(runtime.INPUT_BACKENDS, 'probe', ProbeInputBackend)
+    ProbeInputBackend.last_sent_ns = 0
+    return ProbeInputBackend
+
+def loop(runtime, iterations, *children):
+    node = runtime.LOOPnode('LOOP', iterations)
+    node.children = list(children)
+    return node
+
+@pytest.mark.parametrize('executor', ['threads', 'asyncio'])
+def test_no_input_is_sent_after_stop_all(runtime, probe, executor):
+    scripts = {
+        'moves.corel': [loop(runtime, runtime.LOOP_FOREVER, runtime.MOVEnode('MOVE', 'x', 1))],
+        'waits.corel': [
+            loop(runtime, runtime.LOOP_FOREVER, runtime.PRESSnode('PRESS', 'f'), runtime.WAITnode('WAIT', 2, 'ms'))
+        ],
+    }
+    finished = {}
+    done = threading.Event()
+
+    def on_finished(key, stats, error, stopped):
+        finished[key] = (error, stopped)
+        if len(finished) == len(scripts):
+            done.set()
+
+    scheduler = runtime.CorelRunScheduler(len(scripts), backend='probe', on_finished=on_finished, executor=executor)
+    try:
+        for key, ast in scripts.items():
+            assert scheduler.trigger(key, runtime.compile_program(ast)) == runtime.RUN_STARTED
+        time.sleep(0.05)
+        assert probe.last_sent_ns, 'the scripts sent no input before the stop'
+        stopped_at = time.perf_counter_ns()
+        scheduler.stop_all()
+        assert done.wait(5), 'runs did not finish after stop_all()'
+    finally:
+        scheduler.shutdown()
+
+    assert finished == {key: (None, True) for key in scripts}
+    assert probe.last_sent_ns - stopped_at <= STOP_BOUND_NS